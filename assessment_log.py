@@ -0,0 +1,321 @@
+import argparse
+import glob
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from symptom_extractor import SYMPTOM_NAMES
+
+FSYNC_POLICIES = ("batch", "interval", "never")
+SEGMENT_SUFFIX = ".jsonl"
+OPEN_SUFFIX = ".part"
+COMPACTED_NAME = "assessments.npy"
+
+
+def record_dtype(num_symptoms):
+    return np.dtype([
+        ("time", np.float64),
+        ("detailed", np.uint8),
+        ("age", np.float32),
+        ("gender", np.int8),
+        ("fasting_blood_sugar", np.float32),  # NaN when not given
+        ("high_blood_sugar", np.uint8),
+        ("symptoms", np.uint8, (num_symptoms,)),
+        ("probability", np.float32),
+    ])
+
+
+# Append-only log of completed assessments, written off the request path.
+# record() only appends to an in-memory queue; a background thread writes what has queued up
+# every flush_interval seconds (or once max_batch records are waiting) to a JSONL segment,
+# named <time>-<pid>-<seq>.jsonl.part while open and renamed to .jsonl once complete, so
+# workers never share a file and compaction only reads finished segments.
+# fsync: "batch" syncs after every write, "interval" at most every fsync_interval seconds,
+# "never" leaves it to the OS. A full queue drops records (counted) instead of blocking requests.
+# Records use the batch scoring field names, so a segment can be fed to batch_scoring.py as is.
+class AssessmentLog:
+    def __init__(self, directory, symptom_names, flush_interval=1.0, max_batch=1024, fsync="batch",
+                 fsync_interval=5.0, segment_max_bytes=64 * 1024 * 1024, max_queue=100000,
+                 name="assessment-log"):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.directory = directory
+        self.symptom_names = tuple(symptom_names)
+        self._symptom_keys = [json.dumps(name, ensure_ascii=False) + ":" for name in self.symptom_names]
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.segment_max_bytes = segment_max_bytes
+        self.max_queue = max_queue
+        self.name = name
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._file = None
+        self._path = None
+        self._sequence = 0
+        self._last_sync = 0.0
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.segments = 0
+        self.write_errors = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        if self._thread is not None and self._thread.is_alive():
+            return self  # a writer a timed-out stop() left draining carries on
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logging.info(f"Assessment log writing to {self.directory} (fsync={self.fsync})")
+        return self
+
+    # Write everything still queued, close the open segment and stop the thread. Returns whether
+    # the thread finished within the timeout; if not, it keeps draining in the background.
+    def stop(self, timeout=10.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is None:
+            return True
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            with self._cond:
+                queued = len(self._pending)
+            logging.warning(
+                f"Assessment log writer did not finish within {timeout}s "
+                f"({queued} records still queued, plus any batch being written)"
+            )
+            return False
+        self._thread = None
+        return True
+
+    @property
+    def running(self):
+        return self._running
+
+    # Queue one assessment: the model's feature row (age, gender, 0/1 symptoms) and the probability
+    # in percent that the reply was based on. Never blocks on disk.
+    def record(self, age, gender, symptoms, probability, fasting_blood_sugar=None, high_blood_sugar=False,
+               detailed=False):
+        entry = (time.time(), detailed, age, gender, symptoms, probability, fasting_blood_sugar, high_blood_sugar)
+        with self._cond:
+            if not self._running or len(self._pending) >= self.max_queue:
+                self.dropped += 1
+                return False
+            self._pending.append(entry)
+            self.recorded += 1
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        return True
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": self._running,
+                "queue_depth": len(self._pending),
+                "recorded": self.recorded,
+                "dropped": self.dropped,
+                "written": self.written,
+                "batches": self.batches,
+                "segments": self.segments,
+                "write_errors": self.write_errors,
+                "fsync": self.fsync,
+            }
+
+    # One JSONL line, formatted by hand: json.dumps of the whole record costs 4x as much
+    def _to_json(self, entry):
+        created, detailed, age, gender, symptoms, probability, fasting_blood_sugar, high_blood_sugar = entry
+        flags = ",".join([key + ("1" if value else "0") for key, value in zip(self._symptom_keys, symptoms)])
+        return (
+            f'{{"time":{created:.3f},"source":"{"questionnaire" if detailed else "chat"}",'
+            f'"age":{_json_number(age)},"gender":{_json_number(gender)},'
+            f'"fasting_blood_sugar":{_json_number(fasting_blood_sugar)},"high_blood_sugar":{int(bool(high_blood_sugar))},'
+            f'{flags},"probability":{float(probability):.4f}}}\n'
+        )
+
+    def _take_batch(self):
+        with self._cond:
+            if self._running and len(self._pending) < self.max_batch:
+                self._cond.wait(self.flush_interval)
+            batch, self._pending = self._pending, []
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    # The records stay lost, but the thread keeps serving later batches
+                    logging.error(f"Assessment log write error: {e}")
+                    with self._cond:
+                        self.write_errors += 1
+                    self._close_segment()
+            if not self._running:
+                with self._cond:
+                    if self._pending:
+                        continue
+                break
+        self._close_segment()
+
+    def _write(self, batch):
+        if self._file is None:
+            self._open_segment()
+        self._file.write("".join(self._to_json(entry) for entry in batch).encode("utf-8"))
+        self._file.flush()
+        now = time.monotonic()
+        if self.fsync == "batch" or (self.fsync == "interval" and now - self._last_sync >= self.fsync_interval):
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+        with self._cond:
+            self.written += len(batch)
+            self.batches += 1
+        if self._file.tell() >= self.segment_max_bytes:
+            self._close_segment()
+
+    def _open_segment(self):
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        self._path = os.path.join(self.directory, f"{stamp}-{os.getpid()}-{self._sequence:05d}{SEGMENT_SUFFIX}")
+        self._file = open(self._path + OPEN_SUFFIX, "ab")
+        with self._cond:
+            self.segments += 1
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        try:
+            if self.fsync != "never":
+                os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self._path + OPEN_SUFFIX, self._path)
+        except OSError as e:
+            logging.error(f"Error closing assessment log segment {self._path}: {e}")
+        self._file = None
+
+
+def _json_number(value):
+    return "null" if value is None else str(value)
+
+
+def _read_records(paths):
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logging.warning(f"Skipping unreadable line in {path}")
+
+
+# Records of the given segments as a structured array, symptoms in symptom_names order
+# (a torn last line left by a crash is skipped)
+def read_segments(paths, symptom_names):
+    rows = []
+    for record in _read_records(paths):
+        fasting_blood_sugar = record["fasting_blood_sugar"]
+        rows.append((
+            record["time"], record["source"] == "questionnaire", record["age"], record["gender"],
+            math.nan if fasting_blood_sugar is None else fasting_blood_sugar, record["high_blood_sugar"],
+            [record.get(name, 0) for name in symptom_names], record["probability"],
+        ))
+    return np.array(rows, dtype=record_dtype(len(symptom_names)))
+
+
+# Whether the process that named an open segment <time>-<pid>-<seq>.jsonl.part is still running
+# on this host (and may still be writing it)
+def _writer_running(path):
+    try:
+        pid = int(os.path.basename(path).split("-")[1])
+    except (IndexError, ValueError):
+        return True  # not ours to judge: leave it alone
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Merge the finished segments into one .npy next to them (appending to an earlier compaction) and
+# delete the merged segments. The new file is renamed into place before any segment is deleted,
+# so a crash in between can only merge a segment twice, never lose it.
+# include_open also merges the .part segments of writers that are no longer running (a crashed
+# worker); run it on the host that wrote them, since liveness is checked by pid.
+# Run one compaction at a time per directory.
+def compact(directory, symptom_names, output=None, include_open=False):
+    output = output or os.path.join(directory, COMPACTED_NAME)
+    paths = sorted(glob.glob(os.path.join(directory, "*" + SEGMENT_SUFFIX)))
+    if include_open:
+        for path in sorted(glob.glob(os.path.join(directory, "*" + SEGMENT_SUFFIX + OPEN_SUFFIX))):
+            if _writer_running(path):
+                logging.info(f"Skipping {path}: its writer is still running")
+            else:
+                paths.append(path)
+    if not paths:
+        return 0
+    new = read_segments(paths, symptom_names)
+    if os.path.exists(output):
+        merged = np.concatenate([np.load(output, mmap_mode="r"), new])
+    else:
+        merged = new
+    tmp_path = f"{output}.tmp.npy"
+    np.save(tmp_path, merged)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, output)
+    for path in paths:
+        os.remove(path)
+    logging.info(f"Compacted {len(paths)} segments ({len(new)} records) into {output}, {len(merged)} records in total")
+    return len(new)
+
+
+# Memory-mapped compacted records
+def load_assessments(path):
+    return np.load(path, mmap_mode="r")
+
+
+# (n, 2 + num_symptoms) float32 model input rows: age, gender, symptoms
+def feature_matrix(records):
+    features = np.empty((len(records), 2 + records.dtype["symptoms"].shape[0]), dtype=np.float32)
+    features[:, 0] = records["age"]
+    features[:, 1] = records["gender"]
+    features[:, 2:] = records["symptoms"]
+    return features
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact assessment log segments into a NumPy file")
+    parser.add_argument("directory", nargs="?", default=os.environ.get("ASSESSMENT_LOG_DIR", "assessment_log"))
+    parser.add_argument("-o", "--output", help=f"compacted file (default: <directory>/{COMPACTED_NAME})")
+    parser.add_argument("--include-open", action="store_true",
+                        help="also merge .part segments whose writer is no longer running (a crashed worker)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if not os.path.isdir(args.directory):
+        sys.exit(f"No such directory: {args.directory}")
+    count = compact(args.directory, SYMPTOM_NAMES, args.output, args.include_open)
+    print(f"Merged {count} records", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import threading
+
+from flask import abort, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are built
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+BUILD_DIR = os.path.join(STATIC_DIR, "build")
+MANIFEST_NAME = "manifest.json"
+PREVIEW_SOURCES = {"models/human_body.glb": "models/human_body.preview.glb"}
+# Already-compressed formats gain nothing from another pass
+SKIP_COMPRESSION = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".woff2", ".gz", ".br", ".zip"}
+MIN_SAVING = 0.05
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+mimetypes.add_type("model/gltf-binary", ".glb")
+mimetypes.add_type("text/javascript", ".js")
+
+
+def _hashed_name(name, digest):
+    root, extension = os.path.splitext(name)
+    return f"{root}.{digest[:12]}{extension}"
+
+
+def _compressed_variants(content, extension):
+    variants = {}
+    if extension in SKIP_COMPRESSION:
+        return variants
+    variants["gzip"] = gzip.compress(content, compresslevel=9, mtime=0)
+    if brotli is not None:
+        variants["br"] = brotli.compress(content, quality=11)
+    return {
+        encoding: data for encoding, data in variants.items() if len(data) <= len(content) * (1 - MIN_SAVING)
+    }
+
+
+# Build step: copy every file under static/ to static/build/ under a content-hashed name,
+# next to its .br/.gz variants, plus generated assets (the GLB preview). The manifest maps
+# logical names ("js/chatbot.js") to the built files. Returns the manifest.
+def build(static_dir=STATIC_DIR, build_dir=BUILD_DIR, previews=True):
+    sources = {}
+    tmp_dir = f"{build_dir}.tmp"
+    skip = {os.path.abspath(build_dir), os.path.abspath(tmp_dir)}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) not in skip]
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, static_dir).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                sources[name] = f.read()
+    if previews:
+        from glb_preview import make_preview
+        for source, name in PREVIEW_SOURCES.items():
+            if source in sources:
+                try:
+                    sources[name] = make_preview(sources[source])
+                except ValueError as e:
+                    logging.warning(f"Skipping preview of {source}: {e}")
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    assets = {}
+    for name, content in sorted(sources.items()):
+        digest = hashlib.sha256(content).hexdigest()
+        built = _hashed_name(name, digest)
+        path = os.path.join(tmp_dir, built)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+        encodings = {}
+        for encoding, data in _compressed_variants(content, os.path.splitext(name)[1].lower()).items():
+            with open(path + ENCODING_SUFFIXES[encoding], "wb") as f:
+                f.write(data)
+            encodings[encoding] = len(data)
+        assets[name] = {
+            "file": built,
+            "etag": digest[:32],
+            "size": len(content),
+            "encodings": encodings,
+            "mimetype": mimetypes.guess_type(name)[0] or "application/octet-stream",
+        }
+    manifest = {"assets": assets}
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.replace(tmp_dir, build_dir)
+    return manifest
+
+
+# Preferred encoding the client accepts (q > 0) among those built, or None for identity
+def negotiate_encoding(accept_encoding, available):
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if token:
+            accepted[token.lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in ("br", "gzip"):
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if encoding in available and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+# Serves the built assets: hashed URLs with year-long immutable caching, the precompressed
+# variant the client accepts, strong ETags per variant and byte ranges (Range requests always
+# get the uncompressed file, so offsets mean the same thing to every client).
+# Without a build the templates fall back to the plain /static URLs.
+class AssetManifest:
+    def __init__(self, build_dir=BUILD_DIR):
+        self.build_dir = build_dir
+        self.assets = {}
+        self._files = {}
+        path = os.path.join(build_dir, MANIFEST_NAME)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.assets = json.load(f)["assets"]
+            self._files = {entry["file"]: entry for entry in self.assets.values()}
+        self.served = {"identity": 0, "gzip": 0, "br": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def built(self):
+        return bool(self.assets)
+
+    # URL for a logical static name; None for a generated asset that was not built
+    def url(self, name):
+        entry = self.assets.get(name)
+        if entry is not None:
+            return url_for("static_asset", filename=entry["file"])
+        if name in PREVIEW_SOURCES.values():
+            return None
+        return url_for("static", filename=name)
+
+    def response(self, filename):
+        entry = self._files.get(filename)
+        if entry is None:
+            abort(404)
+        encoding = None
+        if "Range" not in request.headers:
+            encoding = negotiate_encoding(request.headers.get("Accept-Encoding"), entry["encodings"])
+        path = os.path.join(self.build_dir, filename + (ENCODING_SUFFIXES[encoding] if encoding else ""))
+        response = send_file(
+            path, mimetype=entry["mimetype"], conditional=True,
+            etag=f"{entry['etag']}-{encoding}" if encoding else entry["etag"], max_age=IMMUTABLE_MAX_AGE,
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        with self._lock:
+            self.served[encoding or "identity"] += 1
+        return response
+
+    def stats(self):
+        return {
+            "built": self.built,
+            "assets": len(self.assets),
+            "brotli": brotli is not None,
+            **{f"served_{encoding}": count for encoding, count in self.served.items()},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build hashed, precompressed static assets")
+    parser.add_argument("--static-dir", default=STATIC_DIR)
+    parser.add_argument("--build-dir", default=BUILD_DIR)
+    parser.add_argument("--no-preview", action="store_true", help="skip the reduced GLB preview")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if brotli is None:
+        logging.warning("brotli is not installed; building gzip variants only")
+
+    manifest = build(args.static_dir, args.build_dir, previews=not args.no_preview)
+    for name, entry in manifest["assets"].items():
+        variants = ", ".join(f"{encoding} {size:,}" for encoding, size in entry["encodings"].items())
+        print(f"{name:<40} {entry['size']:>10,} bytes  {variants}")
+
+
+if __name__ == "__main__":
+    main()
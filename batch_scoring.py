@@ -0,0 +1,283 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from itertools import islice
+
+import numpy as np
+
+from numpy_model import load_mlp_model
+from session_store import HIGH_BLOOD_SUGAR
+from symptom_extractor import SYMPTOM_NAMES, normalize_text
+
+# Fasting blood sugar rules shared with the chat path (predict_diabetes_response)
+HYPOGLYCEMIA_FBS = 70
+DIABETES_FBS = 126
+HIGH_BLOOD_SUGAR_PROBABILITY = 75
+LIKELY_PROBABILITY = 50
+# Ages the chat accepts (whole years)
+MAX_AGE = 99
+
+# Header names accepted for the non-symptom columns; symptom columns use symptom_names
+FIELD_ALIASES = {
+    "user_id": ("user_id", "id", "شناسه"),
+    "age": ("age", "سن"),
+    "gender": ("gender", "sex", "جنسیت"),
+    "fasting_blood_sugar": ("fasting_blood_sugar", "fbs", "قند خون ناشتا", "قند ناشتا"),
+    "high_blood_sugar": ("high_blood_sugar", HIGH_BLOOD_SUGAR),
+}
+# Same encoding as the chat: 0 = female, 1 = male
+GENDER_VALUES = {
+    "female": 0, "f": 0, "زن": 0, "خانم": 0, "مونث": 0,
+    "male": 1, "m": 1, "مرد": 1, "آقا": 1, "مذکر": 1,
+}
+FLAG_VALUES = {"true": 1, "yes": 1, "بله": 1, "آره": 1, "false": 0, "no": 0, "خیر": 0, "نه": 0}
+
+OUTPUT_FIELDS = ("row", "user_id", "probability", "status")
+FORMATS = ("csv", "jsonl")
+
+
+# Header or value key: normalized and with spaces / ZWNJ removed ("تأخیر در بهبود" == "تاخیردربهبود")
+def _key(text):
+    return normalize_text(str(text)).replace(" ", "")
+
+
+_GENDER_KEYS = {_key(name): value for name, value in GENDER_VALUES.items()}
+_FLAG_KEYS = {_key(name): value for name, value in FLAG_VALUES.items()}
+
+
+# Column values to float, NaN where missing; words are looked up in `words`
+def _to_float(values, words=None):
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    out = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        if value is None or value == "":
+            continue
+        try:
+            out[i] = float(value)
+        except (TypeError, ValueError):
+            if words is not None:
+                out[i] = words.get(_key(value), np.nan)
+    return out
+
+
+# Where each model input lives in the incoming rows
+class ColumnMap:
+    def __init__(self, header, symptom_names):
+        positions = {}
+        for i, name in enumerate(header):
+            positions.setdefault(_key(name), i)
+
+        self.fields = {}
+        for field, aliases in FIELD_ALIASES.items():
+            self.fields[field] = next((positions[_key(a)] for a in aliases if _key(a) in positions), None)
+        self.symptoms = [positions.get(_key(name)) for name in symptom_names]
+
+        if self.fields["age"] is None or self.fields["gender"] is None:
+            raise ValueError("Input must have age and gender columns")
+        used = set(self.fields.values()) | set(self.symptoms)
+        self.ignored = [name for i, name in enumerate(header) if i not in used]
+        self.missing_symptoms = [name for name, i in zip(symptom_names, self.symptoms) if i is None]
+
+
+# Vectorized scoring of patient rows with the same rules as a chat prediction:
+# FBS < 70 short-circuits to hypoglycemia without running the model, and FBS >= 126
+# (or a high blood sugar flag) raises the probability to at least 75%.
+class BatchScorer:
+    def __init__(self, predict_fn, symptom_names, chunk_size=50000):
+        self.predict_fn = predict_fn
+        self.symptom_names = list(symptom_names)
+        self.chunk_size = chunk_size
+        self.rows_scored = 0
+
+    # rows: sequence of row sequences laid out as described by columns.
+    # Returns (probability in %, NaN when not predicted; status per row)
+    def score_rows(self, rows, columns):
+        n = len(rows)
+        table = list(zip(*rows)) if n else []
+
+        def column(index, words=None):
+            if index is None or index >= len(table):
+                return np.full(n, np.nan)
+            return _to_float(table[index], words)
+
+        age = column(columns.fields["age"])
+        gender = column(columns.fields["gender"], _GENDER_KEYS)
+        fbs = column(columns.fields["fasting_blood_sugar"])
+        high = np.nan_to_num(column(columns.fields["high_blood_sugar"], _FLAG_KEYS)) != 0
+
+        features = np.zeros((n, 2 + len(self.symptom_names)), dtype=np.float32)
+        features[:, 0] = age
+        features[:, 1] = gender
+        for j, index in enumerate(columns.symptoms):
+            if index is not None:
+                features[:, 2 + j] = np.nan_to_num(column(index, _FLAG_KEYS)) != 0
+
+        with np.errstate(invalid="ignore"):
+            valid = np.isfinite(age) & (age >= 0) & (age <= MAX_AGE) & (age == np.floor(age)) \
+                & ((gender == 0) | (gender == 1))
+            # Like the chat, low blood sugar is reported even before age and gender are known
+            hypoglycemia = fbs < HYPOGLYCEMIA_FBS
+            predict = valid & ~hypoglycemia
+            override = (fbs >= DIABETES_FBS) | high
+
+        probability = np.full(n, np.nan)
+        if predict.any():
+            probability[predict] = np.asarray(self.predict_fn(features[predict]), dtype=np.float64).reshape(-1) * 100
+        boosted = predict & override
+        probability[boosted] = np.maximum(probability[boosted], HIGH_BLOOD_SUGAR_PROBABILITY)
+
+        status = np.full(n, "invalid", dtype=object)
+        status[hypoglycemia] = "hypoglycemia"
+        status[predict] = "unlikely"
+        status[predict & (probability > LIKELY_PROBABILITY)] = "likely"
+        return probability, status
+
+    # Score a text stream chunk by chunk, yielding the output text as it is produced
+    def score_stream(self, stream, input_format="csv", output_format=None):
+        output_format = output_format or input_format
+        if input_format not in FORMATS or output_format not in FORMATS:
+            raise ValueError(f"Unsupported format: {input_format} -> {output_format}")
+
+        if input_format == "csv":
+            chunks = _read_csv(stream, self.chunk_size)
+        else:
+            chunks = _read_jsonl(stream, self.chunk_size, self.symptom_names)
+        header = next(chunks, None)
+        if header is None:
+            raise ValueError("Input is empty")
+        columns = ColumnMap(header, self.symptom_names)
+        if columns.ignored:
+            logging.info(f"Batch scoring ignores columns: {columns.ignored}")
+        if columns.missing_symptoms:
+            logging.info(f"Batch scoring treats missing symptom columns as absent: {columns.missing_symptoms}")
+        return self._score_chunks(chunks, columns, output_format)
+
+    def _score_chunks(self, chunks, columns, output_format):
+        if output_format == "csv":
+            yield ",".join(OUTPUT_FIELDS) + "\r\n"
+        row_number = 0
+        user_id_index = columns.fields["user_id"]
+        for rows in chunks:
+            probability, status = self.score_rows(rows, columns)
+            self.rows_scored += len(rows)
+            numbers = range(row_number + 1, row_number + len(rows) + 1)
+            row_number += len(rows)
+            user_ids = [row[user_id_index] for row in rows] if user_id_index is not None else [None] * len(rows)
+            probabilities = [None if p != p else p for p in np.round(probability, 2).tolist()]
+
+            out = io.StringIO()
+            if output_format == "csv":
+                # csv writes None as an empty field
+                csv.writer(out).writerows(zip(numbers, user_ids, probabilities, status.tolist()))
+            else:
+                for record in zip(numbers, user_ids, probabilities, status.tolist()):
+                    out.write(json.dumps(dict(zip(OUTPUT_FIELDS, record)), ensure_ascii=False) + "\n")
+            yield out.getvalue()
+
+
+def _read_csv(stream, chunk_size):
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [name.lstrip("\ufeff") for name in header]
+    yield header
+    width = len(header)
+    while True:
+        rows = [row for row in islice(reader, chunk_size) if row]
+        if not rows:
+            return
+        # Short rows are padded so columns stay aligned
+        yield [row if len(row) >= width else row + [""] * (width - len(row)) for row in rows]
+
+
+# Records are laid out in a fixed order (fields, then symptom_names), so keys may differ
+# between records; unknown keys are ignored
+def _read_jsonl(stream, chunk_size, symptom_names):
+    header = list(FIELD_ALIASES) + list(symptom_names)
+    yield header
+    positions = {_key(alias): i for i, field in enumerate(FIELD_ALIASES) for alias in FIELD_ALIASES[field]}
+    positions.update({_key(name): len(FIELD_ALIASES) + j for j, name in enumerate(symptom_names)})
+    slots = {}  # raw key -> position (or None), so each distinct key is normalized once
+
+    def row_of(record):
+        row = [None] * len(header)
+        for name, value in record.items():
+            index = slots.get(name, -1)
+            if index == -1:
+                index = slots[name] = positions.get(_key(name))
+            if index is not None:
+                row[index] = value
+        return row
+
+    # A line that is not a JSON object becomes an empty row, which is scored as invalid
+    def parse(line):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return row_of({})
+        return row_of(record if isinstance(record, dict) else {})
+
+    while True:
+        rows = [parse(line) for line in islice(stream, chunk_size) if line.strip()]
+        if not rows:
+            return
+        yield rows
+
+
+# csv or jsonl, from an explicit name, a file name or a MIME type
+def detect_format(name=None, mimetype=None, default="csv"):
+    if name in FORMATS:
+        return name
+    if name and name.lower().endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    if name and name.lower().endswith(".csv"):
+        return "csv"
+    if mimetype and ("json" in mimetype):
+        return "jsonl"
+    if mimetype and "csv" in mimetype:
+        return "csv"
+    return default
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV or JSONL file of patients with the diabetes model")
+    parser.add_argument("input", help="input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    parser.add_argument("--input-format", choices=FORMATS)
+    parser.add_argument("--output-format", choices=FORMATS)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    try:
+        model = load_mlp_model()
+    except Exception as e:
+        sys.exit(f"MLP model could not be loaded: {e}")
+    scorer = BatchScorer(lambda x: model.predict(x, verbose=0)[:, 0], SYMPTOM_NAMES, args.chunk_size)
+
+    input_format = args.input_format or detect_format(args.input if args.input != "-" else None)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8-sig", newline="")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    started = time.perf_counter()
+    try:
+        for text in scorer.score_stream(source, input_format, args.output_format):
+            target.write(text)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    rows = scorer.rows_scored
+    elapsed = time.perf_counter() - started
+    print(f"Scored {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/sec)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
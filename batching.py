@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+# Micro-batching scheduler for model inference.
+# Concurrent requests submit one feature row each; a background worker collects
+# the rows that arrive within a short window (or until max_batch_size is reached),
+# runs a single batched forward pass and hands every caller its own probability.
+# A row that arrives while the worker is idle is predicted at once, without the window.
+class InferenceBatcher:
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5.0, name="inference-batcher"):
+        # predict_fn receives an (n, features) float array and returns n probabilities
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        # Stats
+        self._batches = 0
+        self._rows = 0
+        self._max_batch_seen = 0
+        self._last_batch_size = 0
+        self._max_queue_depth = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logging.info(
+            f"Inference batcher started (max_batch_size={self.max_batch_size}, "
+            f"window={self.max_wait * 1000:.1f}ms)"
+        )
+        return self
+
+    def stop(self, timeout=5.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    # Queue one feature row and return its future
+    def submit_async(self, features):
+        row = np.asarray(features, dtype=np.float32).reshape(-1)
+        future = Future()
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Inference batcher is not running")
+            self._pending.append((row, future))
+            depth = len(self._pending)
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+            self._cond.notify_all()
+        return future
+
+    # Queue one feature row and block until its probability is ready
+    def submit(self, features, timeout=None):
+        return self.submit_async(features).result(timeout)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": self._running,
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "rows": self._rows,
+                "avg_batch_size": round(self._rows / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size_seen": self._max_batch_seen,
+                "last_batch_size": self._last_batch_size,
+                "max_batch_size": self.max_batch_size,
+                "window_ms": self.max_wait * 1000,
+            }
+
+    def _take_batch(self):
+        with self._cond:
+            idle = not self._pending
+            while self._running and not self._pending:
+                self._cond.wait()
+            if not self._pending:
+                return []
+
+            # A lone row that found the worker idle runs right away. Rows that queued up
+            # behind a running batch (or arrived together) mean requests overlap: wait for
+            # more until the window closes or the batch is full.
+            overlapping = not idle or len(self._pending) > 1
+            deadline = time.monotonic() + self.max_wait
+            while overlapping and self._running and len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                if not self._running:
+                    break
+                continue
+
+            # Skip callers that cancelled while waiting
+            live = [(row, future) for row, future in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            rows = [row for row, _ in live]
+            futures = [future for _, future in live]
+
+            try:
+                probabilities = np.asarray(self.predict_fn(np.stack(rows)), dtype=np.float64).reshape(-1)
+            except Exception as e:
+                logging.error(f"Batched prediction error: {e}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, probability in zip(futures, probabilities):
+                future.set_result(float(probability))
+
+            with self._cond:
+                self._batches += 1
+                self._rows += len(futures)
+                self._last_batch_size = len(futures)
+                if len(futures) > self._max_batch_seen:
+                    self._max_batch_seen = len(futures)
+
+        # Fail anything still queued after shutdown
+        with self._cond:
+            leftover, self._pending = self._pending, []
+        for _, future in leftover:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Inference batcher stopped"))
@@ -0,0 +1,133 @@
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chat  # noqa: E402
+from assessment_log import AssessmentLog, compact, feature_matrix, load_assessments  # noqa: E402
+from session_store import StateSchema, UserState  # noqa: E402
+
+
+def make_states(count, seed=0):
+    rng = random.Random(seed)
+    schema = StateSchema(chat.symptom_names, chat.questions)
+    states = []
+    for _ in range(count):
+        state = UserState(schema)
+        state.age = rng.randint(18, 85)
+        state.gender = rng.randint(0, 1)
+        if rng.random() < 0.2:
+            state.fasting_blood_sugar = rng.choice([90, 110, 130])
+        state.current_symptoms = [rng.randint(0, 1) for _ in chat.symptom_names]
+        states.append(state)
+    return states
+
+
+# Per-call latencies of the detailed prediction (what the questionnaire's last answer runs)
+def time_predictions(states):
+    latencies = []
+    for state in states:
+        started = time.perf_counter()
+        chat.predict_diabetes_response(state, detailed=True)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "p99_us": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+        "mean_us": round(sum(latencies) / len(latencies) * 1e6, 1),
+    }
+
+
+# The naive alternative: append a CSV row (and fsync) from the request thread
+class DirectCSVWriter:
+    def __init__(self, path):
+        self.path = path
+
+    def record(self, age, gender, symptoms, probability, *args):
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow([age, gender, *symptoms, probability])
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request-path cost of recording assessments, and compaction")
+    parser.add_argument("--predictions", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--block", type=int, default=500, help="predictions per configuration before switching")
+    parser.add_argument("--fsync", default="batch", choices=("batch", "interval", "never"))
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    chat.inference_batcher = None
+    states = make_states(args.predictions)
+    with tempfile.TemporaryDirectory() as directory:
+        chat.assessment_log = None
+        time_predictions(states[:1000])  # warm up
+        log_dir = os.path.join(directory, "log")
+        log = AssessmentLog(log_dir, chat.symptom_names, fsync=args.fsync, segment_max_bytes=1024 * 1024).start()
+        recorders = {
+            "no_log": None,
+            "direct_csv_fsync": DirectCSVWriter(os.path.join(directory, "direct.csv")),
+            "assessment_log": log,
+        }
+        # Configurations take turns in small blocks, so machine noise and drift hit them alike
+        latencies = {name: [] for name in recorders}
+        for _ in range(args.rounds):
+            for start in range(0, len(states), args.block):
+                for name, recorder in recorders.items():
+                    chat.assessment_log = recorder
+                    latencies[name] += time_predictions(states[start:start + args.block])
+        chat.assessment_log = None
+        log.stop()
+        results = {name: summarize(values) for name, values in latencies.items()}
+
+        lines = 0
+        for path in glob.glob(os.path.join(log_dir, "*.jsonl")):
+            with open(path, encoding="utf-8") as f:
+                lines += sum(1 for _ in f)
+        stats = log.stats()
+        results["assessment_log"].update({
+            "recorded": stats["recorded"],
+            "dropped": stats["dropped"],
+            "batches": stats["batches"],
+            "segments": stats["segments"],
+            "lines_on_disk_after_stop": lines,
+            "open_segments_left": len(glob.glob(os.path.join(log_dir, "*.part"))),
+        })
+
+        started = time.perf_counter()
+        merged = compact(log_dir, chat.symptom_names)
+        compact_seconds = time.perf_counter() - started
+        records = load_assessments(os.path.join(log_dir, "assessments.npy"))
+        features = feature_matrix(records)
+        expected = np.array([[s.age, s.gender] + s.current_symptoms for s in states] * args.rounds, dtype=np.float32)
+        results["compaction"] = {
+            "records": merged,
+            "seconds": round(compact_seconds, 3),
+            "memmapped": isinstance(records, np.memmap),
+            "features_match": bool(np.array_equal(features, expected)),
+            "segments_left": len(glob.glob(os.path.join(log_dir, "*.jsonl"))),
+        }
+    print(json.dumps(results, indent=2))
+    if results["assessment_log"]["lines_on_disk_after_stop"] != args.predictions * args.rounds:
+        sys.exit("Records were lost on shutdown")
+
+
+if __name__ == "__main__":
+    main()
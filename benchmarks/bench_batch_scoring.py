@@ -0,0 +1,107 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chat  # noqa: E402
+from batch_scoring import BatchScorer  # noqa: E402
+
+
+# Synthetic patients in the diabetes_user_data.csv layout, plus a fasting blood sugar column
+def write_synthetic_csv(path, rows, seed=7):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["user_id", "age", "gender"] + chat.symptom_names + ["قند خون ناشتا"])
+        for i in range(rows):
+            fbs = rng.choice(("", "", "", rng.randint(50, 250)))
+            writer.writerow(
+                [f"user_{i}", rng.randint(16, 90), rng.randint(0, 1)]
+                + [rng.randint(0, 1) for _ in chat.symptom_names]
+                + [fbs]
+            )
+
+
+# Scored rows must get the same verdict as a chat prediction for the same data
+def check_chat_parity(scorer, samples=500, seed=11):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(samples):
+        fbs = rng.choice((None, rng.randint(50, 250)))
+        rows.append([rng.randint(16, 90), rng.randint(0, 1)] + [rng.randint(0, 1) for _ in chat.symptom_names]
+                    + ["" if fbs is None else fbs])
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([["age", "gender"] + chat.symptom_names + ["fbs"]] + rows)
+    buffer.seek(0)
+    results = list(csv.DictReader(io.StringIO("".join(scorer.score_stream(buffer)))))
+
+    expected_prefix = {
+        "hypoglycemia": "قند خون",
+        "likely": "با توجه به اطلاعات شما، احتمال دیابت وجود دارد",
+        "unlikely": "احتمال ابتلا به دیابت در شما پایین است",
+    }
+    for row, result in zip(rows, results):
+        fbs = row[-1] if row[-1] != "" else None
+        reply = chat.predict_diabetes_response({
+            "age": row[0],
+            "gender": row[1],
+            "fasting_blood_sugar": fbs,
+            "symptoms": [name for name, value in zip(chat.symptom_names, row[2:-1]) if value],
+        })
+        if not reply.startswith(expected_prefix[result["status"]]):
+            raise AssertionError(f"Batch verdict {result['status']} differs from chat for {row}: {reply}")
+    return len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk scoring throughput in rows/sec")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--baseline-rows", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    scorer = BatchScorer(lambda x: chat.model.predict(x, verbose=0)[:, 0], chat.symptom_names, args.chunk_size)
+    checked = check_chat_parity(scorer)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "patients.csv")
+        write_synthetic_csv(source, args.rows)
+        results = {"rows": args.rows, "input_mb": round(os.path.getsize(source) / 1e6, 1), "parity_rows": checked}
+
+        for output_format in ("csv", "jsonl"):
+            scorer.rows_scored = 0
+            started = time.perf_counter()
+            with open(source, encoding="utf-8", newline="") as f, open(os.devnull, "w") as out:
+                for text in scorer.score_stream(f, "csv", output_format):
+                    out.write(text)
+            elapsed = time.perf_counter() - started
+            results[f"batch_{output_format}_rows_per_sec"] = round(scorer.rows_scored / elapsed)
+
+        # One chat prediction per row, as the only way to score before /predict_batch
+        with open(source, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            next(reader)
+            started = time.perf_counter()
+            for _, row in zip(range(args.baseline_rows), reader):
+                chat.predict_diabetes_response({
+                    "age": int(row[1]),
+                    "gender": int(row[2]),
+                    "fasting_blood_sugar": int(row[-1]) if row[-1] else None,
+                    "symptoms": [name for name, value in zip(chat.symptom_names, row[3:-1]) if value == "1"],
+                })
+            results["per_row_chat_rows_per_sec"] = round(args.baseline_rows / (time.perf_counter() - started))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
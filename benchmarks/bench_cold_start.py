@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# A turn the model answers locally (no Gemini call)
+FIRST_MESSAGE = "30 سال، آقا، پرادراری"
+
+
+def get(url, data=None):
+    try:
+        with urllib.request.urlopen(url, data, timeout=60) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+# Cold start one gunicorn worker and time, from the spawn, the first answer of each kind:
+# liveness, the HTML page and the first chat reply (sent as soon as the page is up,
+# like a user on a freshly woken instance)
+def cold_start(mode, port):
+    env = dict(
+        os.environ, STARTUP_MODE=mode, WEB_CONCURRENCY="1", PORT=str(port),
+        SESSION_BACKEND="memory", RESPONSE_CACHE="off", SECRET_KEY="cold-start",
+    )
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    timings = {}
+    try:
+        while time.perf_counter() - started < 60:
+            try:
+                status, _ = get(f"{base}/health/live")
+                if status == 200:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.01)
+        else:
+            raise RuntimeError(f"gunicorn ({mode}) did not come up")
+        timings["live_s"] = time.perf_counter() - started
+        get(f"{base}/")
+        timings["page_s"] = time.perf_counter() - started
+        status, _ = get(f"{base}/get_response", urllib.parse.urlencode({"message": FIRST_MESSAGE}).encode())
+        if status != 200:
+            raise RuntimeError(f"First reply failed ({mode}): {status}")
+        timings["first_reply_s"] = time.perf_counter() - started
+        _, body = get(f"{base}/health")
+        startup = json.loads(body)["startup"]
+        timings["ready_after_import_s"] = startup["ready_seconds"]
+        phases = startup["phases"]
+    finally:
+        server.terminate()
+        server.wait()
+    return timings, phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first response after a cold start, eager vs background loading")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=5077)
+    args = parser.parse_args()
+
+    modes = ("eager", "background")
+    timings = {mode: [] for mode in modes}
+    phases = {}
+    # Modes take turns, so machine noise hits them alike
+    for _ in range(args.runs):
+        for mode in modes:
+            run_timings, phases[mode] = cold_start(mode, args.port)
+            timings[mode].append(run_timings)
+
+    results = {}
+    for mode in modes:
+        results[mode] = {
+            key: round(statistics.median(run[key] for run in timings[mode]), 3) for key in timings[mode][0]
+        }
+        results[mode]["phases"] = phases[mode]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chat  # noqa: E402
+from benchmarks import fake_genai  # noqa: E402
+from gemini_client import GeminiClient  # noqa: E402
+
+QUESTION = "دیابت ارثی است؟"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))] if values else None
+
+
+# Clients send questions back to back through three phases: healthy, outage (every call
+# fails after slow_failure seconds), recovered. Returns per-phase latency and Gemini call counts.
+def outage_scenario(fake, client, phases, clients, latency, slow_failure, think):
+    chat.gemini_client = client
+    records = []
+    stop = threading.Event()
+    phase = {"name": None}
+    lock = threading.Lock()
+
+    def run_client(i):
+        user_id = f"client-{i}"
+        chat.reset_user_state(user_id)
+        while not stop.is_set():
+            name = phase["name"]
+            started = time.perf_counter()
+            reply = chat.process_user_input(QUESTION, user_id)
+            with lock:
+                records.append((name, time.perf_counter() - started, reply == chat.GEMINI_FALLBACK_REPLY))
+            time.sleep(think)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        futures = []
+        for name, seconds in phases:
+            outage = name == "outage"
+            fake.error_rate = 1.0 if outage else 0.0
+            fake.latency = slow_failure if outage else latency
+            calls_before = fake.calls
+            phase["name"] = name
+            if not futures:
+                futures = [pool.submit(run_client, i) for i in range(clients)]
+            time.sleep(seconds)
+            results[name] = {"gemini_calls": fake.calls - calls_before}
+        stop.set()
+    for name, _ in phases:
+        latencies = [elapsed for phase_name, elapsed, _ in records if phase_name == name]
+        fallbacks = sum(1 for phase_name, _, fallback in records if phase_name == name and fallback)
+        results[name].update({
+            "turns": len(latencies),
+            "fallback_replies": fallbacks,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        })
+    results["breaker_trips"] = client.breaker.trips
+    return results
+
+
+# Calls issued as fast as possible; the limiter should hold them to the configured rate
+def rate_limit_scenario(fake, rate_per_minute, burst, calls, clients):
+    fake.error_rate = 0.0
+    fake.latency = 0.01
+    client = GeminiClient(lambda: chat.genai.GenerativeModel, rate_per_minute=rate_per_minute, burst=burst,
+                          queue_timeout=60)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(lambda _: client.generate("سلام"), range(calls)))
+    elapsed = time.perf_counter() - started
+    return {
+        "configured_per_minute": rate_per_minute,
+        "burst": burst,
+        "calls": calls,
+        # The saved-up burst goes out at once; the rest is paced by the refill rate
+        "achieved_per_minute": round((calls - burst) / elapsed * 60, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini client behaviour during an outage and under a quota")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--slow-failure-ms", type=float, default=1000, help="time before a call fails in the outage")
+    parser.add_argument("--think-ms", type=float, default=50, help="pause between a client's turns")
+    parser.add_argument("--phase-seconds", type=float, default=4)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    fake = fake_genai.install(chat.genai, fake_genai.canned_responder(chat.symptom_names))
+    chat.response_cache = None
+    phases = [("healthy", args.phase_seconds), ("outage", args.phase_seconds * 2), ("recovered", args.phase_seconds)]
+    latency, slow_failure, think = args.latency_ms / 1000, args.slow_failure_ms / 1000, args.think_ms / 1000
+
+    results = {
+        # No retries and a breaker that never opens: every turn waits for a failing call
+        "unprotected": outage_scenario(
+            fake, GeminiClient(lambda: chat.genai.GenerativeModel, max_retries=0, breaker_threshold=10 ** 9),
+            phases, args.clients, latency, slow_failure, think,
+        ),
+        "protected": outage_scenario(
+            fake, GeminiClient(lambda: chat.genai.GenerativeModel, max_retries=1, backoff_base=0.05,
+                               breaker_threshold=5, breaker_reset_seconds=args.phase_seconds / 2),
+            phases, args.clients, latency, slow_failure, think,
+        ),
+        "rate_limit": rate_limit_scenario(fake, rate_per_minute=600, burst=5, calls=60, clients=16),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
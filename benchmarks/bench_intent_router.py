@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chat  # noqa: E402
+from benchmarks.golden_conversations import CONVERSATIONS  # noqa: E402
+
+
+# The per-message scans process_user_input did before the intent router
+def legacy_scan(user_input):
+    clean = user_input.lower().replace("\u200c", "")
+    return [
+        any(word == clean for word in chat.goodbye_keywords),
+        any(word in clean for word in chat.thanks_keywords),
+        any(word in clean for word in chat.goodbye_keywords),
+        any(word in clean for word in chat.question_indicators),
+        any(word in clean for word in chat.positive_keywords),
+        any(word in clean for word in chat.negative_keywords),
+        any(word in clean for word in chat.invalid_response_keywords),
+        re.search(r'قند\s*(?:خون)?\s*(?:ناشتا(?:ی من|م)?)?\s*(?:من|م)?\s*(\d{2,3})|قند\b.*?\b(\d+)\b', clean),
+        re.search(r'(\d+)\s*سال', user_input, re.IGNORECASE),
+        re.search(r'\b(\d+)\b(?!\s*%)', clean),
+        any(g in clean for g in chat.female_keywords),
+        any(g in clean for g in chat.male_keywords),
+        any(re.search(pattern, clean) for pattern in chat.unrelated_symptom_patterns),
+        "علائمی ندارم" in clean or "هیچ علامتی" in clean,
+        any(keyword in clean for keyword in chat.test_intent_keywords),
+        clean == "سوال",
+        clean in chat.greeting_phrases,
+    ]
+
+
+def time_per_message(fn, messages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            fn(message)
+    return (time.perf_counter() - start) / (rounds * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-message routing cost: intent router vs legacy keyword scans")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    messages = [message for conversation in CONVERSATIONS for message in conversation]
+    results = {
+        "messages": len(messages),
+        "legacy_us_per_message": round(time_per_message(legacy_scan, messages, args.rounds), 2),
+        "router_us_per_message": round(time_per_message(chat.intent_router.route, messages, args.rounds), 2),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chat  # noqa: E402
+from benchmarks import fake_genai  # noqa: E402
+from llm_pipeline import LLMPipeline  # noqa: E402
+
+# A question that also looks symptom-like without a lexicon match: needs both Gemini calls
+TWO_CALL_MESSAGE = "یه مشکلی دارم که نمیدونم چیه؟"
+
+
+def fake_responder(prompt):
+    if "آرایه 0 و 1" in prompt:
+        return str([0] * len(chat.symptom_names))
+    return "پاسخ آزمایشی"
+
+
+def run_turns(turns, concurrency):
+    def one_turn(i):
+        user_id = f"bench-{i}"
+        chat.reset_user_state(user_id)
+        start = time.perf_counter()
+        chat.process_user_input(TWO_CALL_MESSAGE, user_id)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(one_turn, range(turns)))
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turn latency with sequential vs concurrent Gemini calls")
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--turns", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    fake_genai.install(chat.genai, fake_responder, latency=args.latency_ms / 1000)
+    chat.response_cache = None
+
+    results = {"gemini_latency_ms": args.latency_ms}
+    chat.llm_pipeline = None
+    results["sequential"] = run_turns(args.turns, args.concurrency)
+
+    chat.llm_pipeline = LLMPipeline(max_workers=64, deadline_seconds=5)
+    results["pipeline"] = run_turns(args.turns, args.concurrency)
+
+    # Deadline shorter than the Gemini latency: the canned reply is served instead
+    chat.llm_pipeline = LLMPipeline(max_workers=64, deadline_seconds=args.latency_ms / 2000)
+    results["pipeline_deadline_hit"] = run_turns(args.turns, args.concurrency)
+    results["pipeline_deadline_hit"]["timeouts"] = chat.llm_pipeline.stats()["timeouts"]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chat  # noqa: E402
+from benchmarks import fake_genai  # noqa: E402
+from benchmarks.conversation_generator import STAGES, generate_conversations, reply_matches  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CANNED_REPLY = "پاسخ آزمایشی"
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+# Send turns straight to chat.process_user_input (no HTTP)
+class InProcessClient:
+    def __init__(self, conversation_id):
+        self.user_id = f"load-{conversation_id}"
+        chat.reset_user_state(self.user_id)
+
+    def send(self, message):
+        return chat.process_user_input(message, self.user_id)
+
+
+# POST turns to /get_response with one cookie jar (session) per conversation
+class HTTPClient:
+    def __init__(self, conversation_id, url):
+        self.url = url.rstrip("/") + "/get_response"
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def send(self, message):
+        body = urllib.parse.urlencode({"message": message}).encode()
+        with self.opener.open(self.url, body, timeout=60) as response:
+            return json.load(response)["response"]
+
+
+def run_load(conversations, concurrency, make_client):
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    unexpected = defaultdict(int)
+    lock = threading.Lock()
+
+    def run_conversation(item):
+        index, turns = item
+        client = make_client(index)
+        for stage, message in turns:
+            start = time.perf_counter()
+            try:
+                reply = client.send(message)
+            except Exception:
+                with lock:
+                    errors[stage] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            ok = reply_matches(stage, reply, chat.questions, CANNED_REPLY, chat.GEMINI_FALLBACK_REPLY)
+            with lock:
+                samples[stage].append(elapsed)
+                if not ok:
+                    unexpected[stage] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run_conversation, enumerate(conversations)))
+    wall = time.perf_counter() - started
+
+    stages = {}
+    for stage in STAGES:
+        latencies = sorted(samples.get(stage, []))
+        if not latencies and not errors.get(stage):
+            continue
+        stages[stage] = {
+            "requests": len(latencies),
+            "errors": errors.get(stage, 0),
+            "unexpected_replies": unexpected.get(stage, 0),
+            "p50_ms": _ms(percentile(latencies, 50)),
+            "p95_ms": _ms(percentile(latencies, 95)),
+            "p99_ms": _ms(percentile(latencies, 99)),
+            "requests_per_second": round(len(latencies) / wall, 1),
+        }
+    everything = sorted(latency for values in samples.values() for latency in values)
+    return {
+        "concurrency": concurrency,
+        "conversations": len(conversations),
+        "wall_seconds": round(wall, 2),
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "unexpected_replies": sum(unexpected.values()),
+        "p50_ms": _ms(percentile(everything, 50)),
+        "p95_ms": _ms(percentile(everything, 95)),
+        "p99_ms": _ms(percentile(everything, 99)),
+        "requests_per_second": round(len(everything) / wall, 1),
+        "stages": stages,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Print p95 changes against an earlier results file; returns the regressions beyond tolerance
+# (changes under min_delta_ms are noise for sub-millisecond stages and never count)
+def compare(results, baseline, tolerance, min_delta_ms=1.0):
+    regressions = []
+    previous = {run["concurrency"]: run for run in baseline["runs"]}
+    for run in results["runs"]:
+        before = previous.get(run["concurrency"])
+        if before is None:
+            continue
+        for stage, stats in run["stages"].items():
+            old = before["stages"].get(stage, {}).get("p95_ms")
+            new = stats["p95_ms"]
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change > tolerance and new - old > min_delta_ms
+            marker = "  REGRESSION" if regressed else ""
+            print(f"c={run['concurrency']:<4} {stage:<26} p95 {old:9.2f} -> {new:9.2f} ms ({change:+.0%}){marker}")
+            if regressed:
+                regressions.append((run["concurrency"], stage))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency and throughput of the chat with a fake Gemini")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", default="1,8,32", help="comma separated client counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=300, help="fake Gemini time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of Gemini calls that fail")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of unparseable symptom arrays")
+    parser.add_argument("--url", help="load test a running server (started with benchmarks/gunicorn_bench.conf.py) "
+                                      "instead of calling process_user_input in this process")
+    parser.add_argument("--cache", action="store_true", help="keep the Gemini response cache enabled")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare p95 latencies with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="p95 increase reported as a regression")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    if args.url:
+        make_client = lambda index: HTTPClient(index, args.url)  # noqa: E731
+    else:
+        fake_genai.install(
+            chat.genai,
+            fake_genai.canned_responder(chat.symptom_names, CANNED_REPLY, malformed_rate=args.malformed_rate),
+            latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, error_rate=args.error_rate,
+        )
+        if not args.cache:
+            chat.response_cache = None
+        chat.start_background_workers()
+        make_client = InProcessClient
+
+    conversations = generate_conversations(args.conversations, args.seed)
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target": args.url or "in-process",
+        "config": {
+            key: getattr(args, key) for key in (
+                "conversations", "seed", "latency_ms", "jitter_ms", "error_rate", "malformed_rate", "cache",
+            )
+        },
+        "runs": [],
+    }
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        run = run_load(conversations, concurrency, make_client)
+        results["runs"].append(run)
+        print(f"concurrency={concurrency}: {run['requests_per_second']} req/s, p50 {run['p50_ms']} ms, "
+              f"p95 {run['p95_ms']} ms, p99 {run['p99_ms']} ms, {run['errors']} errors, "
+              f"{run['unexpected_replies']} unexpected replies")
+        for stage, stats in run["stages"].items():
+            print(f"  {stage:<26} n={stats['requests']:<5} p50 {stats['p50_ms']:>9} p95 {stats['p95_ms']:>9} "
+                  f"p99 {stats['p99_ms']:>9} ms  {stats['requests_per_second']:>7} req/s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(f"{len(regressions)} stage(s) regressed by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chat  # noqa: E402
+from benchmarks import fake_genai  # noqa: E402
+from questionnaire import AdaptiveQuestionnaire  # noqa: E402
+
+
+# Synthetic patients: a latent risk drives how many symptoms they answer "yes" to, so the
+# answer sets range from clearly healthy to clearly diabetic with a band of borderline ones
+def generate_answer_sets(count, seed=0, fbs_rate=0.1):
+    rng = random.Random(seed)
+    answer_sets = []
+    for _ in range(count):
+        risk = rng.random()
+        answer_sets.append({
+            "age": rng.randint(18, 85),
+            "gender": rng.randint(0, 1),
+            "fasting_blood_sugar": rng.choice([65, 110, 140]) if rng.random() < fbs_rate else None,
+            "answers": [int(rng.random() < 0.1 + 0.7 * risk) for _ in chat.symptom_names],
+        })
+    return answer_sets
+
+
+# One questionnaire through process_user_input; returns (questions asked, final reply)
+def replay(answer_set, user_id):
+    chat.reset_user_state(user_id)
+    gender = "آقا" if answer_set["gender"] else "خانم"
+    chat.process_user_input(f"{answer_set['age']} سال، {gender}", user_id)
+    if answer_set["fasting_blood_sugar"] is not None:
+        chat.process_user_input(f"قند خون ناشتا {answer_set['fasting_blood_sugar']}", user_id)
+    reply = chat.process_user_input("سوال", user_id)
+    asked = 0
+    while reply in chat.questions:
+        asked += 1
+        answer = answer_set["answers"][chat.questions.index(reply)]
+        reply = chat.process_user_input("بله" if answer else "نه", user_id)
+    return asked, reply
+
+
+def run_mode(answer_sets, questionnaire, reference=None):
+    chat.adaptive_questionnaire = questionnaire
+    started = time.perf_counter()
+    results = [replay(answer_set, f"questionnaire-{i}") for i, answer_set in enumerate(answer_sets)]
+    elapsed = time.perf_counter() - started
+    asked = sorted(count for count, _ in results)
+    total = len(chat.questions) * len(answer_sets)
+    summary = {
+        "sessions": len(answer_sets),
+        "avg_questions": round(sum(asked) / len(asked), 2),
+        "p50_questions": asked[len(asked) // 2],
+        "max_questions": asked[-1],
+        "questions_saved_pct": round(100 * (1 - sum(asked) / total), 1),
+        "ms_per_session": round(elapsed / len(answer_sets) * 1000, 3),
+    }
+    if reference is not None:
+        summary["verdict_mismatches"] = sum(
+            1 for (_, reply), (_, expected) in zip(results, reference) if reply != expected
+        )
+    return summary, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Questions asked per session: full vs adaptive questionnaire")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fbs-rate", type=float, default=0.1, help="fraction of patients who give a blood sugar")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    fake_genai.install(chat.genai, lambda prompt: "پاسخ آزمایشی")
+    chat.response_cache = None
+    answer_sets = generate_answer_sets(args.sessions, args.seed, args.fbs_rate)
+
+    full, reference = run_mode(answer_sets, None)
+    results = {"full": full}
+    for order in AdaptiveQuestionnaire.ORDERS:
+        questionnaire = AdaptiveQuestionnaire(
+            chat.profile_probabilities, len(chat.symptom_names), threshold=chat.LIKELY_PROBABILITY, order=order,
+        )
+        results[order], _ = run_mode(answer_sets, questionnaire, reference)
+        results[order]["cached_profiles"] = questionnaire.stats()["cached_profiles"]
+    print(json.dumps(results, indent=2))
+    if any(results[order]["verdict_mismatches"] for order in AdaptiveQuestionnaire.ORDERS):
+        sys.exit("Adaptive questionnaire changed a verdict")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from session_store import SessionStore, StateSchema  # noqa: E402
+
+SYMPTOM_NAMES = [
+    "پرادراری", "عطش", "کاهش وزن", "ضعف", "پرخوری", "عفونت قارچی", "تاری دید",
+    "خارش", "عصبانیت", "تأخیر در بهبود", "فلج جزئی", "درد عضلانی", "ریزش مو", "چاقی"
+]
+QUESTIONS = tuple(f"سؤال {i}؟" for i in range(len(SYMPTOM_NAMES)))
+
+
+# The per-user dict chat.py used to create for every session
+def legacy_state():
+    return {
+        "age": None,
+        "gender": None,
+        "symptoms": [],
+        "fasting_blood_sugar": None,
+        "waiting_for_questions": False,
+        "current_question_index": 0,
+        "current_symptoms": [],
+        "prediction_done": False,
+        "questions": list(QUESTIONS),
+        "previous_symptoms": [],
+        "expecting_age": False,
+    }
+
+
+# A session abandoned after one message with age, gender and two symptoms
+def abandon_legacy(store, user_id):
+    state = legacy_state()
+    state.update(age=42, gender=1)
+    state["symptoms"] += ["پرادراری", "عطش"]
+    state["previous_symptoms"] += ["پرادراری", "عطش"]
+    store[user_id] = state
+
+
+def abandon_compact(store, user_id):
+    state = store.get_or_create(user_id)
+    state["age"], state["gender"] = 42, 1
+    for name in ("پرادراری", "عطش"):
+        state.add_symptom(name)
+        state.add_previous_symptom(name)
+
+
+def measure(sessions, setup, abandon):
+    user_ids = [str(uuid.uuid4()) for _ in range(sessions)]
+    tracemalloc.start()
+    store = setup()
+    for user_id in user_ids:
+        abandon(store, user_id)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"live_sessions": len(store), "bytes": current, "bytes_per_abandoned_session": round(current / sessions, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory held by abandoned sessions")
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--max-entries", type=int, default=10000)
+    args = parser.parse_args()
+
+    schema = StateSchema(SYMPTOM_NAMES, QUESTIONS)
+    results = {
+        "sessions": args.sessions,
+        "legacy_dict": measure(args.sessions, dict, abandon_legacy),
+        "compact_unbounded": measure(
+            args.sessions, lambda: SessionStore(schema, max_entries=args.sessions), abandon_compact
+        ),
+        "compact_bounded": measure(
+            args.sessions, lambda: SessionStore(schema, max_entries=args.max_entries), abandon_compact
+        ),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
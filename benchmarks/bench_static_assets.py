@@ -0,0 +1,142 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chat  # noqa: E402
+from asset_pipeline import AssetManifest, build  # noqa: E402
+
+ASSET_PATTERN = re.compile(r"""(?:src=["']|url\(['"]?)(/(?:static|assets)/[^"')]+)""")
+MODEL_PATTERN = re.compile(r"(full|preview): (\"[^\"]*\"|null)")
+BROWSER_ENCODINGS = "gzip, deflate, br"
+
+
+# What the page makes the browser fetch: the stylesheet image and scripts, then the model
+# the loader shows first (the preview when there is one) and the model it swaps in
+def page_assets(html):
+    assets = ASSET_PATTERN.findall(html)
+    models = {key: json.loads(value) for key, value in MODEL_PATTERN.findall(html)}
+    first = models.get("preview") or models["full"]
+    later = [models["full"]] if first != models["full"] else []
+    return assets, first, later
+
+
+# A browser with an HTTP cache: fresh entries (max-age) cost nothing, stale ones are revalidated
+class Browser:
+    def __init__(self, client):
+        self.client = client
+        self.cache = {}
+        self.requests = 0
+        self.not_modified = 0
+
+    def fetch(self, url):
+        entry = self.cache.get(url)
+        if entry is not None and entry["fresh"]:
+            return 0, 0
+        headers = {"Accept-Encoding": BROWSER_ENCODINGS}
+        if entry is not None and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        response = self.client.get(url, headers=headers)
+        self.requests += 1
+        body = len(response.get_data())
+        if response.status_code == 304:
+            self.not_modified += 1
+        else:
+            self.cache[url] = {
+                "etag": response.headers.get("ETag"),
+                "fresh": bool(response.cache_control.max_age),
+            }
+        return 1, body
+
+
+# Page load on a link with the given bandwidth and round-trip time: the HTML, then its
+# subresources in parallel (sharing the link), then the first model once the loader runs.
+# Returns bytes transferred and the seconds until the first model is on screen and
+# until the full model is.
+def visit(browser, bandwidth_bps, rtt):
+    def cost(fetches):
+        round_trips = max((trips for trips, _ in fetches), default=0)
+        transferred = sum(size for _, size in fetches)
+        return round_trips * rtt + transferred * 8 / bandwidth_bps, transferred
+
+    response = browser.client.get("/", headers={"Accept-Encoding": BROWSER_ENCODINGS})
+    html = response.get_data(as_text=True)
+    assets, first, later = page_assets(html)
+    seconds, transferred = cost([(1, len(html))])
+    for stage in ([browser.fetch(url) for url in assets], [browser.fetch(first)]):
+        stage_seconds, stage_bytes = cost(stage)
+        seconds += stage_seconds
+        transferred += stage_bytes
+    model_seconds = seconds
+    if later:
+        stage_seconds, stage_bytes = cost([browser.fetch(url) for url in later])
+        seconds += stage_seconds
+        transferred += stage_bytes
+    return {
+        "bytes": transferred,
+        "first_model_s": round(model_seconds, 2),
+        "full_model_s": round(seconds, 2),
+    }
+
+
+def run(manifest, bandwidth_bps, rtt):
+    chat.asset_manifest = manifest
+    browser = Browser(chat.app.test_client())
+    first = visit(browser, bandwidth_bps, rtt)
+    requests, browser.requests = browser.requests, 0
+    repeat = visit(browser, bandwidth_bps, rtt)
+    return {
+        "first_visit": {**first, "asset_requests": requests},
+        "repeat_visit": {**repeat, "asset_requests": browser.requests, "not_modified": browser.not_modified},
+    }
+
+
+# Range requests must get the identity bytes at the right offsets, whatever the client accepts
+def check_ranges(manifest):
+    client = chat.app.test_client()
+    ok = True
+    for entry in manifest.assets.values():
+        with open(os.path.join(manifest.build_dir, entry["file"]), "rb") as f:
+            expected = f.read()[100:200]
+        response = client.get(f"/assets/{entry['file']}", headers={
+            "Accept-Encoding": BROWSER_ENCODINGS, "Range": "bytes=100-199",
+        })
+        ok &= (response.status_code == 206 and "Content-Encoding" not in response.headers
+               and response.get_data() == expected)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes and load time of the page's static assets, before and after the build")
+    parser.add_argument("--build-dir", help="use an existing build instead of building into a temporary directory")
+    parser.add_argument("--bandwidth-mbps", type=float, default=1.6, help="modelled link (default: slow mobile)")
+    parser.add_argument("--rtt-ms", type=float, default=150)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    bandwidth_bps, rtt = args.bandwidth_mbps * 1e6, args.rtt_ms / 1000
+    with tempfile.TemporaryDirectory() as directory:
+        build_dir = args.build_dir
+        if build_dir is None:
+            build_dir = os.path.join(directory, "build")
+            build(build_dir=build_dir)
+        results = {
+            "link": {"bandwidth_mbps": args.bandwidth_mbps, "rtt_ms": args.rtt_ms},
+            "plain_static": run(AssetManifest(os.path.join(directory, "missing")), bandwidth_bps, rtt),
+        }
+        built = AssetManifest(build_dir)
+        results["built_assets"] = run(built, bandwidth_bps, rtt)
+        results["built_assets"]["served"] = built.stats()
+        results["range_requests_ok"] = check_ranges(built)
+    print(json.dumps(results, indent=2))
+    if not results["range_requests_ok"]:
+        sys.exit("A range request returned the wrong bytes")
+
+
+if __name__ == "__main__":
+    main()
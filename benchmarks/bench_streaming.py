@@ -0,0 +1,91 @@
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chat  # noqa: E402
+from benchmarks import fake_genai  # noqa: E402
+
+QUESTION = "دیابت ارثی است؟"
+REPLY = "دیابت نوع ۲ زمینه ژنتیکی قوی دارد، اما سبک زندگی هم نقش مهمی دارد. " * 6
+
+
+def fake_responder(prompt):
+    if "آرایه 0 و 1" in prompt:
+        return str([0] * len(chat.symptom_names))
+    return REPLY
+
+
+# POST one message; returns (time to first body byte, total time, reply text)
+def timed_post(opener, url, message):
+    body = urllib.parse.urlencode({"message": message}).encode()
+    start = time.perf_counter()
+    with opener.open(url, body, timeout=30) as response:
+        first = response.read(1)
+        ttfb = time.perf_counter() - start
+        rest = response.read()
+    total = time.perf_counter() - start
+    return ttfb, total, (first + rest).decode("utf-8")
+
+
+def streamed_text(payload):
+    text = ""
+    for block in payload.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "data" not in lines:
+            continue
+        data = json.loads(lines["data"])
+        if lines.get("event") == "done":
+            return text, data["response"]
+        text = data["response"] if lines.get("event") == "replace" else text + data["chunk"]
+    return text, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first byte: JSON reply vs SSE streaming")
+    parser.add_argument("--first-token-ms", type=float, default=400)
+    parser.add_argument("--chunk-delay-ms", type=float, default=60)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--port", type=int, default=5077)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    fake_genai.install(chat.genai, fake_responder, latency=args.first_token_ms / 1000,
+                       chunk_delay=args.chunk_delay_ms / 1000, chunk_size=24)
+    chat.response_cache = None
+    server = make_server("127.0.0.1", args.port, chat.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = {}
+    try:
+        for path in ("/get_response", "/get_response_stream"):
+            opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+            ttfbs, totals = [], []
+            for _ in range(args.rounds):
+                ttfb, total, payload = timed_post(opener, f"http://127.0.0.1:{args.port}{path}", QUESTION)
+                ttfbs.append(ttfb)
+                totals.append(total)
+                if path.endswith("stream"):
+                    text, final = streamed_text(payload)
+                    assert text.rstrip() == final == REPLY.strip(), "streamed text differs from the final reply"
+            results[path] = {
+                "ttfb_ms": round(sorted(ttfbs)[len(ttfbs) // 2] * 1000, 1),
+                "total_ms": round(sorted(totals)[len(totals) // 2] * 1000, 1),
+            }
+    finally:
+        server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chat  # noqa: E402
+from benchmarks import fake_genai  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "symptom_corpus.jsonl")
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# Gemini stand-in answering with the gold labels of the corpus message found in the prompt
+def oracle_responder(corpus):
+    labels = {row["text"]: row["symptoms"] for row in corpus}
+
+    def respond(prompt):
+        text = prompt.split('"')[1] if '"' in prompt else ""
+        gold = labels.get(text, [])
+        return str([1 if name in gold else 0 for name in chat.symptom_names])
+
+    return respond
+
+
+def evaluate(detect, corpus):
+    tp = fp = fn = 0
+    latencies = []
+    for row in corpus:
+        start = time.perf_counter()
+        predicted = set(detect(row["text"]))
+        latencies.append(time.perf_counter() - start)
+        gold = set(row["symptoms"])
+        tp += len(predicted & gold)
+        fp += len(predicted - gold)
+        fn += len(gold - predicted)
+    latencies.sort()
+    return {
+        "precision": round(tp / (tp + fp), 3) if tp + fp else 1.0,
+        "recall": round(tp / (tp + fn), 3) if tp + fn else 1.0,
+        "mean_latency_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p95_latency_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precision/recall and latency of local vs Gemini symptom detection")
+    parser.add_argument("--gemini-latency-ms", type=float, default=400)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    fake = fake_genai.install(chat.genai, oracle_responder(corpus), latency=args.gemini_latency_ms / 1000)
+
+    results = {"messages": len(corpus)}
+    results["local"] = evaluate(chat.symptom_extractor.extract, corpus)
+    fake.calls = 0
+    results["gemini_stub"] = evaluate(chat.detect_symptoms_with_gemini, corpus)
+    fake.calls = 0
+    results["hybrid"] = evaluate(chat.detect_symptoms, corpus)
+    results["hybrid"]["gemini_calls"] = fake.calls
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODES = {
+    "disabled": {"METRICS": "off"},
+    "histograms": {"METRICS": "on", "TRACE_SLOW_TURNS": "0"},
+    "slow_turn_sampling": {"METRICS": "on", "TRACE_SLOW_TURNS": "20", "TRACE_SAMPLE_RATE": "1"},
+}
+
+
+# Runs in a fresh process per mode, because tracing is configured when chat is imported
+def measure(conversations, rounds):
+    import logging
+    sys.path.insert(0, ROOT)
+    import chat
+    from benchmarks import fake_genai
+    from benchmarks.conversation_generator import generate_conversations
+
+    logging.disable(logging.CRITICAL)
+    fake_genai.install(chat.genai, fake_genai.canned_responder(chat.symptom_names))
+    chat.response_cache = None
+    chat.llm_pipeline = None
+    chat.inference_batcher = None
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for i, conversation in enumerate(generate_conversations(conversations)):
+            user_id = f"trace-{i}"
+            chat.reset_user_state(user_id)
+            for _, message in conversation:
+                chat.process_user_input(message, user_id)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    turns = sum(len(c) for c in generate_conversations(conversations))
+    print(json.dumps({"turns": turns, "us_per_turn": round(best / turns * 1e6, 2)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-turn cost of stage tracing (no Gemini latency)")
+    parser.add_argument("--conversations", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.conversations, args.rounds)
+        return
+
+    results = {}
+    for mode, env in MODES.items():
+        output = subprocess.run(
+            [sys.executable, __file__, "--measure", "--conversations", str(args.conversations),
+             "--rounds", str(args.rounds)],
+            cwd=ROOT, env=dict(os.environ, **env), capture_output=True, text=True, check=True,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
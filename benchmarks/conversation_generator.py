@@ -0,0 +1,139 @@
+import argparse
+import json
+import random
+
+# Scripted conversations for load tests. Every turn is labelled with the dialog stage it
+# exercises in chat.handle_user_input, so latency can be reported per stage.
+STAGES = (
+    "greeting", "free_text", "missing_info", "prediction", "hypoglycemia", "general_question",
+    "unrelated_symptom", "no_symptoms", "start_questionnaire", "questionnaire", "questionnaire_invalid",
+    "questionnaire_explanation", "questionnaire_result", "fallback", "thanks", "goodbye",
+)
+
+# "سلام علکیم" is not an exact greeting and goes to Gemini, so it is not used here
+GREETINGS = ["سلام", "سلام خوبی"]
+FEMALE = ["خانم", "زن", "دختر", "مونث"]
+MALE = ["آقا", "مرد", "پسر", "مذکر"]
+# Symptoms named in free text; "درد عضلانی" is left out because "درد" also routes the
+# message to the unrelated-symptom branch
+SYMPTOMS = [
+    "پرادراری", "عطش", "کاهش وزن", "ضعف", "پرخوری", "عفونت قارچی", "تاری دید",
+    "خارش", "عصبانیت", "تأخیر در بهبود", "فلج جزئی", "ریزش مو", "چاقی",
+]
+QUESTIONNAIRE_LENGTH = 14
+QUESTIONS = ["دیابت ارثی است؟", "چه آزمایشی بدم؟", "دیابت نوع 2 چیه", "کی باید آزمایش بدم", "چرا قند بالا میره؟"]
+UNRELATED = ["سردرد دارم", "حالت تهوع دارم", "درد شکم دارم", "تب دارم", "کمردرد دارم"]
+YES = ["بله", "آره", "دارم", "گاهی", "همیشه", "زیاد"]
+NO = ["نه", "خیر", "ندارم", "اصلا", "هرگز", "کم"]
+INVALID = ["نچ", "نع"]
+EXPLANATIONS = ["یعنی چی؟", "چرا این سوال رو میپرسی؟", "منظورت چیه؟"]
+FALLBACK = ["باشه", "اوکی", "فهمیدم"]
+THANKS = ["ممنون", "متشکرم", "تشکر"]
+GOODBYES = ["خداحافظ", "خدانگهدار", "بای"]
+
+
+def _profile(rng):
+    gender = rng.choice(FEMALE + MALE)
+    symptoms = rng.sample(SYMPTOMS, rng.randint(1, 3))
+    return rng.randint(18, 80), gender, symptoms
+
+
+def _questionnaire(rng, invalid_rate=0.1, explanation_rate=0.1):
+    turns = [("start_questionnaire", "سوال")]
+    for step in range(QUESTIONNAIRE_LENGTH):
+        if rng.random() < invalid_rate:
+            turns.append(("questionnaire_invalid", rng.choice(INVALID)))
+        if rng.random() < explanation_rate:
+            turns.append(("questionnaire_explanation", rng.choice(EXPLANATIONS)))
+        stage = "questionnaire_result" if step == QUESTIONNAIRE_LENGTH - 1 else "questionnaire"
+        turns.append((stage, rng.choice(YES if rng.random() < 0.4 else NO)))
+    return turns
+
+
+# Everything in one message, then the questionnaire
+def _assessment(rng):
+    age, gender, symptoms = _profile(rng)
+    message = f"{age} سال، {gender}، {'، '.join(symptoms)}"
+    turns = [("greeting", rng.choice(GREETINGS)), ("prediction", message)]
+    if rng.random() < 0.5:
+        turns.append(("general_question", rng.choice(QUESTIONS)))
+    turns += _questionnaire(rng)
+    turns += [("thanks", rng.choice(THANKS)), ("goodbye", rng.choice(GOODBYES))]
+    return turns
+
+
+# Age, gender and fasting blood sugar given one at a time
+def _stepwise(rng):
+    age, gender, symptoms = _profile(rng)
+    turns = [
+        ("missing_info", f"{age} سال"),
+        ("free_text", gender),
+        ("prediction", f"قند خون ناشتا {rng.randint(90, 220)}"),
+    ]
+    if rng.random() < 0.5:
+        turns += _questionnaire(rng)
+    turns.append(("goodbye", rng.choice(GOODBYES)))
+    return turns
+
+
+def _questions_only(rng):
+    turns = [("greeting", rng.choice(GREETINGS))]
+    turns += [("general_question", q) for q in rng.sample(QUESTIONS, rng.randint(1, 3))]
+    turns += [("unrelated_symptom", rng.choice(UNRELATED)), ("fallback", rng.choice(FALLBACK))]
+    turns.append(("goodbye", rng.choice(GOODBYES)))
+    return turns
+
+
+def _short(rng):
+    if rng.random() < 0.5:
+        return [("hypoglycemia", f"قند {rng.randint(40, 69)}"), ("thanks", rng.choice(THANKS))]
+    return [("no_symptoms", rng.choice(["علائمی ندارم", "هیچ علامتی ندارم"])), ("goodbye", rng.choice(GOODBYES))]
+
+
+KINDS = ((_assessment, 4), (_stepwise, 2), (_questions_only, 3), (_short, 1))
+
+
+# A list of conversations, each a list of (stage, message) turns; the same seed gives the same list
+def generate_conversations(count, seed=0):
+    rng = random.Random(seed)
+    builders = [builder for builder, weight in KINDS for _ in range(weight)]
+    conversations = [builder(rng) for builder in (builders[i % len(builders)] for i in range(count))]
+    rng.shuffle(conversations)
+    return conversations
+
+
+# Reply checks per stage (given the canned Gemini reply); a failed check means the turn took another branch
+def reply_matches(stage, reply, questions, gemini_reply, fallback_reply):
+    gemini = gemini_reply in reply or fallback_reply in reply
+    checks = {
+        "greeting": lambda: reply.startswith("سلام!"),
+        "missing_info": lambda: reply.startswith("لطفاً"),
+        "prediction": lambda: reply.startswith("بابت اطلاعاتی") or "قند خون" in reply,
+        "hypoglycemia": lambda: "هیپوگلیسمی" in reply,
+        "general_question": lambda: gemini,
+        "unrelated_symptom": lambda: gemini,
+        "no_symptoms": lambda: reply.startswith("به نظر"),
+        "start_questionnaire": lambda: reply == questions[0],
+        "questionnaire": lambda: reply in questions,
+        "questionnaire_invalid": lambda: reply.startswith("لطفاً با بله یا خیر"),
+        "questionnaire_explanation": lambda: gemini,
+        "questionnaire_result": lambda: reply.startswith("بر اساس"),
+        "fallback": lambda: gemini,
+        "thanks": lambda: reply.startswith("خواهش") or reply.startswith("خدانگهدار"),
+        "goodbye": lambda: reply.startswith("خدانگهدار"),
+    }
+    return checks.get(stage, lambda: True)()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print generated load-test conversations as JSON lines")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for conversation in generate_conversations(args.count, args.seed):
+        print(json.dumps([{"stage": stage, "message": message} for stage, message in conversation],
+                         ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
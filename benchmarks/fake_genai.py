@@ -0,0 +1,96 @@
+import random
+import re
+import time
+
+# Marker of the prompt built by chat.detect_symptoms_with_gemini
+SYMPTOM_PROMPT_MARKER = "آرایه 0 و 1"
+_SYMPTOM_PROMPT_TEXT = re.compile(r'"(.*)"\s*فقط خروجی', re.DOTALL)
+
+
+# Raised by the fake for a simulated API failure (quota, 5xx, timeout)
+class FakeGeminiError(Exception):
+    pass
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+# Local stand-in for google.generativeai.GenerativeModel used by the benchmarks.
+# responder(prompt) returns the reply text. latency/jitter (seconds) model the time to
+# the first token; with chunk_delay the reply is produced chunk_size characters at a time,
+# which also applies to non-streaming calls (they return after the last chunk).
+# A fraction error_rate of the calls fails with FakeGeminiError after the latency.
+class FakeGenerativeModel:
+    responder = staticmethod(lambda prompt: "پاسخ آزمایشی")
+    latency = 0.0
+    jitter = 0.0
+    chunk_delay = 0.0
+    chunk_size = 20
+    error_rate = 0.0
+    calls = 0
+    errors = 0
+
+    def __init__(self, model_name="gemini-2.0-flash", **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        type(self).calls += 1
+        text = self.responder(prompt)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+        fail = random.random() < self.error_rate
+        if stream:
+            return self._stream(chunks, fail)
+        self._sleep(self.latency + random.uniform(0, self.jitter))
+        self._maybe_fail(fail)
+        self._sleep(self.chunk_delay * (len(chunks) - 1))
+        return FakeResponse(text)
+
+    def _stream(self, chunks, fail):
+        self._sleep(self.latency + random.uniform(0, self.jitter))
+        self._maybe_fail(fail)
+        for i, chunk in enumerate(chunks):
+            if i:
+                self._sleep(self.chunk_delay)
+            yield FakeResponse(chunk)
+
+    @classmethod
+    def _maybe_fail(cls, fail):
+        if fail:
+            cls.errors += 1
+            raise FakeGeminiError("Simulated Gemini API error")
+
+    @staticmethod
+    def _sleep(delay):
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Canned replies in the formats chat.py parses: symptom detection prompts get the 0/1 array
+# (marking symptom names that appear in the user's text), everything else gets `reply`.
+# A fraction malformed_rate of the arrays is replaced with text that fails to parse.
+def canned_responder(symptom_names, reply="پاسخ آزمایشی", malformed_rate=0.0):
+    def respond(prompt):
+        if SYMPTOM_PROMPT_MARKER not in prompt:
+            return reply
+        if random.random() < malformed_rate:
+            return "متأسفانه نمی‌توانم تشخیص بدهم."
+        match = _SYMPTOM_PROMPT_TEXT.search(prompt)
+        text = match.group(1) if match else ""
+        return str([int(name in text) for name in symptom_names])
+
+    return respond
+
+
+# Replace genai.GenerativeModel in the given module (e.g. chat.genai) with the fake
+def install(genai_module, responder=None, latency=0.0, jitter=0.0, chunk_delay=0.0, chunk_size=20, error_rate=0.0):
+    attrs = {
+        "latency": latency, "jitter": jitter, "chunk_delay": chunk_delay, "chunk_size": chunk_size,
+        "error_rate": error_rate, "calls": 0, "errors": 0,
+    }
+    if responder is not None:
+        attrs["responder"] = staticmethod(responder)
+    fake = type("FakeGenerativeModel", (FakeGenerativeModel,), attrs)
+    genai_module.GenerativeModel = fake
+    return fake
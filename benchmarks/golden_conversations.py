@@ -0,0 +1,102 @@
+import argparse
+import copy
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chat  # noqa: E402
+from benchmarks import fake_genai  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_conversations.jsonl")
+
+YES_NO = ["بله", "نه", "آره", "خیر", "دارم", "ندارم", "گاهی", "اصلا", "همیشه", "هرگز", "زیاد", "کم", "بله", "نه"]
+
+CONVERSATIONS = [
+    ["سلام", "30 سال، آقا، پرادراری", "سوال"] + YES_NO,
+    ["سلام خوبی", "قند خون ناشتا 130", "45", "خانم", "سوال"] + ["بله"] * 14,
+    ["سلام علکیم", "دیابت ارثی است؟", "چه آزمایشی بدم؟", "خداحافظ"],
+    ["تست دیابت", "35 سال", "مرد", "تست دیابت"] + ["نه"] * 5 + ["پرادراری یعنی چی؟", "نع", "نچ", "باشه"] + ["نه"] * 9,
+    ["قند 65", "ممنون", "ممنون خداحافظ"],
+    ["قند خون من 110", "28 ساله", "دختر هستم", "عطش دارم"],
+    ["سردرد دارم", "حالت تهوع", "درد شکم دارم", "تب دارم"],
+    ["علائمی ندارم"],
+    ["هیچ علامتی ندارم", "بای"],
+    ["60 ساله آقا هستم زیاد ادرار میکنم و زخمم دیر خوب میشه", "سوال", "چرا این سوال رو میپرسی؟"] + YES_NO,
+    ["زن ۵۲ ساله، تشنگی و تاری دید و خارش", "52 سال", "سوال"] + YES_NO[::-1],
+    ["پسر 17 ساله", "قند ناشتای من 140", "بعدا می‌بینمت", "خدانگهدار"],
+    ["سوال", "40", "آقا", "سوال", "بله", "متشکرم"],
+    ["فشار خون بالا دارم", "50%", "قند 200", "مذکر", "45 سال"],
+    ["?", "؟", "نمیدونم", "کی باید آزمایش بدم", "چقدره "],
+    ["دیابت نوع 2 چیه", "می‌خوام تست کنم", "70 سال", "مونث", "سوال"] + ["بعضی وقتا"] * 7 + ["تقریباً نه"] * 7,
+    ["120", "قند 99", "برام پیش اومده", "خداحافظ"],
+    ["آقا 33 سال عصبی هستم", "یه مشکلی دارم", "دیابت دارم؟", "تشخیص دیابت"],
+]
+
+
+def fake_responder(prompt):
+    if "آرایه 0 و 1" in prompt:
+        return str([0] * len(chat.symptom_names))
+    context = "symptom_explanation" if "سؤال اصلی" in prompt else "general"
+    return f"GEMINI[{context}]"
+
+
+# Run every conversation through process_user_input and return the transcripts
+def run_conversations(conversations=CONVERSATIONS):
+    fake_genai.install(chat.genai, fake_responder)
+    transcripts = []
+    for i, messages in enumerate(conversations):
+        user_id = f"golden-{i}"
+        chat.reset_user_state(user_id)
+        turns = []
+        for message in messages:
+            response = chat.process_user_input(message, user_id)
+            state = chat.user_data[user_id]
+            turns.append({
+                "message": message,
+                "response": response,
+                "state": {
+                    key: copy.copy(state[key]) for key in (
+                        "age", "gender", "symptoms", "fasting_blood_sugar", "waiting_for_questions",
+                        "current_question_index", "current_symptoms", "prediction_done", "expecting_age",
+                    )
+                },
+            })
+        transcripts.append({"conversation": i, "turns": turns})
+    return transcripts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded conversations and compare with the golden file")
+    parser.add_argument("--record", action="store_true", help="overwrite the golden file with the current behaviour")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    transcripts = run_conversations()
+    if args.record:
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            for transcript in transcripts:
+                f.write(json.dumps(transcript, ensure_ascii=False) + "\n")
+        print(f"Recorded {len(transcripts)} conversations to {GOLDEN_PATH}")
+        return
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        golden = [json.loads(line) for line in f if line.strip()]
+    mismatches = 0
+    for expected, actual in zip(golden, transcripts):
+        for turn, (want, got) in enumerate(zip(expected["turns"], actual["turns"])):
+            if want != got:
+                mismatches += 1
+                print(f"Conversation {expected['conversation']} turn {turn} differs:")
+                print(f"  expected: {json.dumps(want, ensure_ascii=False)}")
+                print(f"  actual:   {json.dumps(got, ensure_ascii=False)}")
+    turns = sum(len(t["turns"]) for t in golden)
+    if mismatches or len(golden) != len(transcripts):
+        sys.exit(f"{mismatches} of {turns} turns differ from the golden conversations")
+    print(f"All {turns} turns in {len(golden)} conversations match the golden file")
+
+
+if __name__ == "__main__":
+    main()
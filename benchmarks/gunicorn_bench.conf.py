@@ -0,0 +1,21 @@
+# gunicorn.conf.py plus a local Gemini stand-in in every worker (for load tests)
+import os
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "gunicorn.conf.py")) as f:
+    exec(f.read())
+
+_base_post_fork = post_fork  # noqa: F821
+
+
+def post_fork(server, worker):
+    _base_post_fork(server, worker)
+    import chat
+    from benchmarks import fake_genai
+    chat.startup.wait(60)  # with STARTUP_MODE=background the SDK is still loading
+    fake_genai.install(
+        chat.genai,
+        fake_genai.canned_responder(chat.symptom_names),
+        latency=float(os.environ.get("FAKE_GEMINI_LATENCY_MS", "50")) / 1000,
+        jitter=float(os.environ.get("FAKE_GEMINI_JITTER_MS", "0")) / 1000,
+        error_rate=float(os.environ.get("FAKE_GEMINI_ERROR_RATE", "0")),
+    )
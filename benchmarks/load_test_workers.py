@@ -0,0 +1,88 @@
+import argparse
+import http.cookiejar
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+YES_NO = ["بله", "نه", "آره", "خیر", "دارم", "ندارم", "گاهی", "اصلا", "همیشه", "هرگز", "زیاد", "کم", "بله", "نه"]
+QUESTIONS_START = "آیا بیش از حد معمول ادرار می‌کنید؟"
+CONVERSATION = ["30 سال، آقا، پرادراری", "دیابت ارثی است؟", "سوال"] + YES_NO
+
+
+def start_server(workers, port, threads, db_path, latency_ms):
+    env = dict(
+        os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads), PORT=str(port),
+        SESSION_BACKEND="sqlite", SESSION_DB_PATH=db_path, RESPONSE_CACHE="off",
+        FAKE_GEMINI_LATENCY_MS=str(latency_ms), SECRET_KEY="load-test",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "benchmarks/gunicorn_bench.conf.py", "wsgi:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("gunicorn did not become healthy")
+
+
+# One client: a full conversation over its own cookie jar; returns (requests, consistent)
+def run_conversation(port):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    replies = []
+    for message in CONVERSATION:
+        body = urllib.parse.urlencode({"message": message}).encode()
+        with opener.open(f"http://127.0.0.1:{port}/get_response", body, timeout=30) as response:
+            replies.append(json.load(response)["response"])
+    consistent = replies[2] == QUESTIONS_START and replies[-1].startswith("بر اساس")
+    return len(replies), consistent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and session consistency across gunicorn workers")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--conversations", type=int, default=48)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+
+    results = []
+    for workers in [int(w) for w in args.workers.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            server = start_server(workers, args.port, args.threads, os.path.join(tmp, "sessions.sqlite3"),
+                                  args.latency_ms)
+            try:
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.clients) as pool:
+                    outcomes = list(pool.map(lambda _: run_conversation(args.port), range(args.conversations)))
+                elapsed = time.perf_counter() - start
+            finally:
+                server.terminate()
+                server.wait()
+        requests = sum(count for count, _ in outcomes)
+        results.append({
+            "workers": workers,
+            "threads_per_worker": args.threads,
+            "requests": requests,
+            "requests_per_second": round(requests / elapsed, 1),
+            "inconsistent_conversations": sum(1 for _, ok in outcomes if not ok),
+        })
+        print(json.dumps(results[-1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,310 @@
-from flask import Flask, render_template, request, jsonify, session
+from startup import Startup, STARTUP_MODES  # first, so the startup timings include every import
+from flask import Flask, Response, g, render_template, request, jsonify, session, stream_with_context
+import io
 import numpy as np
 import os
 import logging
-import re
+import ast
+import atexit
+import contextvars
+import functools
+import time
+import threading
 from datetime import datetime
-import tensorflow as tf
-import google.generativeai as genai
 import uuid
+from batching import InferenceBatcher
+from numpy_model import load_mlp_model
+from symptom_extractor import SYMPTOM_NAMES, SymptomExtractor
+from intent_router import IntentRouter
+from response_cache import ResponseCache
+from llm_pipeline import LLMPipeline, current_deadline
+from gemini_client import GeminiClient, GeminiUnavailable
+from session_store import SessionConflict, StateSchema
+from session_backend import create_session_backend
+import reply_stream
+from metrics import MetricsRegistry, Tracer
+from batch_scoring import (
+    BatchScorer, DIABETES_FBS, HIGH_BLOOD_SUGAR_PROBABILITY, HYPOGLYCEMIA_FBS, LIKELY_PROBABILITY, detect_format,
+)
+from lookup_table import ProbabilityTable, LazyProbabilityTable, TABLE_PATH, pack_mask_key, verify_table
+from questionnaire import AdaptiveQuestionnaire
+from assessment_log import AssessmentLog
+from asset_pipeline import AssetManifest
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# STARTUP_MODE=background serves the page, static assets and liveness checks right away and
+# loads the Gemini SDK and the model on a thread; eager loads them before serving anything
+startup_mode = os.environ.get("STARTUP_MODE", "eager")
+if startup_mode not in STARTUP_MODES:
+    logging.error(f"Unknown STARTUP_MODE: {startup_mode}")
+    startup_mode = "eager"
+startup = Startup(startup_mode)
+startup.mark("imports")
+# Longest a request that needs the model waits for it before getting a 503
+READINESS_WAIT_SECONDS = float(os.environ.get("READINESS_WAIT_SECONDS", "20"))
+
 app = Flask(__name__)
-app.secret_key = os.urandom(24)  # برای مدیریت session
-
-# Configure Gemini API
-try:
-    genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-except Exception as e:
-    logging.error(f"Error configuring Gemini API: {e}. Please ensure GEMINI_API_KEY is set.")
-
-# Load MLP model
-try:
-    model_path = 'mlp_model/mlp_model.keras'
-    model = tf.keras.models.load_model(model_path)
-    logging.info("MLP model loaded successfully")
-except Exception as e:
-    logging.error(f"Error loading MLP model: {e}")
-    model = None
-
-# User state storage
-user_data = {}
+app.secret_key = os.environ.get("SECRET_KEY") or os.urandom(24)  # برای مدیریت session
+
+# Latency histograms per route and per turn stage, served at /metrics (METRICS=off disables them).
+# TRACE_SLOW_TURNS=N keeps the per-stage breakdown of the N slowest turns out of a
+# TRACE_SAMPLE_RATE fraction of sampled turns (/metrics/slow_turns).
+metrics_registry = MetricsRegistry()
+tracer = Tracer(
+    metrics_registry,
+    enabled=os.environ.get("METRICS", "on") != "off",
+    slow_turns=int(os.environ.get("TRACE_SLOW_TURNS", "0")),
+    sample_rate=float(os.environ.get("TRACE_SAMPLE_RATE", "1")),
+)
+http_request_seconds = metrics_registry.histogram(
+    "http_request_duration_seconds", "Time until the response starts, per route",
+    labels=("route", "method", "status"),
+)
+http_requests = metrics_registry.counter(
+    "http_requests_total", "HTTP requests served", labels=("route", "method", "status")
+)
+
+# Gemini response cache (RESPONSE_CACHE=off disables it, RESPONSE_CACHE_PATH persists it to SQLite)
+response_cache = None
+if os.environ.get("RESPONSE_CACHE", "on") != "off":
+    try:
+        response_cache = ResponseCache(
+            max_entries=int(os.environ.get("RESPONSE_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.environ.get("RESPONSE_CACHE_TTL", "86400")),
+            path=os.environ.get("RESPONSE_CACHE_PATH") or None,
+        )
+    except Exception as e:
+        logging.error(f"Error creating response cache: {e}")
+
+# Concurrent LLM calls with a per-call deadline (LLM_PIPELINE=off runs them inline). Gemini
+# calls fit their request timeouts and retries into what is left of it.
+llm_pipeline = None
+if os.environ.get("LLM_PIPELINE", "on") != "off":
+    llm_pipeline = LLMPipeline(
+        max_workers=int(os.environ.get("LLM_WORKERS", "32")),
+        deadline_seconds=float(os.environ.get("LLM_DEADLINE_SECONDS", "10")),
+    )
+
+# Shared Gemini client: one reused model, a token bucket for the quota (GEMINI_RPM, per process;
+# 0 = unlimited), bounded concurrency, jittered retries and a circuit breaker that makes calls
+# fail fast (and the local fallbacks answer) while Gemini keeps failing. GEMINI_TIMEOUT_SECONDS
+# bounds one attempt; under the pipeline the call deadline cuts it and the retries shorter.
+gemini_client = GeminiClient(
+    lambda: genai.GenerativeModel,
+    rate_per_minute=float(os.environ.get("GEMINI_RPM", "0")),
+    burst=int(os.environ.get("GEMINI_BURST", "10")),
+    max_concurrency=int(os.environ.get("GEMINI_MAX_CONCURRENCY", "16")),
+    queue_timeout=float(os.environ.get("GEMINI_QUEUE_TIMEOUT_SECONDS", "5")),
+    request_timeout=float(os.environ.get("GEMINI_TIMEOUT_SECONDS", "20")),
+    max_retries=int(os.environ.get("GEMINI_MAX_RETRIES", "2")),
+    breaker_threshold=int(os.environ.get("GEMINI_BREAKER_FAILURES", "5")),
+    breaker_reset_seconds=float(os.environ.get("GEMINI_BREAKER_RESET_SECONDS", "30")),
+)
+
+GEMINI_FALLBACK_REPLY = "متأسفم، نمی‌توانم الان پاسخی بدهم. لطفاً سن، جنسیت، علائم (مثل پرادراری) یا قند خون‌تان را بگویید."
 
 # Symptom names in order of structured questions
-symptom_names = [
-    "پرادراری", "عطش", "کاهش وزن", "ضعف", "پرخوری", "عفونت قارچی", "تاری دید",
-    "خارش", "عصبانیت", "تأخیر در بهبود", "فلج جزئی", "درد عضلانی", "ریزش مو", "چاقی"
-]
+symptom_names = list(SYMPTOM_NAMES)
+symptom_index = {name: i for i, name in enumerate(symptom_names)}
+
+# Local symptom extractor, compiled once at startup (SYMPTOM_EXTRACTOR=gemini restores per-message Gemini calls)
+symptom_extractor = SymptomExtractor(symptom_names)
+symptom_extractor_mode = os.environ.get("SYMPTOM_EXTRACTOR", "local")
+
+# Completed assessments (feature row + probability) appended to JSONL segments by a background
+# thread (ASSESSMENT_LOG_DIR enables it); `python assessment_log.py` compacts them into a .npy
+assessment_log = None
+if os.environ.get("ASSESSMENT_LOG_DIR"):
+    try:
+        assessment_log = AssessmentLog(
+            os.environ["ASSESSMENT_LOG_DIR"],
+            symptom_names,
+            flush_interval=float(os.environ.get("ASSESSMENT_LOG_FLUSH_MS", "1000")) / 1000,
+            fsync=os.environ.get("ASSESSMENT_LOG_FSYNC", "batch"),
+            fsync_interval=float(os.environ.get("ASSESSMENT_LOG_FSYNC_SECONDS", "5")),
+            segment_max_bytes=int(float(os.environ.get("ASSESSMENT_LOG_SEGMENT_MB", "64")) * 1024 * 1024),
+            max_queue=int(os.environ.get("ASSESSMENT_LOG_MAX_QUEUE", "100000")),
+        )
+    except ValueError as e:
+        logging.error(f"Error configuring assessment log: {e}")
+
+# Structured questions, in symptom_names order (shared by every session)
+questions = (
+    "آیا بیش از حد معمول ادرار می‌کنید؟",
+    "آیا احساس تشنگی مداوم دارید؟",
+    "آیا کاهش وزن ناگهانی داشته‌اید؟",
+    "آیا ضعف بدنی دارید؟",
+    "آیا اشتهای شما به طور غیرعادی افزایش پیدا کرده است؟",
+    "آیا مبتلا به عفونت‌های قارچی هستید؟",
+    "آیا تاری دید دارید؟",
+    "آیا احساس خشکی یا خارش پوست دارید؟",
+    "آیا به سرعت عصبی می‌شوید؟",
+    "آیا بهبود زخم‌های بدنتان به کندی صورت می‌گیرد؟",
+    "آیا فلج جزئی (ضعف یا کاهش توانایی حرکتی) دارید؟",
+    "آیا در فعالیت‌های روزمره احساس کشیدگی یا درد عضلانی دارید؟",
+    "آیا ریزش مو دارید؟",
+    "آیا اضافه وزن دارید؟"
+)
+
+# Model probability (percent) of every answer mask for one age and gender: a slice of the
+# precomputed table when there is one, otherwise one batched model call
+def profile_probabilities(age, gender):
+    count = 1 << len(symptom_names)
+    if isinstance(probability_table, ProbabilityTable):
+        try:
+            start = pack_mask_key(age, gender, 0)
+            return probability_table.table[start:start + count] * 100
+        except ValueError:
+            pass  # outside the table; predict_diabetes_response uses the model too
+    features = np.empty((count, 2 + len(symptom_names)), dtype=float)
+    features[:, 0] = age
+    features[:, 1] = gender
+    features[:, 2:] = (np.arange(count)[:, None] >> np.arange(len(symptom_names))) & 1
+    return model.predict(features, verbose=0)[:, 0] * 100
+
+# Components that need the Gemini SDK or the model, set by load_components() (see STARTUP_MODE)
+genai = None
+model = None
+inference_batcher = None
+probability_table = None
+batch_scorer = None
+adaptive_questionnaire = None
+
+def load_components(start_batcher=False):
+    global genai, model, inference_batcher, probability_table, batch_scorer, adaptive_questionnaire
+
+    # Configure Gemini API (importing the SDK alone takes about a second)
+    with startup.phase("gemini_sdk"):
+        import google.generativeai as genai
+        try:
+            genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+        except Exception as e:
+            logging.error(f"Error configuring Gemini API: {e}. Please ensure GEMINI_API_KEY is set.")
+
+    with startup.phase("model"):
+        try:
+            model = load_mlp_model()
+            logging.info("MLP model loaded successfully")
+        except Exception as e:
+            logging.error(f"Error loading MLP model: {e}")
+            model = None
+    if model is None:
+        return
+
+    # Micro-batching of model.predict calls (INFERENCE_BATCH_WINDOW_MS=0 disables it)
+    batch_window_ms = float(os.environ.get("INFERENCE_BATCH_WINDOW_MS", "5"))
+    if batch_window_ms > 0:
+        inference_batcher = InferenceBatcher(
+            lambda batch: model.predict(batch, verbose=0)[:, 0],
+            max_batch_size=int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", "32")),
+            max_wait_ms=batch_window_ms,
+        )
+        if start_batcher:
+            inference_batcher.start()
+
+    # Probability lookup table (PROBABILITY_TABLE=precomputed|lazy|off)
+    table_mode = os.environ.get("PROBABILITY_TABLE", "off")
+    if table_mode != "off":
+        with startup.phase("probability_table"):
+            try:
+                if table_mode == "precomputed":
+                    table = ProbabilityTable(os.environ.get("PROBABILITY_TABLE_PATH", TABLE_PATH))
+                    verify_table(table, model, samples=256)
+                    probability_table = table
+                elif table_mode == "lazy":
+                    probability_table = LazyProbabilityTable(
+                        model, max_entries=int(os.environ.get("PROBABILITY_TABLE_CACHE_SIZE", "65536"))
+                    )
+                else:
+                    logging.error(f"Unknown PROBABILITY_TABLE mode: {table_mode}")
+                if probability_table is not None:
+                    logging.info(f"Probability table enabled ({table_mode})")
+            except Exception as e:
+                logging.error(f"Error loading probability table: {e}")
+                probability_table = None
+
+    # Bulk scoring of patient files, a whole chunk per model call (/predict_batch)
+    batch_scorer = BatchScorer(
+        lambda batch: model.predict(batch, verbose=0)[:, 0],
+        symptom_names,
+        chunk_size=int(os.environ.get("BATCH_SCORING_CHUNK_SIZE", "50000")),
+    )
+
+    # Adaptive questionnaire (QUESTIONNAIRE_MODE=adaptive|information_gain; full asks all 14):
+    # stops as soon as no combination of the remaining answers can change the verdict
+    questionnaire_mode = os.environ.get("QUESTIONNAIRE_MODE", "full")
+    if questionnaire_mode != "full":
+        try:
+            adaptive_questionnaire = AdaptiveQuestionnaire(
+                profile_probabilities,
+                num_questions=len(symptom_names),
+                threshold=LIKELY_PROBABILITY,
+                order="fixed" if questionnaire_mode == "adaptive" else questionnaire_mode,
+            )
+        except ValueError as e:
+            logging.error(f"Error configuring questionnaire: {e}")
+
+# User state storage: compact per-user records, bounded by LRU size and idle TTL.
+# SESSION_BACKEND=sqlite shares sessions between worker processes.
+user_data = create_session_backend(
+    os.environ.get("SESSION_BACKEND", "memory"),
+    StateSchema(symptom_names, questions),
+    max_entries=int(os.environ.get("SESSION_MAX_ENTRIES", "10000")),
+    idle_ttl=float(os.environ.get("SESSION_IDLE_TTL", "3600")),
+    path=os.environ.get("SESSION_DB_PATH", "sessions.sqlite3"),
+)
+SESSION_UPDATE_RETRIES = 3
+SESSION_CONFLICT_REPLY = "پیام‌های شما هم‌زمان رسیدند و این پیام ثبت نشد؛ لطفاً آن را دوباره بفرستید."
+
+# Side effects of the turn being processed, held until its session update commits, so a turn
+# replayed after a SessionConflict neither repeats them nor leaves the failed attempt's behind:
+# "results" keeps Gemini results for the replay to reuse, "records" the assessments to log
+_turn_effects = contextvars.ContextVar("turn_effects", default=None)
+
+def turn_result(key):
+    effects = _turn_effects.get()
+    return effects["results"].get(key) if effects is not None else None
+
+def keep_turn_result(key, value):
+    effects = _turn_effects.get()
+    if effects is not None:
+        effects["results"][key] = value
+    return value
+
+def reply_key(user_message, context="general", previous_symptoms=None, question_index=None):
+    return ("reply", user_message, context, tuple(previous_symptoms or ()), question_index)
+
+def record_assessment(*record):
+    effects = _turn_effects.get()
+    if effects is not None:
+        effects["records"].append(record)
+    else:
+        assessment_log.record(*record)
+
+# Start background threads. Called once per process, after gunicorn forks its workers,
+# because threads started before a fork do not exist in the children.
+def start_background_workers():
+    # In background mode the loader thread starts here and starts the batcher itself
+    startup.load(lambda: load_components(start_batcher=True))
+    if inference_batcher is not None:
+        inference_batcher.start()
+    user_data.start_sweeper(interval=float(os.environ.get("SESSION_SWEEP_INTERVAL", "60")))
+    if assessment_log is not None:
+        try:
+            assessment_log.start()
+        except OSError as e:
+            logging.error(f"Error starting assessment log: {e}")
+    atexit.register(stop_background_workers)
+
+# Stop the background threads, writing out the assessments still queued (gunicorn worker_exit, atexit)
+def stop_background_workers():
+    if assessment_log is not None:
+        assessment_log.stop()
+    user_data.stop_sweeper()
+    if inference_batcher is not None:
+        inference_batcher.stop()
 
 # Keywords
 positive_keywords = ["بله", "آره", "اره", "دارم", "بعضی وقتا", "گاهی", "اکثرا", "همیشه", 
@@ -56,53 +324,77 @@ test_intent_keywords = [
     "دیابت نوع", "آزمایش دیابت"
 ]
 invalid_response_keywords = ["نع","بلخ", "نچ"]
+female_keywords = ["خانم", "زن", "دختر", "مونث"]
+male_keywords = ["آقا", "مرد", "پسر", "مذکر"]
+no_symptom_keywords = ["علائمی ندارم", "هیچ علامتی"]
+greeting_phrases = ["سلام", "سلام علکیم", "سلام خوبی"]
+unrelated_symptom_patterns = [
+    r'سردرد', r'تهوع', r'سرگیجه', r'درد\s*شکم', r'تب', r'سرفه', r'گلودرد', r'خونریزی',
+    r'کمردرد', r'پهلو\s*درد', r'فشار\s*(خون)?\s*بالا', r'دل\s*درد', r'تنگی\s*نفس',
+    r'درد\s*قفسه\s*سینه', r'تپش\s*قلب', r'اسهال', r'یبوست', r'حالت\s*تهوع',
+    r'درد\s*معده', r'سوزش\s*معده', r'نفخ', r'سوء\s*هاضمه', r'درد\s*مفصل',
+    r'گرگرفتگی', r'لرز', r'خون\s*دماغ', r'گوش\s*درد', r'چشم\s*درد', r'گلو\s*درد',
+    r'حساسیت', r'آلرژی', r'جوش\s*صورت', r'خارش\s*گلو', r'درد\s*گوش', r'فشار\s*(خون)?\s', r'درد'
+    ]
+
+# Intent routing, compiled once: one pass over the cleaned input finds every keyword class
+intent_router = IntentRouter(
+    keywords={
+        "goodbye": goodbye_keywords,
+        "thanks": thanks_keywords,
+        "question": question_indicators,
+        "positive": positive_keywords,
+        "negative": negative_keywords,
+        "invalid": invalid_response_keywords,
+        "test_intent": test_intent_keywords,
+        "no_symptoms": no_symptom_keywords,
+    },
+    exact={
+        "goodbye": goodbye_keywords,
+        "greeting": greeting_phrases,
+        "start_questions": ["سوال"],
+    },
+    patterns={"unrelated_symptom": unrelated_symptom_patterns},
+    gender_keywords={0: female_keywords, 1: male_keywords},
+)
 
 # Reset user state
 def reset_user_state(user_id):
-    user_data[user_id] = {
-        "age": None,
-        "gender": None,
-        "symptoms": [],
-        "fasting_blood_sugar": None,
-        "waiting_for_questions": False,
-        "current_question_index": 0,
-        "current_symptoms": [],
-        "prediction_done": False,
-        "questions": [
-            "آیا بیش از حد معمول ادرار می‌کنید؟",
-            "آیا احساس تشنگی مداوم دارید؟",
-            "آیا کاهش وزن ناگهانی داشته‌اید؟",
-            "آیا ضعف بدنی دارید؟",
-            "آیا اشتهای شما به طور غیرعادی افزایش پیدا کرده است؟",
-            "آیا مبتلا به عفونت‌های قارچی هستید؟",
-            "آیا تاری دید دارید؟",
-            "آیا احساس خشکی یا خارش پوست دارید؟",
-            "آیا به سرعت عصبی می‌شوید؟",
-            "آیا بهبود زخم‌های بدنتان به کندی صورت می‌گیرد؟",
-            "آیا فلج جزئی (ضعف یا کاهش توانایی حرکتی) دارید؟",
-            "آیا در فعالیت‌های روزمره احساس کشیدگی یا درد عضلانی دارید؟",
-            "آیا ریزش مو دارید؟",
-            "آیا اضافه وزن دارید؟"
-        ],
-        "previous_symptoms": [],
-        "expecting_age": False
-    }
+    user_data.reset(user_id)
     logging.info(f"Reset user state: {user_id}")
 
 # Gemini API response for general questions
-def get_gemini_response(user_message, context="general", user_id=None):
+# previous_symptoms / question_index override the user's stored state (used by speculative calls
+# and by turns that already hold the state). Replies are streamed in chunks when the turn has a reply stream.
+@tracer.wrap("gemini_reply")
+def get_gemini_response(user_message, context="general", user_id=None, previous_symptoms=None, question_index=None):
+    if context == "symptom_explanation":
+        if question_index is None:
+            question_index = user_data[user_id]["current_question_index"]
+    elif previous_symptoms is None:
+        previous_symptoms = user_data[user_id].get("previous_symptoms", []) if user_id else []
+
+    cache_key = None
+    if response_cache is not None:
+        if context == "symptom_explanation":
+            cache_key = response_cache.make_key(user_message, context, question_index=question_index)
+        else:
+            cache_key = response_cache.make_key(user_message, context, previous_symptoms=previous_symptoms)
+        cached_response = response_cache.get(cache_key) if cache_key is not None else None
+        if cached_response is not None:
+            logging.info("Serving Gemini response from cache")
+            return cached_response
+
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
         if context == "symptom_explanation":
             prompt = (
                 "شما یک چت‌بات تشخیص اولیه دیابت هستید که به زبان فارسی پاسخ می‌دهید. "
                 "به سؤال کاربر پاسخ کوتاه، دقیق و کاربرپسند بدهید. "
                 "سپس از کاربر بخواهید با بله یا خیر به سؤال اصلی پاسخ دهد. "
                 f"سؤال کاربر: {user_message}\n"
-                f"سؤال اصلی: {user_data[user_id]['questions'][user_data[user_id]['current_question_index']]}"
+                f"سؤال اصلی: {questions[question_index]}"
             )
         else:
-            previous_symptoms = user_data[user_id].get("previous_symptoms", []) if user_id else []
             prompt = (
                 "شما یک چت‌بات تشخیص اولیه دیابت هستید که به زبان فارسی پاسخ می‌دهید. "
                 "به سؤال کاربر پاسخ کوتاه، دقیق و کاربرپسند بدهید. "
@@ -112,16 +404,45 @@ def get_gemini_response(user_message, context="general", user_id=None):
                 f"علائم قبلی کاربر: {', '.join(previous_symptoms) if previous_symptoms else 'هیچ'}\n"
                 f"سؤال کاربر: {user_message}"
             )
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        started = time.perf_counter()
+        if reply_stream.active():
+            parts = []
+            for text in gemini_client.stream(prompt, deadline=current_deadline()):
+                text = text if parts else text.lstrip()
+                parts.append(text)
+                reply_stream.write(text)
+            response_text = "".join(parts).strip()
+        else:
+            response_text = gemini_client.generate(prompt, deadline=current_deadline()).strip()
+        if cache_key is not None:
+            response_cache.put(cache_key, response_text, latency=time.perf_counter() - started)
+        return response_text
+    except GeminiUnavailable as e:
+        logging.warning(f"Serving fallback reply: {e}")
+        return GEMINI_FALLBACK_REPLY
     except Exception as e:
         logging.error(f"Gemini API error: {e}")
-        return "متأسفم، نمی‌توانم الان پاسخی بدهم. لطفاً سن، جنسیت، علائم (مثل پرادراری) یا قند خون‌تان را بگویید."
+        return GEMINI_FALLBACK_REPLY
+
+# Run a Gemini reply through the pipeline deadline, or inline when the pipeline is off
+def gemini_reply(user_message, context="general", user_id=None, **state):
+    key = reply_key(user_message, context, **state)
+    reply = turn_result(key)
+    if reply is not None:
+        return reply
+    if llm_pipeline is None:
+        reply = get_gemini_response(user_message, context=context, user_id=user_id, **state)
+    else:
+        reply = llm_pipeline.run(
+            get_gemini_response, user_message, context=context, user_id=user_id, fallback=GEMINI_FALLBACK_REPLY,
+            **state,
+        )
+    return keep_turn_result(key, reply)
 
 # Gemini API for symptom detection
+@tracer.wrap("gemini_symptoms")
 def detect_symptoms_with_gemini(user_input):
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
         prompt = f"""
         متن زیر مربوط به علائم یک بیمار است. با توجه به لیست علائم زیر، بررسی کن 
         که کاربر به کدام علائم اشاره کرده و فقط خروجی را به شکل یک آرایه 0 و 1 (بدون هیچ متن اضافی) نمایش بده.
@@ -134,19 +455,50 @@ def detect_symptoms_with_gemini(user_input):
 
         فقط خروجی:
         """
-        response = model.generate_content(prompt)
-        symptom_array = eval(response.text.strip())
+        symptom_array = ast.literal_eval(gemini_client.generate(prompt, deadline=current_deadline()).strip())
         if len(symptom_array) != len(symptom_names):
             logging.error(f"Gemini symptom detection returned incorrect array length: {len(symptom_array)}")
             return []
         detected_symptoms = [symptom_names[i] for i, val in enumerate(symptom_array) if val == 1]
         return detected_symptoms
+    except GeminiUnavailable as e:
+        logging.warning(f"Gemini symptom detection skipped: {e}")
+        return []
     except Exception as e:
         logging.error(f"Gemini symptom detection error: {e}")
         return []
 
+# Symptom detection: local lexicon first, Gemini only when the text looks symptom-like
+@tracer.wrap("detect_symptoms")
+def detect_symptoms(user_input):
+    symptoms = turn_result(("symptoms", user_input))
+    if symptoms is not None:
+        return symptoms
+    return keep_turn_result(("symptoms", user_input), detect_symptoms_uncached(user_input))
+
+def detect_symptoms_uncached(user_input):
+    if symptom_extractor_mode != "gemini":
+        symptoms, symptom_like = symptom_extractor.analyze(user_input)
+        if symptoms or not symptom_like:
+            return symptoms
+        logging.info("No local symptom match, asking Gemini")
+    if llm_pipeline is None:
+        return detect_symptoms_with_gemini(user_input)
+    return llm_pipeline.run(detect_symptoms_with_gemini, user_input, fallback=[])
+
 # Predict diabetes probability
 def predict_diabetes(input_data):
+    if inference_batcher is None or not inference_batcher.running:
+        return predict_diabetes_single(input_data)
+    try:
+        probability = inference_batcher.submit(input_data[0]) * 100
+        return probability
+    except Exception as e:
+        logging.error(f"Prediction error: {e}")
+        return 0
+
+# Unbatched single-row prediction (kept for debugging)
+def predict_diabetes_single(input_data):
     try:
         prediction = model.predict(input_data, verbose=0)
         probability = prediction[0][0] * 100
@@ -156,12 +508,13 @@ def predict_diabetes(input_data):
         return 0
 
 # Diabetes prediction response
+@tracer.wrap("predict")
 def predict_diabetes_response(data, detailed=False):
     age = data["age"]
     gender = data["gender"]
     fasting_blood_sugar = data["fasting_blood_sugar"]
     
-    if fasting_blood_sugar is not None and fasting_blood_sugar < 70:
+    if fasting_blood_sugar is not None and fasting_blood_sugar < HYPOGLYCEMIA_FBS:
         return (
             f"قند خون {fasting_blood_sugar} میلی‌گرم در دسی‌لیتر خیلی پایین است (هیپوگلیسمی). "
             "لطفاً سریع یک منبع قندی (مثل آب‌میوه) مصرف کنید و ۱۵ دقیقه بعد قند خون خود را چک کنید. "
@@ -173,20 +526,30 @@ def predict_diabetes_response(data, detailed=False):
     else:
         symptoms = [0] * len(symptom_names)
         for symptom in data["symptoms"]:
-            if symptom in symptom_names:
-                symptoms[symptom_names.index(symptom)] = 1
+            if symptom in symptom_index:
+                symptoms[symptom_index[symptom]] = 1
 
-    input_features = np.array([[age, gender] + symptoms], dtype=float)
-    logging.info(f"Input features: {input_features}")
-    probability = predict_diabetes(input_features)
+    probability = None
+    if probability_table is not None:
+        try:
+            probability = probability_table.lookup(age, gender, symptoms) * 100
+        except Exception as e:
+            logging.error(f"Probability table lookup error: {e}")
+    if probability is None:
+        input_features = np.array([[age, gender] + symptoms], dtype=float)
+        logging.debug(f"Input features: {input_features}")
+        probability = predict_diabetes(input_features)
     logging.info(f"Prediction probability: {probability}")
 
-    if fasting_blood_sugar is not None and fasting_blood_sugar >= 126 or "قند خون بالا" in data["symptoms"]:
-        probability = max(probability, 75)
+    high_blood_sugar = "قند خون بالا" in data["symptoms"]
+    if fasting_blood_sugar is not None and fasting_blood_sugar >= DIABETES_FBS or high_blood_sugar:
+        probability = max(probability, HIGH_BLOOD_SUGAR_PROBABILITY)
         logging.info("Increased probability due to high blood sugar")
+    if assessment_log is not None:
+        record_assessment(age, gender, symptoms, probability, fasting_blood_sugar, high_blood_sugar, detailed)
 
     if detailed:
-        if probability > 50:
+        if probability > LIKELY_PROBABILITY:
             return (
                 "بر اساس پاسخ‌های شما، احتمال دیابت وجود دارد. چند توصیه براتان دارم:<br>"
                 "- لطفاً هرچه زودتر با پزشک متخصص مشورت کنید.<br>"
@@ -203,7 +566,7 @@ def predict_diabetes_response(data, detailed=False):
                 "- استرس را مدیریت کنید و خواب کافی داشته باشید."
             )
     else:
-        if probability > 50:
+        if probability > LIKELY_PROBABILITY:
             return (
                 "با توجه به اطلاعات شما، احتمال دیابت وجود دارد. "
                 "برای بررسی دقیق‌تر، لطفاً کلمه «سوال» را وارد کنید تا تست کامل‌تری انجام دهیم."
@@ -220,6 +583,30 @@ def predict_diabetes_response(data, detailed=False):
                     "اگه علائم خاصی (مثل پرادراری یا عطش) دارید، لطفاً بگویید یا کلمه «سوال» را برای برسی دقیق تر وارد کنید."
                 )
 
+# Hashed, precompressed static files built by `python asset_pipeline.py`, served from /assets;
+# without a build, templates keep using the plain /static URLs
+asset_manifest = AssetManifest()
+
+@app.context_processor
+def asset_helpers():
+    return {"asset_url": asset_manifest.url}
+
+STARTING_REPLY = "در حال آماده‌سازی هستم؛ لطفاً چند ثانیه دیگر دوباره پیام بدهید."
+
+# Routes that need the model or Gemini wait (up to READINESS_WAIT_SECONDS) for the components
+# still loading in the background, then give up with a 503 and Retry-After
+def requires_ready(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        startup.load(load_components)  # a process that never started its workers loads on demand
+        if not startup.wait(READINESS_WAIT_SECONDS):
+            response = jsonify({"response": STARTING_REPLY, "error": "Still starting up"})
+            response.status_code = 503
+            response.headers["Retry-After"] = "5"
+            return response
+        return view(*args, **kwargs)
+    return wrapper
+
 # Routes
 @app.route("/")
 def home():
@@ -227,39 +614,212 @@ def home():
     return render_template("index.html")
 
 @app.route("/get_response", methods=["POST"])
+@requires_ready
 def get_response():
     user_message = request.form["message"].strip()
     user_id = session.get("user_id", str(uuid.uuid4()))
     session["user_id"] = user_id
     
-    if user_id not in user_data:
-        reset_user_state(user_id)
-    
-    logging.info(f"User input: {user_message}")
+    logging.debug(f"User input: {user_message}")
     response = process_user_input(user_message, user_id)
     return jsonify({"response": response})
 
+# Same as /get_response, but streams the reply as Server-Sent Events while it is produced
+@app.route("/get_response_stream", methods=["POST"])
+@requires_ready
+def get_response_stream():
+    user_message = request.form["message"].strip()
+    user_id = session.get("user_id", str(uuid.uuid4()))
+    session["user_id"] = user_id
+    logging.debug(f"User input (stream): {user_message}")
+
+    stream = reply_stream.ReplyStream()
+
+    def run_turn():
+        stream.bind()
+        response = GEMINI_FALLBACK_REPLY
+        try:
+            response = process_user_input(user_message, user_id)
+        except Exception as e:
+            logging.error(f"Error processing streamed turn: {e}")
+        finally:
+            stream.finish(response)
+
+    threading.Thread(target=run_turn, name="stream-turn", daemon=True).start()
+    return Response(
+        stream.events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Score an uploaded CSV/JSONL file (multipart "file" field or the raw request body).
+# The result is streamed back chunk by chunk in the input format unless ?output= says otherwise.
+@app.route("/predict_batch", methods=["POST"])
+@requires_ready
+def predict_batch():
+    if batch_scorer is None:
+        return jsonify({"error": "Model is not available"}), 503
+
+    upload = request.files.get("file")
+    if upload is not None:
+        # Take the spooled upload away from the request: Flask closes request files when the
+        # view returns, but the response is still reading it
+        raw, filename = upload.stream, upload.filename
+        upload.stream = io.BytesIO()
+    else:
+        raw, filename = request.stream, None
+    input_format = detect_format(request.args.get("format") or filename, request.mimetype)
+    output_format = request.args.get("output") or input_format
+    text = io.TextIOWrapper(raw if hasattr(raw, "readable") else io.BufferedReader(raw),
+                            encoding="utf-8-sig", newline="")
+
+    try:
+        chunks = batch_scorer.score_stream(text, input_format, output_format)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        try:
+            yield from chunks
+        finally:
+            text.close()
+
+    mimetype = "text/csv" if output_format == "csv" else "application/x-ndjson"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+@app.route("/assets/<path:filename>", methods=["GET"])
+def static_asset(filename):
+    return asset_manifest.response(filename)
+
+def component_stats():
+    return {
+        "inference_batching": inference_batcher.stats() if inference_batcher is not None else None,
+        "probability_table": probability_table.stats() if probability_table is not None else None,
+        "response_cache": response_cache.stats() if response_cache is not None else None,
+        "llm_pipeline": llm_pipeline.stats() if llm_pipeline is not None else None,
+        "gemini_client": gemini_client.stats(),
+        "questionnaire": adaptive_questionnaire.stats() if adaptive_questionnaire is not None else None,
+        "static_assets": asset_manifest.stats(),
+        "startup": startup.stats(),
+        "sessions": user_data.stats(),
+        "tracing": tracer.stats(),
+    }
+
 @app.route("/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "healthy", "model_loaded": model is not None})
+    return jsonify({
+        "status": "healthy",
+        "ready": startup.ready,
+        "model_loaded": model is not None,
+        **component_stats(),
+    })
+
+# Liveness: the process is up and serving (never waits for the model)
+@app.route("/health/live", methods=["GET"])
+def liveness_check():
+    return jsonify({"status": "alive"})
+
+# Readiness: 200 once the components the chat needs are loaded, 503 while they are loading
+@app.route("/health/ready", methods=["GET"])
+def readiness_check():
+    return jsonify({"ready": startup.ready, "phases": startup.stats()["phases"]}), 200 if startup.ready else 503
 
-# Process user input
+# Prometheus text format: request/turn/stage histograms plus the numeric /health stats as gauges
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    body = metrics_registry.render(component_stats())
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+@app.route("/metrics/slow_turns", methods=["GET"])
+def slow_turns():
+    return jsonify({"slow_turns": tracer.slowest_turns(), **tracer.stats()})
+
+if tracer.enabled:
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    # For streamed responses this is the time until the stream starts
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            labels = (route, request.method, str(response.status_code))
+            http_request_seconds.observe(time.perf_counter() - started, *labels)
+            http_requests.inc(*labels)
+        return response
+
+def discard_speculative_reply(future, stream):
+    if stream is not None:
+        stream.drop()
+    llm_pipeline.discard(future)
+
+# Index of the next structured question, or None when the questionnaire is over
+def next_question_index(current_data):
+    if adaptive_questionnaire is not None:
+        fasting_blood_sugar = current_data["fasting_blood_sugar"]
+        if fasting_blood_sugar is not None and fasting_blood_sugar < HYPOGLYCEMIA_FBS:
+            return None  # the reply is the hypoglycemia warning whatever the answers
+        high_blood_sugar = current_data["high_blood_sugar"] or (
+            fasting_blood_sugar is not None and fasting_blood_sugar >= DIABETES_FBS
+        )
+        try:
+            return adaptive_questionnaire.next_question(
+                current_data["age"], current_data["gender"], current_data["answer_mask"],
+                current_data["asked_mask"], floor=HIGH_BLOOD_SUGAR_PROBABILITY if high_blood_sugar else 0.0,
+            )
+        except Exception as e:
+            logging.error(f"Adaptive questionnaire error, asking in order: {e}")
+    index = current_data["answer_count"]
+    return index if index < len(questions) else None
+
+# Process user input as one atomic update of the user's state. With a shared backend,
+# a turn that raced with another worker on the same session is replayed on fresh state.
 def process_user_input(user_input, user_id):
-    current_data = user_data[user_id]
-    user_input_clean = user_input.lower().replace("‌", "")
+    with tracer.turn(message_chars=len(user_input)):
+        effects = {"results": {}, "records": []}
+        token = _turn_effects.set(effects)
+        try:
+            for attempt in range(SESSION_UPDATE_RETRIES + 1):
+                effects["records"].clear()
+                try:
+                    with user_data.transaction(user_id) as current_data:
+                        if attempt == 0:
+                            response = handle_user_input(user_input, user_id, current_data)
+                        else:
+                            # The client already has the first attempt's chunks; the final
+                            # reply corrects them if the replay answered differently
+                            response = reply_stream.call_with(None, handle_user_input, user_input, user_id, current_data)
+                except SessionConflict:
+                    logging.info(f"Session {user_id} changed concurrently, retrying turn")
+                    continue
+                if assessment_log is not None:
+                    for record in effects["records"]:
+                        assessment_log.record(*record)
+                return response
+        finally:
+            _turn_effects.reset(token)
+        logging.warning(f"Session {user_id} kept changing concurrently, giving up on the turn")
+        return SESSION_CONFLICT_REPLY
+
+def handle_user_input(user_input, user_id, current_data):
+    with tracer.stage("route"):
+        routed = intent_router.route(user_input)
+    user_input_clean = routed.clean
     responses = []
 
     # 1. Check for goodbye
-    if any(word == user_input_clean for word in goodbye_keywords):
+    if routed.is_exact("goodbye"):
         logging.info("Detected goodbye")
-        reset_user_state(user_id)
+        current_data.reset()
         return "خدانگهدار! امیدوارم تونسته باشم کمکتون کنم. 😊"
 
     # 2. Check for thanks
-    if any(word in user_input_clean for word in thanks_keywords):
+    if routed.has("thanks"):
         logging.info("Detected thanks")
-        if any(word in user_input_clean for word in goodbye_keywords):
-            reset_user_state(user_id)
+        if routed.has("goodbye"):
+            current_data.reset()
             return "خدانگهدار! خوشحال میشوم باز هم بتوانم کمکتان کنم. 😊"
         return "خواهش می‌کنم! اگر سوال دیگری دارید یا خواستید موضوع دیگری را بررسی کنیم، من آماده هستم."
 
@@ -268,30 +828,35 @@ def process_user_input(user_input, user_id):
         logging.info("Processing structured question response")
         current_question_index = current_data["current_question_index"]
         
-        if any(indicator in user_input_clean for indicator in question_indicators):
+        if routed.has("question"):
             logging.info("Forwarding symptom explanation to Gemini API")
-            gemini_response = get_gemini_response(user_input, context="symptom_explanation", user_id=user_id)
+            gemini_response = gemini_reply(
+                user_input, context="symptom_explanation", user_id=user_id, question_index=current_question_index
+            )
             return gemini_response
 
-        if any(word in user_input_clean for word in positive_keywords):
+        if routed.has("positive"):
             logging.info("Positive response to structured question")
-            current_data["current_symptoms"].append(1)
-            current_data["current_question_index"] += 1
-        elif any(word in user_input_clean for word in negative_keywords):
+            current_data.record_answer(1, current_question_index)
+        elif routed.has("negative"):
             logging.info("Negative response to structured question")
-            current_data["current_symptoms"].append(0)
-            current_data["current_question_index"] += 1
-        elif any(word in user_input_clean for word in invalid_response_keywords):
-            logging.info(f"Invalid response to structured question: {user_input}")
+            current_data.record_answer(0, current_question_index)
+        elif routed.has("invalid"):
+            logging.debug(f"Invalid response to structured question: {user_input}")
             return f"لطفاً با بله یا خیر پاسخ دهید: {current_data['questions'][current_question_index]}"
         else:
-            logging.info(f"Unrecognized response to structured question: {user_input}")
+            logging.debug(f"Unrecognized response to structured question: {user_input}")
             return f"لطفاً با بله یا خیر پاسخ دهید: {current_data['questions'][current_question_index]}"
 
-        if current_data["current_question_index"] < len(current_data["questions"]):
-            return current_data["questions"][current_data["current_question_index"]]
+        next_index = next_question_index(current_data)
+        if next_index is not None:
+            current_data["current_question_index"] = next_index
+            return current_data["questions"][next_index]
         else:
             logging.info("Finished structured questions")
+            if adaptive_questionnaire is not None:
+                adaptive_questionnaire.record_finish(current_data["answer_count"])
+                current_data.skip_unasked(len(questions))
             logging.info(f"Current symptoms: {current_data['current_symptoms']}")
             current_data["waiting_for_questions"] = False
             prediction_result = predict_diabetes_response(current_data, detailed=True)
@@ -299,120 +864,113 @@ def process_user_input(user_input, user_id):
                 symptom_names[i] for i, val in enumerate(current_data["current_symptoms"]) if val == 1
             ]
             current_data["previous_symptoms"] = current_data["symptoms"].copy()
-            reset_user_state(user_id)
+            current_data.reset()
             return prediction_result
 
     # 4. Extract information
     logging.info("Extracting information")
+
+    # Routing already tells us whether step 5 will need a Gemini reply: start it now so it
+    # overlaps with symptom detection. Its streamed chunks are held back until it is used.
+    speculative_reply = None
+    speculative_stream = None
+    speculative_symptoms = list(current_data["previous_symptoms"])
+    speculative_key = reply_key(user_input, previous_symptoms=speculative_symptoms)
+    if llm_pipeline is not None and (routed.has("question") or routed.has("unrelated_symptom")) \
+            and not routed.has("no_symptoms") and turn_result(speculative_key) is None:
+        speculative_stream = reply_stream.defer()
+        speculative_reply = llm_pipeline.submit(
+            reply_stream.call_with, speculative_stream, get_gemini_response,
+            user_input, user_id=user_id, previous_symptoms=speculative_symptoms,
+        )
+
     info_detected = False
     symptoms_detected = []
     unrelated_symptoms = []
 
     # Fasting blood sugar
-    fbs_match = re.search(r'قند\s*(?:خون)?\s*(?:ناشتا(?:ی من|م)?)?\s*(?:من|م)?\s*(\d{2,3})|قند\b.*?\b(\d+)\b', user_input_clean)
-    if fbs_match:            
-        fbs_value = int(fbs_match.group(1) or fbs_match.group(2))
+    if routed.fbs_value is not None:
+        fbs_value = routed.fbs_value
         current_data["fasting_blood_sugar"] = fbs_value
         info_detected = True
         logging.info(f"Detected fasting blood sugar: {fbs_value}")
-        if fbs_value < 70:
+        if fbs_value < HYPOGLYCEMIA_FBS:
             responses.append(
                 f"قند خون {fbs_value} میلی‌گرم در دسی‌لیتر خیلی پایین است (هیپوگلیسمی). "
                 "لطفاً سریعا یک منبع قندی (مثل آب‌میوه) مصرف کنید و ۱۵ دقیقه بعد قند خون‌تان را مجدد چک کنید."
             )
-        elif fbs_value >= 100 and fbs_value < 126:
+        elif fbs_value >= 100 and fbs_value < DIABETES_FBS:
             responses.append(
                 f"قند خون ناشتای {fbs_value} میلی‌گرم در دسی‌لیتر در محدوده پیش‌دیابت قرار دارد. "
                 "این یعنی ممکن است در معرض خطر دیابت باشید."
             )
-        elif fbs_value >= 126 and "قند خون بالا" not in current_data["symptoms"]:
-            current_data["symptoms"].append("قند خون بالا")
+        elif fbs_value >= DIABETES_FBS and "قند خون بالا" not in current_data["symptoms"]:
+            current_data.add_symptom("قند خون بالا")
             logging.info("Added symptom: قند خون بالا")
             responses.append(f"قند خون ناشتای {fbs_value} میلی‌گرم در دسی‌لیتر بالاتر از حد نرمال است.")
 
     # Age
-    if current_data["expecting_age"]:
-        age_match = re.search(r'(\d+)\s*سال', user_input, re.IGNORECASE)
-        standalone_age_match = re.search(r'\b(\d+)\b(?!\s*%)', user_input_clean)
-        if age_match:
-            age = int(age_match.group(1))
-            if 0 <= age <= 99:
-                current_data["age"] = age
-                info_detected = True
-                current_data["expecting_age"] = False
-                logging.info(f"Detected age: {current_data['age']}")
-        elif standalone_age_match:
-            age = int(standalone_age_match.group(1))
-            if 0 <= age <= 99:
-                current_data["age"] = age
-                info_detected = True
-                current_data["expecting_age"] = False
-                logging.info(f"Detected age: {current_data['age']}")
-    else:
-        age_match = re.search(r'(\d+)\s*سال', user_input, re.IGNORECASE)
-        standalone_age_match = re.search(r'\b(\d+)\b(?!\s*%)', user_input_clean)
-        if age_match:
-            age = int(age_match.group(1))
-            if 0 <= age <= 99:
-                current_data["age"] = age
-                info_detected = True
-                logging.info(f"Detected age: {current_data['age']}")
-        elif standalone_age_match:
-            age = int(standalone_age_match.group(1))
-            if 0 <= age <= 99:
-                current_data["age"] = age
-                info_detected = True
-                logging.info(f"Detected age: {current_data['age']}")
+    if routed.age is not None:
+        current_data["age"] = routed.age
+        info_detected = True
+        current_data["expecting_age"] = False
+        logging.info(f"Detected age: {current_data['age']}")
 
     # Gender (only set if not previously set)
     if current_data["gender"] is None:
-        if any(g in user_input_clean for g in ["خانم", "زن", "دختر", "مونث"]):
+        if routed.gender == 0:
             current_data["gender"] = 0
             info_detected = True
             logging.info("Detected gender: خانم")
-        elif any(g in user_input_clean for g in ["آقا", "مرد", "پسر", "مذکر"]):
+        elif routed.gender == 1:
             current_data["gender"] = 1
             info_detected = True
             logging.info("Detected gender: آقا")
 
-    # Symptoms detection using Gemini
-    symptoms_detected = detect_symptoms_with_gemini(user_input)
+    # Symptoms detection (local lexicon, Gemini fallback)
+    symptoms_detected = detect_symptoms(user_input)
     if symptoms_detected:
         for symptom in symptoms_detected:
             if symptom not in current_data["symptoms"] and symptom != "قند خون بالا":
-                current_data["symptoms"].append(symptom)
+                current_data.add_symptom(symptom)
                 info_detected = True
-                current_data["previous_symptoms"].append(symptom)
+                current_data.add_previous_symptom(symptom)
                 logging.info(f"Detected symptom: {symptom}")
 
     # Check for unrelated symptoms
-    unrelated_symptom_patterns = [
-        r'سردرد', r'تهوع', r'سرگیجه', r'درد\s*شکم', r'تب', r'سرفه', r'گلودرد', r'خونریزی',
-        r'کمردرد', r'پهلو\s*درد', r'فشار\s*(خون)?\s*بالا', r'دل\s*درد', r'تنگی\s*نفس',
-        r'درد\s*قفسه\s*سینه', r'تپش\s*قلب', r'اسهال', r'یبوست', r'حالت\s*تهوع',
-        r'درد\s*معده', r'سوزش\s*معده', r'نفخ', r'سوء\s*هاضمه', r'درد\s*مفصل',
-        r'گرگرفتگی', r'لرز', r'خون\s*دماغ', r'گوش\s*درد', r'چشم\s*درد', r'گلو\s*درد',
-        r'حساسیت', r'آلرژی', r'جوش\s*صورت', r'خارش\s*گلو', r'درد\s*گوش', r'فشار\s*(خون)?\s', r'درد'
-        ]
-    for pattern in unrelated_symptom_patterns:
-        if re.search(pattern, user_input_clean):
-            unrelated_symptoms.append(user_input_clean)
-            break
+    if routed.has("unrelated_symptom"):
+        unrelated_symptoms.append(user_input_clean)
 
     if symptoms_detected:
         info_detected = True
         logging.info(f"Detected symptoms: {symptoms_detected}")
 
     # Check for "no symptoms"
-    if "علائمی ندارم" in user_input_clean or "هیچ علامتی" in user_input_clean:
+    if routed.has("no_symptoms"):
         logging.info("Detected no symptoms")
-        reset_user_state(user_id)
+        if speculative_reply is not None:
+            discard_speculative_reply(speculative_reply, speculative_stream)
+        current_data.reset()
         return "به نظر میرسد مشکلی ندارید! برای شما آرزوی سلامتی می‌کنم. 😊 اگه با علائم جدیدی روبه رو شدید، میتوانید روی کمک من حساب کنید."
 
     # 5. Handle general questions or unrelated symptoms
-    if any(indicator in user_input_clean for indicator in question_indicators) or unrelated_symptoms:
+    if routed.has("question") or unrelated_symptoms:
         logging.info("Detected general question or unrelated symptoms")
-        gemini_response = get_gemini_response(user_input, user_id=user_id)
+        if responses:
+            reply_stream.write(", ".join(responses) + ", ")
+        if speculative_reply is not None and speculative_symptoms == current_data["previous_symptoms"]:
+            if speculative_stream is not None:
+                speculative_stream.attach()
+            gemini_response = keep_turn_result(
+                speculative_key, llm_pipeline.wait(speculative_reply, GEMINI_FALLBACK_REPLY)
+            )
+        else:
+            # Newly detected symptoms change the prompt, so the speculative reply is stale
+            if speculative_reply is not None:
+                discard_speculative_reply(speculative_reply, speculative_stream)
+            gemini_response = gemini_reply(
+                user_input, user_id=user_id, previous_symptoms=current_data["previous_symptoms"]
+            )
         responses.append(gemini_response)
         return ", ".join(responses)
 
@@ -433,14 +991,16 @@ def process_user_input(user_input, user_id):
             return ", ".join(responses)
 
     # 7. Handle test intent or structured questions
-    test_intent = any(keyword in user_input_clean for keyword in test_intent_keywords)
-    if user_input_clean == "سوال" or test_intent:
+    test_intent = routed.has("test_intent")
+    if routed.is_exact("start_questions") or test_intent:
         if current_data["age"] is not None and current_data["gender"] is not None:
             current_data["waiting_for_questions"] = True
-            current_data["current_question_index"] = 0
             current_data["current_symptoms"] = []
+            # At least one question is asked, even when no answer could change the verdict
+            first_index = next_question_index(current_data)
+            current_data["current_question_index"] = 0 if first_index is None else first_index
             logging.info("Starting structured questions")
-            return current_data["questions"][0]
+            return current_data["questions"][current_data["current_question_index"]]
         else:
             logging.info("Insufficient data for structured questions")
             missing_info = []
@@ -464,11 +1024,18 @@ def process_user_input(user_input, user_id):
             return ", ".join(responses)
 
     # 9. Handle greetings or unknown input
-    if user_input_clean in ["سلام", "سلام علکیم", "سلام خوبی"]:
+    if routed.is_exact("greeting"):
         return "سلام! 😊 برای بررسی دیابت، لطفاً سن، جنسیت، علائم (مثل پرادراری) یا قند خون‌ خود را بگویید (مثلاً '30 سال، آقا، پرادراری') یا برای برسی دقیق تر واژه «سوال» را وارد کنید."
     logging.info("Forwarding miscellaneous input to Gemini API")
-    gemini_response = get_gemini_response(user_input, user_id=user_id)
+    gemini_response = gemini_reply(user_input, user_id=user_id, previous_symptoms=current_data["previous_symptoms"])
     return gemini_response
 
+startup.mark("app")
+# Eager mode loads here, before the app serves anything; background mode starts loading in
+# start_background_workers() (or on the first request that needs the model)
+if startup.mode == "eager":
+    startup.load(load_components)
+
 if __name__ == "__main__":
+    start_background_workers()
     app.run(host="0.0.0.0", port=5000, debug=False)
\ No newline at end of file
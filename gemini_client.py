@@ -0,0 +1,286 @@
+import logging
+import math
+import os
+import random
+import threading
+import time
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # google-generativeai always brings api_core, but keep the client importable without it
+    google_exceptions = None
+
+# Errors that a retry cannot fix (bad request, credentials, blocked prompt); anything else
+# (429, 5xx, timeouts, connection resets) is retried. Gemini did answer these, so they count as
+# failures of the call but not against the circuit breaker: bad prompts must not cut off everyone.
+if google_exceptions is not None:
+    NON_RETRYABLE = (
+        google_exceptions.InvalidArgument, google_exceptions.PermissionDenied,
+        google_exceptions.Unauthenticated, google_exceptions.NotFound, ValueError, TypeError,
+    )
+else:
+    NON_RETRYABLE = (ValueError, TypeError)
+
+
+# Raised without calling Gemini: the breaker is open, or no rate/concurrency slot was free in time.
+# Callers serve their local fallback.
+class GeminiUnavailable(Exception):
+    pass
+
+
+# Token bucket: `rate` tokens per second, at most `capacity` saved up for bursts
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Take one token, waiting up to timeout seconds; returns False if none became available
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+# Consecutive-failure circuit breaker.
+# closed: calls go through. After `threshold` failures in a row it opens and rejects calls
+# for `reset_seconds`; then one trial call is let through (half-open) and its outcome
+# closes or re-opens the breaker.
+# allow() returns a ticket for an admitted call (None when rejected); only the trial's ticket
+# can cancel the trial, so a call that fails to start cannot free another call's trial.
+class CircuitBreaker:
+    PASS = "pass"
+
+    def __init__(self, threshold=5, reset_seconds=30.0):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return self.PASS
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and self._trial is None:
+                self._trial = object()
+                return self._trial
+            return None
+
+    # The admitted call never reached Gemini (e.g. no rate-limit token): free the trial slot
+    # if the call was the trial
+    def cancel(self, ticket):
+        with self._lock:
+            if ticket is self._trial:
+                self._trial = None
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = None
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.trips += 1
+                    logging.warning(f"Gemini circuit breaker open after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+# Shared Gemini client for the process: one reused GenerativeModel, a token bucket for the
+# quota (rate_per_minute=0 disables it), a bound on concurrent calls, retries with
+# full-jitter exponential backoff and a circuit breaker.
+# get_model_factory() is called on every request (normally returning genai.GenerativeModel),
+# so a factory swapped in later is picked up; the model is also rebuilt after a fork.
+# A call given a deadline (time.monotonic()) fits its waits, request timeouts and retries before
+# it, so a caller that stops waiting does not leave the call holding a thread and a slot.
+class GeminiClient:
+    def __init__(self, get_model_factory, model_name="gemini-2.0-flash", rate_per_minute=0, burst=10,
+                 max_concurrency=16, queue_timeout=5.0, request_timeout=20.0, max_retries=2,
+                 backoff_base=0.25, backoff_max=4.0, breaker_threshold=5, breaker_reset_seconds=30.0):
+        self.get_model_factory = get_model_factory
+        self.model_name = model_name
+        self.rate_per_minute = rate_per_minute
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst) if rate_per_minute > 0 else None
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+
+        self._model = None
+        self._model_key = None
+        self._model_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.client_errors = 0
+        self.rejected = 0
+
+    def _get_model(self):
+        factory = self.get_model_factory()
+        key = (factory, os.getpid())
+        if self._model_key != key:
+            with self._model_lock:
+                if self._model_key != key:
+                    self._model = factory(self.model_name)
+                    self._model_key = key
+        return self._model
+
+    def _count(self, field):
+        with self._stats_lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _time_left(self, deadline):
+        return math.inf if deadline is None else deadline - time.monotonic()
+
+    # Breaker and concurrency slot; returns the breaker ticket, the caller must release the slot
+    def _admit(self, deadline):
+        ticket = self.breaker.allow()
+        if ticket is None:
+            self._count("rejected")
+            raise GeminiUnavailable("Gemini circuit breaker is open")
+        if not self._slots.acquire(timeout=max(0.0, min(self.queue_timeout, self._time_left(deadline)))):
+            self._reject(ticket)
+            raise GeminiUnavailable("No free Gemini connection slot")
+        return ticket
+
+    # Rate limit, one token per attempt so that retries (e.g. after a 429) stay within the quota.
+    # Without a token the first attempt is a rejection, a retry gives up on the failed call.
+    def _take_token(self, ticket, attempt, error, deadline):
+        time_left = self._time_left(deadline)
+        if time_left > 0 and (self.bucket is None or self.bucket.acquire(min(self.queue_timeout, time_left))):
+            return
+        if attempt == 0:
+            self._reject(ticket)
+        else:
+            self._fail(error)
+        raise GeminiUnavailable("Gemini rate limit reached" if time_left > 0 else "Gemini call deadline passed")
+
+    def _reject(self, ticket):
+        self._count("rejected")
+        self.breaker.cancel(ticket)
+
+    # Sleep before a retry; False (without sleeping) when the retry would start past the deadline
+    def _backoff(self, attempt, deadline):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if delay >= self._time_left(deadline):
+            return False
+        time.sleep(delay)
+        return True
+
+    def _request_options(self, deadline):
+        timeout = min(self.request_timeout or math.inf, self._time_left(deadline))
+        return {"timeout": max(0.001, timeout)} if timeout != math.inf else None
+
+    # Generate a complete reply and return its text
+    def generate(self, prompt, deadline=None):
+        ticket = self._admit(deadline)
+        error = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                self._take_token(ticket, attempt, error, deadline)
+                self._count("calls")
+                try:
+                    response = self._get_model().generate_content(
+                        prompt, request_options=self._request_options(deadline)
+                    )
+                    text = response.text
+                except Exception as e:
+                    error = e
+                    if isinstance(e, NON_RETRYABLE) or attempt == self.max_retries \
+                            or not self._backoff(attempt, deadline):
+                        self._fail(e)
+                        raise
+                    self._count("retries")
+                    logging.info(f"Gemini call failed ({e}), retrying")
+                    continue
+                self.breaker.record_success()
+                return text
+        finally:
+            self._slots.release()
+
+    # Yield the reply text chunk by chunk. Failures before the first chunk are retried;
+    # once text has been yielded an error is raised to the caller.
+    def stream(self, prompt, deadline=None):
+        ticket = self._admit(deadline)
+        finished = False
+        error = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                self._take_token(ticket, attempt, error, deadline)
+                self._count("calls")
+                started = False
+                try:
+                    for chunk in self._get_model().generate_content(
+                        prompt, stream=True, request_options=self._request_options(deadline)
+                    ):
+                        started = True
+                        yield chunk.text
+                except Exception as e:
+                    error = e
+                    if started or isinstance(e, NON_RETRYABLE) or attempt == self.max_retries \
+                            or not self._backoff(attempt, deadline):
+                        finished = True
+                        self._fail(e)
+                        raise
+                    self._count("retries")
+                    logging.info(f"Gemini stream failed ({e}), retrying")
+                    continue
+                finished = True
+                self.breaker.record_success()
+                return
+        finally:
+            # A consumer that stops reading early leaves the outcome unknown
+            if not finished:
+                self.breaker.cancel(ticket)
+            self._slots.release()
+
+    def _fail(self, error):
+        self._count("failures")
+        if isinstance(error, NON_RETRYABLE):
+            self._count("client_errors")
+            self.breaker.record_success()  # Gemini is up, it refused this request
+        else:
+            self.breaker.record_failure()
+
+    def stats(self):
+        return {
+            "model": self.model_name,
+            "rate_per_minute": self.rate_per_minute,
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "client_errors": self.client_errors,
+            "rejected": self.rejected,
+            "breaker_state": self.breaker.state,
+            "breaker_open": self.breaker.state != "closed",
+            "breaker_trips": self.breaker.trips,
+        }
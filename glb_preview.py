@@ -0,0 +1,364 @@
+import argparse
+import json
+import struct
+import zlib
+
+import numpy as np
+
+GLB_MAGIC = b"glTF"
+JSON_CHUNK = 0x4E4F534A
+BIN_CHUNK = 0x004E4942
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+BYTE, UNSIGNED_BYTE, SHORT, UNSIGNED_SHORT, UNSIGNED_INT, FLOAT = 5120, 5121, 5122, 5123, 5125, 5126
+COMPONENT_DTYPES = {
+    BYTE: np.int8, UNSIGNED_BYTE: np.uint8, SHORT: np.int16,
+    UNSIGNED_SHORT: np.uint16, UNSIGNED_INT: np.uint32, FLOAT: np.float32,
+}
+TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+# Lightweight first-paint copy of a glTF binary for the anatomy viewer:
+# vertex data quantized with KHR_mesh_quantization (positions as normalized int16 rescaled by the
+# mesh node's matrix, normals as int8, texture coordinates as uint16, indices as uint16) and
+# embedded PNG textures box-downscaled to at most max_texture_size pixels.
+# Only numpy and zlib are needed, so the asset build runs where the app runs.
+def make_preview(data, max_texture_size=512):
+    gltf, binary = read_glb(data)
+    if any("sparse" in accessor or "bufferView" not in accessor for accessor in gltf["accessors"]):
+        raise ValueError("Sparse or buffer-less accessors are not supported")
+    usage = _accessor_usage(gltf)
+    quantized_meshes = _quantizable_meshes(gltf)
+
+    writer = _BinaryWriter()
+    accessors = []
+    mesh_transforms = {}
+    for mesh_index in quantized_meshes:
+        positions = [_read_accessor(gltf, binary, primitive["attributes"]["POSITION"])
+                     for primitive in gltf["meshes"][mesh_index]["primitives"]]
+        low = np.min([p.min(axis=0) for p in positions], axis=0)
+        high = np.max([p.max(axis=0) for p in positions], axis=0)
+        center = (low + high) / 2
+        # One scale for all axes, so the stored normals stay valid without renormalizing
+        mesh_transforms[mesh_index] = (center, max(float((high - low).max()) / 2, 1e-12))
+
+    for index, accessor in enumerate(gltf["accessors"]):
+        values = _read_accessor(gltf, binary, index)
+        role, mesh_index = usage.get(index, (None, None))
+        new = {key: accessor[key] for key in ("type", "count", "name") if key in accessor}
+        if role == "POSITION" and mesh_index in mesh_transforms:
+            center, scale = mesh_transforms[mesh_index]
+            quantized = np.round((values - center) / scale * 32767).astype(np.int16)
+            new.update(componentType=SHORT, normalized=True,
+                       min=quantized.min(axis=0).tolist(), max=quantized.max(axis=0).tolist())
+            new["bufferView"] = writer.add_vertex_data(quantized)
+        elif role == "NORMAL" and accessor["componentType"] == FLOAT:
+            quantized = np.round(np.clip(values, -1, 1) * 127).astype(np.int8)
+            new.update(componentType=BYTE, normalized=True, bufferView=writer.add_vertex_data(quantized))
+        elif role == "TEXCOORD" and accessor["componentType"] == FLOAT and values.min() >= 0 and values.max() <= 1:
+            quantized = np.round(values * 65535).astype(np.uint16)
+            new.update(componentType=UNSIGNED_SHORT, normalized=True, bufferView=writer.add_vertex_data(quantized))
+        elif role == "INDICES" and accessor["componentType"] == UNSIGNED_INT and values.max() < 65536:
+            new.update(componentType=UNSIGNED_SHORT, bufferView=writer.add(values.astype(np.uint16).tobytes(),
+                                                                           target=ELEMENT_ARRAY_BUFFER))
+        else:
+            for key in ("componentType", "normalized", "min", "max"):
+                if key in accessor:
+                    new[key] = accessor[key]
+            target = ELEMENT_ARRAY_BUFFER if role == "INDICES" else ARRAY_BUFFER if role else None
+            if role and role != "INDICES":
+                new["bufferView"] = writer.add_vertex_data(values)
+            else:
+                new["bufferView"] = writer.add(values.tobytes(), target=target)
+        accessors.append(new)
+
+    for image in gltf.get("images", []):
+        if "bufferView" not in image:
+            continue
+        content = _read_view(gltf, binary, image["bufferView"])
+        if image.get("mimeType") == "image/png":
+            try:
+                content = downscale_png(content, max_texture_size)
+            except ValueError:
+                pass  # unsupported PNG flavour: keep the original texture
+        image["bufferView"] = writer.add(content)
+
+    for node in gltf.get("nodes", []):
+        if node.get("mesh") in mesh_transforms:
+            center, scale = mesh_transforms[node["mesh"]]
+            dequantize = np.diag([scale, scale, scale, 1.0])
+            dequantize[:3, 3] = center
+            node["matrix"] = (_node_matrix(node) @ dequantize).T.reshape(-1).tolist()
+            for key in ("translation", "rotation", "scale"):
+                node.pop(key, None)
+
+    gltf["accessors"] = accessors
+    gltf["bufferViews"] = writer.views
+    gltf["buffers"] = [{"byteLength": len(writer.data)}]
+    for key in ("extensionsUsed", "extensionsRequired"):
+        names = gltf.setdefault(key, [])
+        if "KHR_mesh_quantization" not in names:
+            names.append("KHR_mesh_quantization")
+    return write_glb(gltf, bytes(writer.data))
+
+
+def read_glb(data):
+    magic, version, length = struct.unpack_from("<4sII", data, 0)
+    if magic != GLB_MAGIC or version != 2:
+        raise ValueError("Not a glTF 2.0 binary")
+    gltf, binary = None, b""
+    offset = 12
+    while offset < length:
+        chunk_length, chunk_type = struct.unpack_from("<II", data, offset)
+        chunk = data[offset + 8:offset + 8 + chunk_length]
+        if chunk_type == JSON_CHUNK:
+            gltf = json.loads(chunk)
+        elif chunk_type == BIN_CHUNK:
+            binary = chunk
+        offset += 8 + chunk_length
+    if gltf is None:
+        raise ValueError("glTF binary without a JSON chunk")
+    return gltf, binary
+
+
+def write_glb(gltf, binary):
+    content = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    content += b" " * (-len(content) % 4)
+    binary += b"\0" * (-len(binary) % 4)
+    length = 12 + 8 + len(content) + 8 + len(binary)
+    return b"".join([
+        struct.pack("<4sII", GLB_MAGIC, 2, length),
+        struct.pack("<II", len(content), JSON_CHUNK), content,
+        struct.pack("<II", len(binary), BIN_CHUNK), binary,
+    ])
+
+
+class _BinaryWriter:
+    def __init__(self):
+        self.data = bytearray()
+        self.views = []
+
+    def add(self, content, target=None, stride=None):
+        self.data += b"\0" * (-len(self.data) % 4)
+        view = {"buffer": 0, "byteOffset": len(self.data), "byteLength": len(content)}
+        if stride:
+            view["byteStride"] = stride
+        if target:
+            view["target"] = target
+        self.data += content
+        self.views.append(view)
+        return len(self.views) - 1
+
+    # Vertex attributes: every element padded to a multiple of 4 bytes, as glTF requires
+    def add_vertex_data(self, values):
+        values = np.ascontiguousarray(values)
+        element = values.shape[1] * values.itemsize
+        stride = element + (-element % 4)
+        rows = np.zeros((len(values), stride), dtype=np.uint8)
+        rows[:, :element] = values.view(np.uint8).reshape(len(values), element)
+        return self.add(rows.tobytes(), target=ARRAY_BUFFER, stride=stride)
+
+
+def _read_view(gltf, binary, index):
+    view = gltf["bufferViews"][index]
+    start = view.get("byteOffset", 0)
+    return binary[start:start + view["byteLength"]]
+
+
+# (count, components) array of an accessor, honouring the buffer view's stride
+def _read_accessor(gltf, binary, index):
+    accessor = gltf["accessors"][index]
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    dtype = np.dtype(COMPONENT_DTYPES[accessor["componentType"]])
+    components = TYPE_SIZES[accessor["type"]]
+    stride = view.get("byteStride") or components * dtype.itemsize
+    offset = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    values = np.ndarray((accessor["count"], components), dtype=dtype, buffer=binary, offset=offset,
+                        strides=(stride, dtype.itemsize))
+    return values.copy()
+
+
+# accessor index -> (POSITION / NORMAL / TEXCOORD / INDICES / ATTRIBUTE, mesh index)
+def _accessor_usage(gltf):
+    usage = {}
+    for mesh_index, mesh in enumerate(gltf.get("meshes", [])):
+        for primitive in mesh["primitives"]:
+            for name, index in primitive["attributes"].items():
+                role = "TEXCOORD" if name.startswith("TEXCOORD_") else name if name in ("POSITION", "NORMAL") \
+                    else "ATTRIBUTE"
+                usage[index] = (role, mesh_index)
+            if "indices" in primitive:
+                usage[primitive["indices"]] = ("INDICES", mesh_index)
+            for target in primitive.get("targets", []):
+                for index in target.values():
+                    usage[index] = ("ATTRIBUTE", mesh_index)
+    return usage
+
+
+# Meshes whose positions can be rescaled through their node: used by exactly one node,
+# not skinned, no morph targets and float positions that no other mesh shares
+def _quantizable_meshes(gltf):
+    users = {}
+    for node in gltf.get("nodes", []):
+        if "mesh" in node:
+            users.setdefault(node["mesh"], []).append(node)
+    position_owners = {}
+    for mesh_index, mesh in enumerate(gltf.get("meshes", [])):
+        for primitive in mesh["primitives"]:
+            position_owners.setdefault(primitive["attributes"].get("POSITION"), set()).add(mesh_index)
+    meshes = []
+    for mesh_index, mesh in enumerate(gltf.get("meshes", [])):
+        nodes = users.get(mesh_index, [])
+        if len(nodes) != 1 or "skin" in nodes[0] or any("targets" in p for p in mesh["primitives"]):
+            continue
+        positions = [p["attributes"].get("POSITION") for p in mesh["primitives"]]
+        if any(index is None or gltf["accessors"][index]["componentType"] != FLOAT
+               or position_owners[index] != {mesh_index} for index in positions):
+            continue
+        meshes.append(mesh_index)
+    return meshes
+
+
+def _node_matrix(node):
+    if "matrix" in node:
+        return np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+    x, y, z, w = node.get("rotation", [0.0, 0.0, 0.0, 1.0])
+    rotation = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.array(node.get("scale", [1.0, 1.0, 1.0]))
+    matrix[:3, 3] = node.get("translation", [0.0, 0.0, 0.0])
+    return matrix
+
+
+# 8-bit, non-interlaced RGB/RGBA/grey PNGs only; anything else raises ValueError
+def decode_png(content):
+    if not content.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG")
+    offset = len(PNG_SIGNATURE)
+    header, compressed = None, []
+    while offset < len(content):
+        length, kind = struct.unpack_from(">I4s", content, offset)
+        body = content[offset + 8:offset + 8 + length]
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind == b"IDAT":
+            compressed.append(body)
+        elif kind == b"IEND":
+            break
+        offset += 12 + length
+    width, height, depth, color_type, _, _, interlace = header
+    channels = {0: 1, 2: 3, 4: 2, 6: 4}.get(color_type)
+    if depth != 8 or channels is None or interlace:
+        raise ValueError(f"Unsupported PNG (depth={depth}, color type={color_type}, interlace={interlace})")
+    raw = zlib.decompress(b"".join(compressed))
+    return _unfilter(raw, width, height, channels).reshape(height, width, channels)
+
+
+def _unfilter(raw, width, height, channels):
+    stride = width * channels
+    rows = np.frombuffer(raw, dtype=np.uint8).reshape(height, stride + 1)
+    pixels = np.zeros((height, stride), dtype=np.uint8)
+    previous = np.zeros(stride, dtype=np.uint8)
+    for y in range(height):
+        kind, line = rows[y, 0], rows[y, 1:]
+        if kind == 0:
+            current = line.copy()
+        elif kind == 1:
+            current = np.cumsum(line.reshape(width, channels), axis=0, dtype=np.uint8).reshape(-1)
+        elif kind == 2:
+            current = line + previous
+        elif kind in (3, 4):
+            current = _unfilter_sequential(kind, line.tolist(), previous.tolist(), channels)
+        else:
+            raise ValueError(f"Unknown PNG filter {kind}")
+        pixels[y] = current
+        previous = pixels[y]
+    return pixels
+
+
+# Average and Paeth depend on the pixel just decoded to the left, so they run byte by byte
+def _unfilter_sequential(kind, line, above, bpp):
+    out = [0] * len(line)
+    for i, value in enumerate(line):
+        left = out[i - bpp] if i >= bpp else 0
+        up = above[i]
+        if kind == 3:
+            out[i] = (value + ((left + up) >> 1)) & 0xFF
+        else:
+            upper_left = above[i - bpp] if i >= bpp else 0
+            estimate = left + up - upper_left
+            distance_left, distance_up, distance_upper_left = (
+                abs(estimate - left), abs(estimate - up), abs(estimate - upper_left)
+            )
+            if distance_left <= distance_up and distance_left <= distance_upper_left:
+                predictor = left
+            elif distance_up <= distance_upper_left:
+                predictor = up
+            else:
+                predictor = upper_left
+            out[i] = (value + predictor) & 0xFF
+    return np.array(out, dtype=np.uint8)
+
+
+def encode_png(pixels):
+    height, width, channels = pixels.shape
+    color_type = {1: 0, 2: 4, 3: 2, 4: 6}[channels]
+    image = pixels.reshape(height, width * channels).astype(np.int16)
+    left = np.zeros_like(image)
+    left[:, channels:] = image[:, :-channels]
+    up = np.zeros_like(image)
+    up[1:] = image[:-1]
+    upper_left = np.zeros_like(image)
+    upper_left[1:, channels:] = image[:-1, :-channels]
+    estimate = left + up - upper_left
+    distances = np.abs(estimate[None] - np.stack([left, up, upper_left]))
+    paeth = np.where((distances[0] <= distances[1]) & (distances[0] <= distances[2]), left,
+                     np.where(distances[1] <= distances[2], up, upper_left))
+    # Filtered rows for None, Sub, Up, Average and Paeth; keep the one with the smallest residuals per row
+    candidates = np.stack([image, image - left, image - up, image - (left + up) // 2, image - paeth]) & 0xFF
+    signed = np.where(candidates > 127, 256 - candidates, candidates).sum(axis=2)
+    best = signed.argmin(axis=0)
+    filtered = candidates[best, np.arange(height)].astype(np.uint8)
+    raw = np.concatenate([best.astype(np.uint8)[:, None], filtered], axis=1).tobytes()
+
+    def chunk(kind, body):
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return PNG_SIGNATURE + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 9)) + chunk(b"IEND", b"")
+
+
+# Shrink by the smallest whole factor that fits max_size (box filter); returns the input if it fits
+def downscale_png(content, max_size):
+    pixels = decode_png(content)
+    height, width, channels = pixels.shape
+    factor = -(-max(height, width) // max_size)
+    if factor <= 1:
+        return content
+    height, width = height // factor, width // factor
+    blocks = pixels[:height * factor, :width * factor].reshape(height, factor, width, factor, channels)
+    return encode_png(np.round(blocks.mean(axis=(1, 3))).astype(np.uint8))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a quantized, low-resolution preview of a GLB model")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--max-texture-size", type=int, default=512)
+    args = parser.parse_args()
+    with open(args.input, "rb") as f:
+        data = f.read()
+    preview = make_preview(data, args.max_texture_size)
+    with open(args.output, "wb") as f:
+        f.write(preview)
+    print(f"{args.input}: {len(data):,} bytes -> {args.output}: {len(preview):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+
+# Load chat.py (lexicons; the model and lookup table too unless STARTUP_MODE=background) before forking
+preload_app = True
+
+# Workers share the master's Flask secret key; with more than one worker the
+# conversation state must live in the shared SQLite backend
+os.environ.setdefault("SESSION_BACKEND", "sqlite" if workers > 1 else "memory")
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.start_background_workers()
+
+
+# Flush the queued assessment log records before the worker goes away
+def worker_exit(server, worker):
+    import wsgi
+    wsgi.stop_background_workers()
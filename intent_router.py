@@ -0,0 +1,107 @@
+import re
+
+from symptom_extractor import KeywordAutomaton
+
+# Fasting blood sugar and age patterns, compiled once at import
+FBS_PATTERN = re.compile(r'قند\s*(?:خون)?\s*(?:ناشتا(?:ی من|م)?)?\s*(?:من|م)?\s*(\d{2,3})|قند\b.*?\b(\d+)\b')
+AGE_PATTERN = re.compile(r'(\d+)\s*سال', re.IGNORECASE)
+STANDALONE_AGE_PATTERN = re.compile(r'\b(\d+)\b(?!\s*%)')
+
+
+# Same cleaning process_user_input has always applied
+def clean_input(user_input):
+    return user_input.lower().replace("\u200c", "")
+
+
+# Everything the router found in one message.
+# matches maps an intent class to its (start, end, keyword) spans in the cleaned text.
+class RoutedInput:
+    __slots__ = ("raw", "clean", "matches", "exact", "fbs_value", "fbs_span", "age", "age_span", "gender")
+
+    def __init__(self, raw, clean):
+        self.raw = raw
+        self.clean = clean
+        self.matches = {}
+        self.exact = set()
+        self.fbs_value = None
+        self.fbs_span = None
+        self.age = None
+        self.age_span = None
+        self.gender = None
+
+    # Substring match of any keyword of the class (same as any(word in text ...))
+    def has(self, intent):
+        return intent in self.matches
+
+    # Whole cleaned text equals one of the class keywords
+    def is_exact(self, intent):
+        return intent in self.exact
+
+    def spans(self, intent):
+        return self.matches.get(intent, [])
+
+    def intents(self):
+        return sorted(set(self.matches) | self.exact)
+
+
+class IntentRouter:
+    # keywords: intent class -> substring keywords
+    # exact: intent class -> phrases that must equal the whole cleaned text
+    # patterns: intent class -> regexes searched in the cleaned text
+    # gender_keywords: gender code -> keywords, checked in order
+    def __init__(self, keywords, exact=None, patterns=None, gender_keywords=None):
+        self._automaton = KeywordAutomaton()
+        for intent, words in keywords.items():
+            for word in words:
+                self._automaton.add(word, (intent, word))
+        self._automaton.build()
+
+        self._exact = {}
+        for intent, phrases in (exact or {}).items():
+            for phrase in phrases:
+                self._exact.setdefault(phrase, []).append(intent)
+
+        self._patterns = {
+            intent: re.compile("|".join(f"(?:{p})" for p in regexes))
+            for intent, regexes in (patterns or {}).items()
+        }
+
+        self._gender_keywords = []
+        for gender, words in (gender_keywords or {}).items():
+            automaton = KeywordAutomaton()
+            for word in words:
+                automaton.add(word, gender)
+            self._gender_keywords.append((gender, automaton.build()))
+
+    def route(self, user_input):
+        clean = clean_input(user_input)
+        routed = RoutedInput(user_input, clean)
+
+        for start, end, (intent, word) in self._automaton.iter_matches(clean):
+            routed.matches.setdefault(intent, []).append((start, end, word))
+        routed.exact.update(self._exact.get(clean, ()))
+
+        for intent, pattern in self._patterns.items():
+            spans = [(m.start(), m.end(), m.group(0)) for m in pattern.finditer(clean)]
+            if spans:
+                routed.matches[intent] = spans
+
+        fbs_match = FBS_PATTERN.search(clean)
+        if fbs_match:
+            routed.fbs_value = int(fbs_match.group(1) or fbs_match.group(2))
+            routed.fbs_span = fbs_match.span()
+
+        # An explicit "N سال" wins over a bare number, even when it is out of range
+        age_match = AGE_PATTERN.search(user_input) or STANDALONE_AGE_PATTERN.search(clean)
+        if age_match:
+            age = int(age_match.group(1))
+            if 0 <= age <= 99:
+                routed.age = age
+                routed.age_span = age_match.span()
+
+        for gender, automaton in self._gender_keywords:
+            if next(automaton.iter_matches(clean), None) is not None:
+                routed.gender = gender
+                break
+
+        return routed
@@ -0,0 +1,87 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+_deadline_at = contextvars.ContextVar("llm_deadline_at", default=None)
+
+
+# time.monotonic() by which the pipeline call running in this context must be done, or None
+# outside the pipeline; the Gemini client fits its timeouts and retries into what is left
+def current_deadline():
+    return _deadline_at.get()
+
+
+# Thread-pool execution of LLM calls with a per-call deadline.
+# Calls can be started speculatively and cancelled (or abandoned) when the
+# conversation flow turns out not to need them.
+class LLMPipeline:
+    def __init__(self, max_workers=32, deadline_seconds=10.0):
+        self.deadline = deadline_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self.max_workers = max_workers
+        self.submitted = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.failures = 0
+
+    # The deadline counts from submission, so a speculative call does not get extra time.
+    # The call runs in a copy of the caller's context (e.g. its reply stream).
+    def submit(self, fn, *args, **kwargs):
+        deadline_at = time.monotonic() + self.deadline
+        context = contextvars.copy_context()
+        context.run(_deadline_at.set, deadline_at)
+        future = self._executor.submit(context.run, fn, *args, **kwargs)
+        future.deadline_at = deadline_at
+        with self._lock:
+            self.submitted += 1
+        return future
+
+    # Wait for a submitted call; returns fallback when the deadline passes or the call fails
+    def wait(self, future, fallback):
+        try:
+            result = future.result(timeout=max(0.0, future.deadline_at - time.monotonic()))
+        except FutureTimeoutError:
+            logging.error("LLM call missed its deadline, using fallback reply")
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            return fallback
+        except Exception as e:
+            logging.error(f"LLM call failed: {e}")
+            with self._lock:
+                self.failures += 1
+            return fallback
+        with self._lock:
+            self.completed += 1
+        return result
+
+    # Run one call under the deadline
+    def run(self, fn, *args, fallback=None, **kwargs):
+        return self.wait(self.submit(fn, *args, **kwargs), fallback)
+
+    # Drop a speculative call that is no longer needed. A call that already started
+    # cannot be interrupted; its result is simply ignored.
+    def discard(self, future):
+        future.cancel()
+        with self._lock:
+            self.cancelled += 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "deadline_seconds": self.deadline,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                "cancelled": self.cancelled,
+                "in_flight": self.submitted - self.completed - self.timeouts - self.failures - self.cancelled,
+            }
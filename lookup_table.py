@@ -0,0 +1,161 @@
+import argparse
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+TABLE_PATH = 'mlp_model/probability_table.f32'
+
+NUM_SYMPTOMS = 14
+MAX_AGE = 99
+NUM_GENDERS = 2
+TABLE_SIZE = (MAX_AGE + 1) * NUM_GENDERS * (1 << NUM_SYMPTOMS)
+
+
+# Pack (age, gender, symptom bitmask) into one integer key.
+# Bit i of the mask is the answer for symptom_names[i].
+def pack_key(age, gender, symptoms):
+    mask = 0
+    for i, value in enumerate(symptoms):
+        if value:
+            mask |= 1 << i
+    return pack_mask_key(age, gender, mask)
+
+
+def pack_mask_key(age, gender, mask):
+    age, gender = int(age), int(gender)
+    if not (0 <= age <= MAX_AGE and gender in (0, 1) and 0 <= mask < (1 << NUM_SYMPTOMS)):
+        raise ValueError(f"Input outside table range: age={age}, gender={gender}, mask={mask}")
+    return ((age * NUM_GENDERS + gender) << NUM_SYMPTOMS) | mask
+
+
+# Decode a vector of keys into model feature rows
+def keys_to_features(keys):
+    keys = np.asarray(keys, dtype=np.int64)
+    features = np.empty((len(keys), 2 + NUM_SYMPTOMS), dtype=np.float32)
+    prefix = keys >> NUM_SYMPTOMS
+    features[:, 0] = prefix // NUM_GENDERS
+    features[:, 1] = prefix % NUM_GENDERS
+    bits = (keys[:, None] >> np.arange(NUM_SYMPTOMS)) & 1
+    features[:, 2:] = bits
+    return features
+
+
+def _predict_keys(model, keys):
+    return np.asarray(model.predict(keys_to_features(keys), verbose=0), dtype=np.float32).reshape(-1)
+
+
+# Precompute every probability into a flat float32 file.
+# The file is written under a temporary name and renamed, so workers never map a half-built table.
+def build_table(model, path=TABLE_PATH, batch_size=65536):
+    tmp_path = f"{path}.tmp"
+    table = np.memmap(tmp_path, dtype=np.float32, mode='w+', shape=(TABLE_SIZE,))
+    for start in range(0, TABLE_SIZE, batch_size):
+        stop = min(start + batch_size, TABLE_SIZE)
+        table[start:stop] = _predict_keys(model, np.arange(start, stop))
+    table.flush()
+    del table
+    os.replace(tmp_path, path)
+    logging.info(f"Built probability table with {TABLE_SIZE} entries at {path}")
+
+
+# Read-only, memory-mapped table shared by all worker processes through the page cache
+class ProbabilityTable:
+    def __init__(self, path=TABLE_PATH):
+        expected = TABLE_SIZE * np.dtype(np.float32).itemsize
+        actual = os.path.getsize(path)
+        if actual != expected:
+            raise ValueError(f"Probability table {path} has {actual} bytes, expected {expected}")
+        self.path = path
+        self.table = np.memmap(path, dtype=np.float32, mode='r', shape=(TABLE_SIZE,))
+
+    def lookup(self, age, gender, symptoms):
+        return float(self.table[pack_key(age, gender, symptoms)])
+
+    def lookup_keys(self, keys):
+        return np.asarray(self.table[np.asarray(keys, dtype=np.int64)])
+
+    def stats(self):
+        return {"mode": "precomputed", "entries": TABLE_SIZE, "path": self.path}
+
+
+# Fill-on-miss variant with a bounded in-memory LRU cache, for when precomputing is too expensive
+class LazyProbabilityTable:
+    def __init__(self, model, max_entries=65536):
+        self.model = model
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, age, gender, symptoms):
+        key = pack_key(age, gender, symptoms)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+
+        probability = float(_predict_keys(self.model, [key])[0])
+        with self._lock:
+            self._cache[key] = probability
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return probability
+
+    def lookup_keys(self, keys):
+        return np.array([self.lookup(*self._unpack(k)) for k in keys], dtype=np.float32)
+
+    @staticmethod
+    def _unpack(key):
+        row = keys_to_features([key])[0]
+        return int(row[0]), int(row[1]), [int(v) for v in row[2:]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": "lazy",
+                "entries": len(self._cache),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Compare table entries with the live model; returns the max absolute difference
+def verify_table(table, model, samples=4096, atol=1e-5, seed=0):
+    rng = np.random.default_rng(seed)
+    keys = rng.integers(0, TABLE_SIZE, size=samples)
+    expected = _predict_keys(model, keys)
+    actual = table.lookup_keys(keys)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    if max_diff > atol:
+        raise AssertionError(f"Probability table does not match the model (max abs diff {max_diff})")
+    return max_diff
+
+
+def main():
+    from numpy_model import NumpyMLP, NUMPY_MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Build or verify the precomputed probability table")
+    parser.add_argument("command", choices=["build", "verify"])
+    parser.add_argument("--path", default=TABLE_PATH)
+    parser.add_argument("--model-path", default=NUMPY_MODEL_PATH)
+    parser.add_argument("--samples", type=int, default=100000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    model = NumpyMLP.load(args.model_path)
+    if args.command == "build":
+        build_table(model, args.path)
+    max_diff = verify_table(ProbabilityTable(args.path), model, samples=args.samples)
+    print(f"Probability table matches the model (max abs diff {max_diff:.2e})")
+
+
+if __name__ == "__main__":
+    main()
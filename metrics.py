@@ -0,0 +1,271 @@
+import bisect
+import contextvars
+import functools
+import heapq
+import itertools
+import random
+import threading
+import time
+
+# Latency buckets in seconds, from regex-only turns up to slow Gemini calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_trace = contextvars.ContextVar("turn_trace", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in itertools.chain(zip(names, values), extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_labels(self.label_names, label_values)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        for label_values, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = (("le", _number(float(bound))),)
+                yield f"{self.name}_bucket{_labels(self.label_names, label_values, le)} {cumulative}"
+            labels = _labels(self.label_names, label_values)
+            yield f"{self.name}_bucket{_labels(self.label_names, label_values, (('le', '+Inf'),))} {values[-1]}"
+            yield f"{self.name}_sum{labels} {_number(values[-2])}"
+            yield f"{self.name}_count{labels} {values[-1]}"
+
+
+# Metrics of one process in the Prometheus text exposition format.
+# Each gunicorn worker keeps its own registry; scrapes see the worker that served them.
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    # gauges: {component: stats dict}; numeric (and boolean) values are exported as
+    # <prefix>_<component>_<key> gauges, so the /health numbers can be scraped too
+    def render(self, gauges=None, prefix="chat"):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for component, stats in (gauges or {}).items():
+            for key, value in (stats or {}).items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{component}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+# Per-stage breakdown of one sampled turn
+class TurnTrace:
+    __slots__ = ("started", "stages", "info", "_lock")
+
+    def __init__(self, info):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.info = info
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+
+class _StageTimer:
+    __slots__ = ("tracer", "stage", "started")
+
+    def __init__(self, tracer, stage):
+        self.tracer = tracer
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        self.tracer.stage_seconds.observe(elapsed, self.stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(self.stage, elapsed)
+        return False
+
+
+class _TurnTimer:
+    __slots__ = ("tracer", "info", "started", "trace", "token")
+
+    def __init__(self, tracer, info):
+        self.tracer = tracer
+        self.info = info
+
+    def __enter__(self):
+        self.trace = None
+        self.token = None
+        tracer = self.tracer
+        if tracer.slow_turns and random.random() < tracer.sample_rate:
+            self.trace = TurnTrace(self.info)
+            self.token = _current_trace.set(self.trace)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        elapsed = time.perf_counter() - self.started
+        self.tracer.turn_seconds.observe(elapsed, "error" if exc_type else "ok")
+        if self.token is not None:
+            _current_trace.reset(self.token)
+            self.tracer._record_slow_turn(elapsed, self.trace)
+        return False
+
+
+# Timing of chat turns and of the stages inside them.
+# Stage durations go to a histogram labelled by stage. With slow_turns > 0, a fraction
+# sample_rate of the turns also keeps a per-stage breakdown and the slowest slow_turns
+# of those are retained. When disabled, turn() and stage() return a shared no-op and
+# wrap() returns the function unchanged.
+class Tracer:
+    def __init__(self, registry, enabled=True, slow_turns=0, sample_rate=1.0):
+        self.enabled = enabled
+        self.slow_turns = slow_turns
+        self.sample_rate = sample_rate
+        self.turn_seconds = registry.histogram(
+            "chat_turn_duration_seconds", "Time to process one chat turn", labels=("outcome",)
+        )
+        self.stage_seconds = registry.histogram(
+            "chat_stage_duration_seconds", "Time spent in each stage of a chat turn", labels=("stage",)
+        )
+        self._slowest = []  # min-heap of (seconds, sequence, record)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    # info: extra fields kept with the turn if it is sampled (no message text, only sizes etc.)
+    def turn(self, **info):
+        if not self.enabled:
+            return _NOOP
+        return _TurnTimer(self, info)
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NOOP
+        return _StageTimer(self, name)
+
+    # Decorator timing every call of the function as the given stage
+    def wrap(self, name):
+        def decorator(fn):
+            if not self.enabled:
+                return fn
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with _StageTimer(self, name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _record_slow_turn(self, seconds, trace):
+        with trace._lock:
+            stages = {stage: round(value * 1000, 3) for stage, value in trace.stages.items()}
+        record = {
+            "duration_ms": round(seconds * 1000, 3),
+            **trace.info,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "stages_ms": stages,
+        }
+        entry = (seconds, next(self._sequence), record)
+        with self._lock:
+            if len(self._slowest) < self.slow_turns:
+                heapq.heappush(self._slowest, entry)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    # Slowest sampled turns, slowest first
+    def slowest_turns(self):
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        return [record for _, _, record in entries]
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "slow_turn_capacity": self.slow_turns,
+            "sample_rate": self.sample_rate,
+            "sampled_turns_kept": len(self._slowest),
+        }
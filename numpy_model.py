@@ -0,0 +1,176 @@
+import argparse
+import logging
+import os
+
+import numpy as np
+
+KERAS_MODEL_PATH = 'mlp_model/mlp_model.keras'
+NUMPY_MODEL_PATH = 'mlp_model/mlp_model.npz'
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x)),
+    "tanh": np.tanh,
+}
+
+
+# Pure-NumPy forward pass over the exported dense layers.
+# Exposes the same predict(x, verbose=0) -> (n, 1) interface as the Keras model,
+# so it can be used as a drop-in replacement in chat.py.
+class NumpyMLP:
+    def __init__(self, kernels, biases, activations):
+        if not (len(kernels) == len(biases) == len(activations)):
+            raise ValueError("kernels, biases and activations must have the same length")
+        for activation in activations:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+        self.kernels = [np.ascontiguousarray(k, dtype=np.float32) for k in kernels]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.activations = list(activations)
+
+    @classmethod
+    def load(cls, path=NUMPY_MODEL_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            count = int(data["num_layers"])
+            kernels = [data[f"kernel_{i}"] for i in range(count)]
+            biases = [data[f"bias_{i}"] for i in range(count)]
+            activations = [str(a) for a in data["activations"]]
+        return cls(kernels, biases, activations)
+
+    def save(self, path=NUMPY_MODEL_PATH):
+        arrays = {"num_layers": np.array(len(self.kernels)), "activations": np.array(self.activations)}
+        for i, (kernel, bias) in enumerate(zip(self.kernels, self.biases)):
+            arrays[f"kernel_{i}"] = kernel
+            arrays[f"bias_{i}"] = bias
+        np.savez_compressed(path, **arrays)
+
+    @property
+    def input_dim(self):
+        return self.kernels[0].shape[0]
+
+    def predict(self, x, verbose=0):
+        out = np.asarray(x, dtype=np.float32)
+        if out.ndim == 1:
+            out = out.reshape(1, -1)
+        for kernel, bias, activation in zip(self.kernels, self.biases, self.activations):
+            out = ACTIVATIONS[activation](out @ kernel + bias)
+        return out
+
+
+# Convert a loaded Keras Sequential model into dense layers.
+# Inference-mode BatchNormalization is folded into the following Dense layer
+# and Dropout/InputLayer are dropped, since they are identities at inference time.
+def keras_to_numpy(keras_model):
+    kernels, biases, activations = [], [], []
+    pending_scale, pending_shift = None, None
+
+    for layer in keras_model.layers:
+        kind = layer.__class__.__name__
+        if kind in ("InputLayer", "Dropout"):
+            continue
+        if kind == "BatchNormalization":
+            gamma, beta, mean, variance = [w.astype(np.float64) for w in layer.get_weights()]
+            scale = gamma / np.sqrt(variance + layer.epsilon)
+            shift = beta - mean * scale
+            if pending_scale is not None:
+                shift = pending_shift * scale + shift
+                scale = pending_scale * scale
+            pending_scale, pending_shift = scale, shift
+            continue
+        if kind == "Dense":
+            kernel, bias = [w.astype(np.float64) for w in layer.get_weights()]
+            if pending_scale is not None:
+                bias = pending_shift @ kernel + bias
+                kernel = pending_scale[:, None] * kernel
+                pending_scale, pending_shift = None, None
+            kernels.append(kernel)
+            biases.append(bias)
+            activations.append(layer.get_config()["activation"])
+            continue
+        raise ValueError(f"Unsupported layer for NumPy export: {kind} ({layer.name})")
+
+    if pending_scale is not None:
+        # Trailing normalization: keep it as an explicit diagonal linear layer
+        kernels.append(np.diag(pending_scale))
+        biases.append(pending_shift)
+        activations.append("linear")
+
+    return NumpyMLP(kernels, biases, activations)
+
+
+def _load_keras_model(keras_path):
+    import tensorflow as tf  # only needed for export / parity checks
+    return tf.keras.models.load_model(keras_path)
+
+
+# Load the MLP model for serving (exported NumPy weights; TensorFlow is only imported as a fallback)
+def load_mlp_model(npz_path=NUMPY_MODEL_PATH, keras_path=KERAS_MODEL_PATH):
+    if os.path.exists(npz_path):
+        return NumpyMLP.load(npz_path)
+    logging.info(f"{npz_path} not found, falling back to Keras model")
+    return _load_keras_model(keras_path)
+
+
+# Export the Keras model weights into a compact .npz file
+def export_weights(keras_path=KERAS_MODEL_PATH, npz_path=NUMPY_MODEL_PATH):
+    numpy_model = keras_to_numpy(_load_keras_model(keras_path))
+    numpy_model.save(npz_path)
+    logging.info(
+        f"Exported {len(numpy_model.kernels)} dense layers to {npz_path} "
+        f"({os.path.getsize(npz_path)} bytes)"
+    )
+    return numpy_model
+
+
+# Random inputs covering the model's input space: age 0-99, gender 0/1, 14 binary symptoms
+def sample_inputs(count, input_dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.empty((count, input_dim), dtype=np.float32)
+    x[:, 0] = rng.integers(0, 100, size=count)
+    x[:, 1] = rng.integers(0, 2, size=count)
+    x[:, 2:] = rng.integers(0, 2, size=(count, input_dim - 2))
+    return x
+
+
+# Compare NumPy and Keras outputs; returns a summary dict and raises on mismatch
+def check_parity(keras_path=KERAS_MODEL_PATH, npz_path=NUMPY_MODEL_PATH,
+                 count=200000, atol=1e-5, batch_size=8192, seed=0):
+    keras_model = _load_keras_model(keras_path)
+    numpy_model = NumpyMLP.load(npz_path)
+    x = sample_inputs(count, numpy_model.input_dim, seed)
+
+    expected = keras_model.predict(x, batch_size=batch_size, verbose=0).reshape(-1)
+    actual = numpy_model.predict(x).reshape(-1)
+    diff = np.abs(expected.astype(np.float64) - actual.astype(np.float64))
+    decisions_differ = int(np.sum((expected > 0.5) != (actual > 0.5)))
+
+    summary = {
+        "samples": count,
+        "max_abs_diff": float(diff.max()),
+        "mean_abs_diff": float(diff.mean()),
+        "decision_mismatches": decisions_differ,
+        "atol": atol,
+    }
+    if summary["max_abs_diff"] > atol:
+        raise AssertionError(f"NumPy model diverges from Keras model: {summary}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and verify the NumPy version of the MLP model")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("--keras-path", default=KERAS_MODEL_PATH)
+    parser.add_argument("--npz-path", default=NUMPY_MODEL_PATH)
+    parser.add_argument("--samples", type=int, default=200000)
+    parser.add_argument("--atol", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == "export":
+        export_weights(args.keras_path, args.npz_path)
+    print(check_parity(args.keras_path, args.npz_path, count=args.samples, atol=args.atol))
+
+
+if __name__ == "__main__":
+    main()
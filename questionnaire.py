@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+NUM_QUESTIONS = 14
+
+
+# Early stopping for the structured questionnaire.
+# probability_fn(age, gender) returns the model probability (in percent) for every one of the
+# 2^num_questions answer masks, bit i being the answer to question i. After each answer the
+# masks that agree with the answers so far are checked: once all of them fall on the same side
+# of threshold (with `margin` to spare for batch-vs-single-row rounding), no remaining answer
+# can change the verdict and the questionnaire stops.
+# order="fixed" asks the remaining questions in list order, "information_gain" asks the one
+# whose answer is expected to tell the most about the verdict (uniform prior over the answers).
+class AdaptiveQuestionnaire:
+    ORDERS = ("fixed", "information_gain")
+
+    def __init__(self, probability_fn, num_questions=NUM_QUESTIONS, threshold=50.0, order="fixed",
+                 margin=1e-3, cache_size=128):
+        if order not in self.ORDERS:
+            raise ValueError(f"Unknown question order: {order}")
+        self.probability_fn = probability_fn
+        self.num_questions = num_questions
+        self.threshold = threshold
+        self.order = order
+        self.margin = margin
+        self.cache_size = cache_size
+        self.masks = np.arange(1 << num_questions, dtype=np.int64)
+        self.bits = ((self.masks[:, None] >> np.arange(num_questions)) & 1).astype(bool)
+        self._cache = OrderedDict()  # (age, gender) -> probabilities of every mask
+        self._lock = threading.Lock()
+        self.finished = 0
+        self.questions_asked = 0
+        self.questions_skipped = 0
+
+    def _probabilities(self, age, gender):
+        key = (age, gender)
+        with self._lock:
+            probabilities = self._cache.get(key)
+            if probabilities is not None:
+                self._cache.move_to_end(key)
+                return probabilities
+        probabilities = np.asarray(self.probability_fn(age, gender), dtype=np.float64).reshape(-1)
+        with self._lock:
+            self._cache[key] = probabilities
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return probabilities
+
+    # Probabilities of the masks consistent with the answers given so far, raised to floor
+    # (the high blood sugar rule) and the indices of those masks
+    def _completions(self, age, gender, answer_mask, asked_mask, floor):
+        consistent = np.flatnonzero((self.masks & asked_mask) == answer_mask)
+        probabilities = self._probabilities(age, gender)[consistent]
+        if floor:
+            probabilities = np.maximum(probabilities, floor)
+        return consistent, probabilities
+
+    def _settled(self, probabilities):
+        return bool(probabilities.min() > self.threshold + self.margin
+                    or probabilities.max() <= self.threshold - self.margin)
+
+    def is_settled(self, age, gender, answer_mask, asked_mask, floor=0.0):
+        return self._settled(self._completions(age, gender, answer_mask, asked_mask, floor)[1])
+
+    # Index of the next question to ask, or None when the verdict is settled or all were asked
+    def next_question(self, age, gender, answer_mask, asked_mask, floor=0.0):
+        unasked = [i for i in range(self.num_questions) if not asked_mask >> i & 1]
+        if not unasked:
+            return None
+        consistent, probabilities = self._completions(age, gender, answer_mask, asked_mask, floor)
+        if self._settled(probabilities):
+            return None
+        if self.order == "fixed":
+            return unasked[0]
+        return unasked[int(np.argmin(self._expected_entropy(consistent, probabilities, unasked)))]
+
+    # Expected entropy of the verdict after answering each of the unasked questions
+    def _expected_entropy(self, consistent, probabilities, unasked):
+        likely = probabilities > self.threshold
+        bits = self.bits[consistent][:, unasked]
+        yes = bits.sum(axis=0)
+        yes_likely = (bits & likely[:, None]).sum(axis=0)
+        no = len(consistent) - yes
+        no_likely = likely.sum() - yes_likely
+        return (yes * _entropy(yes_likely, yes) + no * _entropy(no_likely, no)) / len(consistent)
+
+    def record_finish(self, asked):
+        with self._lock:
+            self.finished += 1
+            self.questions_asked += asked
+            self.questions_skipped += self.num_questions - asked
+
+    def stats(self):
+        with self._lock:
+            return {
+                "order": self.order,
+                "finished": self.finished,
+                "questions_asked": self.questions_asked,
+                "questions_skipped": self.questions_skipped,
+                "cached_profiles": len(self._cache),
+            }
+
+
+def _entropy(positive, total):
+    p = np.divide(positive, total, out=np.zeros(len(total)), where=total > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h = -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+    return np.nan_to_num(h)
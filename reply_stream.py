@@ -0,0 +1,113 @@
+import contextvars
+import json
+import queue
+import threading
+
+_current = contextvars.ContextVar("reply_stream", default=None)
+_FINISHED = object()
+
+
+# Server-Sent Events stream for one reply.
+# Code producing the reply calls write() with text as soon as it is known; the Flask
+# response iterates events() while the turn is still running.
+class ReplyStream:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._sent = []
+        self._final = None
+
+    # Make this stream the target of write() in the current thread/context
+    def bind(self):
+        return _current.set(self)
+
+    def write(self, text):
+        if text:
+            self._queue.put(text)
+
+    def finish(self, final_response):
+        self._final = final_response
+        self._queue.put(_FINISHED)
+
+    def events(self):
+        while True:
+            item = self._queue.get()
+            if item is _FINISHED:
+                break
+            self._sent.append(item)
+            yield sse_event({"chunk": item})
+
+        final = self._final or ""
+        sent = "".join(self._sent).rstrip()
+        if final.startswith(sent):
+            # Whatever was not streamed yet (canned replies, cached or speculative answers)
+            remainder = final[len(sent):]
+            if remainder:
+                yield sse_event({"chunk": remainder})
+        else:
+            # The streamed text was superseded (e.g. a deadline fallback after partial output)
+            yield sse_event({"response": final}, event="replace")
+        yield sse_event({"response": final}, event="done")
+
+
+# Buffers writes of a speculative call until the turn decides to use it (attach) or not (drop)
+class DeferredStream:
+    def __init__(self, parent):
+        self._parent = parent
+        self._buffer = []
+        self._attached = False
+        self._dropped = False
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            if self._dropped:
+                return
+            if not self._attached:
+                self._buffer.append(text)
+                return
+        self._parent.write(text)
+
+    def attach(self):
+        with self._lock:
+            buffered, self._buffer = self._buffer, []
+            self._attached = True
+            for text in buffered:
+                self._parent.write(text)
+
+    def drop(self):
+        with self._lock:
+            self._dropped = True
+            self._buffer = []
+
+
+# A deferred child of the current reply stream, or None when the turn is not streamed
+def defer():
+    parent = _current.get()
+    return DeferredStream(parent) if parent is not None else None
+
+
+# Call fn with write() going to the given stream (None disables streaming)
+def call_with(stream, fn, *args, **kwargs):
+    token = _current.set(stream)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _current.reset(token)
+
+
+def sse_event(data, event=None):
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+
+def active():
+    return _current.get() is not None
+
+
+# Send text to the reply stream of the current turn, if the client asked for streaming
+def write(text):
+    stream = _current.get()
+    if stream is not None:
+        stream.write(text)
@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from symptom_extractor import normalize_text
+
+
+# Near-identical phrasings share one key: Arabic/Persian letter variants, ZWNJ,
+# punctuation and whitespace are all normalized away
+def normalize_question(text):
+    return normalize_text(text).replace(" ", "")
+
+
+# Cache for Gemini replies with LRU + TTL eviction and optional SQLite persistence.
+# With a path, entries survive restarts and are shared by all workers on the host.
+class ResponseCache:
+    def __init__(self, max_entries=1024, ttl_seconds=86400, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.path = path
+        self._entries = OrderedDict()  # key -> (response, created, latency)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.latency_saved = 0.0
+
+        if path:
+            with self._db() as db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, latency REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+
+    # Key on the normalized question, the prompt context and the parts of user state the prompt uses.
+    # None (do not cache) when nothing is left of the question, e.g. "?" or "!!!": such messages
+    # would all share one key.
+    @staticmethod
+    def make_key(user_message, context="general", question_index=None, previous_symptoms=()):
+        question = normalize_question(user_message)
+        if not question:
+            return None
+        if context == "symptom_explanation":
+            scope = f"{context}:{question_index}"
+        else:
+            scope = f"{context}:{','.join(sorted(previous_symptoms))}"
+        raw = f"{scope}|{question}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    self.latency_saved += entry[2]
+                    return entry[0]
+                del self._entries[key]
+
+        entry = self._load(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.latency_saved += entry[2]
+            self._remember(key, entry)
+        return entry[0]
+
+    def put(self, key, response, latency=0.0):
+        entry = (response, time.time(), latency)
+        with self._lock:
+            self._remember(key, entry)
+            self.stores += 1
+        self._store(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            with self._db() as db:
+                db.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "persistent": bool(self.path),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "latency_saved_seconds": round(self.latency_saved, 3),
+            }
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # One connection per thread; WAL lets several worker processes read while one writes
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _load(self, key, now):
+        if not self.path:
+            return None
+        try:
+            row = self._db().execute(
+                "SELECT response, created, latency FROM responses WHERE key = ? AND created >= ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            return tuple(row) if row else None
+        except sqlite3.Error as e:
+            logging.error(f"Response cache read error: {e}")
+            return None
+
+    def _store(self, key, entry):
+        if not self.path:
+            return
+        try:
+            with self._db() as db:
+                db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, *entry))
+                # Drop expired rows and keep the table bounded
+                db.execute("DELETE FROM responses WHERE created < ?", (entry[1] - self.ttl,))
+                db.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY created DESC "
+                    "LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Response cache write error: {e}")
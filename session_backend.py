@@ -0,0 +1,139 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from session_store import PeriodicSweeper, SessionConflict, SessionStore, UserState
+
+
+# Session backend shared by every worker process on the host, stored in SQLite (WAL mode).
+# Transactions are optimistic: the state is read with its version, the turn runs without
+# holding a database lock (it may wait on Gemini), and the write only succeeds if nobody
+# else updated the session meanwhile; otherwise SessionConflict is raised and the caller retries.
+class SQLiteSessionStore(PeriodicSweeper):
+    def __init__(self, schema, path="sessions.sqlite3", max_entries=10000, idle_ttl=3600.0):
+        self.schema = schema
+        self.path = path
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self._local = threading.local()
+        self.conflicts = 0
+        self.expired = 0
+
+        # Short-lived connection so nothing opened here is inherited by forked workers
+        db = self._connect()
+        with db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "user_id TEXT PRIMARY KEY, state TEXT NOT NULL, version INTEGER NOT NULL, last_seen REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+        db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self._connect()
+        return db
+
+    def _load(self, user_id):
+        row = self._db().execute("SELECT state, version FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return UserState(self.schema), 0
+        return UserState.from_record(self.schema, json.loads(row[0])), row[1]
+
+    def _save(self, user_id, state, version):
+        db = self._db()
+        record = json.dumps(state.to_record(), separators=(",", ":"))
+        now = time.time()
+        if version == 0:
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO sessions VALUES (?, ?, 1, ?)", (user_id, record, now)
+            )
+        else:
+            cursor = db.execute(
+                "UPDATE sessions SET state = ?, version = version + 1, last_seen = ? "
+                "WHERE user_id = ? AND version = ?",
+                (record, now, user_id, version),
+            )
+        if cursor.rowcount == 0:
+            self.conflicts += 1
+            raise SessionConflict(user_id)
+
+    def __contains__(self, user_id):
+        return self._db().execute("SELECT 1 FROM sessions WHERE user_id = ?", (user_id,)).fetchone() is not None
+
+    def __len__(self):
+        return self._db().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    # Read-only snapshot of the user's state
+    def __getitem__(self, user_id):
+        state, version = self._load(user_id)
+        if version == 0:
+            raise KeyError(user_id)
+        return state
+
+    def get_or_create(self, user_id):
+        return self._load(user_id)[0]
+
+    def reset(self, user_id):
+        state = UserState(self.schema)
+        record = json.dumps(state.to_record(), separators=(",", ":"))
+        self._db().execute(
+            "INSERT INTO sessions VALUES (?, ?, 1, ?) ON CONFLICT(user_id) DO UPDATE SET "
+            "state = excluded.state, version = version + 1, last_seen = excluded.last_seen",
+            (user_id, record, time.time()),
+        )
+        return state
+
+    @contextmanager
+    def transaction(self, user_id):
+        state, version = self._load(user_id)
+        yield state
+        self._save(user_id, state, version)
+
+    def discard(self, user_id):
+        self._db().execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+    # Expire idle sessions and trim to max_entries, oldest first
+    def sweep(self):
+        db = self._db()
+        with db:
+            expired = db.execute("DELETE FROM sessions WHERE last_seen < ?", (time.time() - self.idle_ttl,)).rowcount
+            db.execute(
+                "DELETE FROM sessions WHERE user_id IN (SELECT user_id FROM sessions ORDER BY last_seen DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        self.expired += expired
+        if expired:
+            logging.info(f"Session sweeper expired {expired} idle sessions")
+        return expired
+
+    def stats(self):
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "live_sessions": len(self),
+            "max_entries": self.max_entries,
+            "idle_ttl_seconds": self.idle_ttl,
+            "expired_idle": self.expired,
+            "conflicts": self.conflicts,
+        }
+
+
+# Build the session backend selected by name ("memory" or "sqlite")
+def create_session_backend(kind, schema, max_entries=10000, idle_ttl=3600.0, path="sessions.sqlite3"):
+    if kind == "memory":
+        return SessionStore(schema, max_entries=max_entries, idle_ttl=idle_ttl)
+    if kind == "sqlite":
+        return SQLiteSessionStore(schema, path=path, max_entries=max_entries, idle_ttl=idle_ttl)
+    raise ValueError(f"Unknown session backend: {kind}")
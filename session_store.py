@@ -0,0 +1,331 @@
+import logging
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+HIGH_BLOOD_SUGAR = "قند خون بالا"
+
+
+# Immutable data every session shares by reference: symptom order and the question list
+class StateSchema:
+    __slots__ = ("symptom_names", "symptom_index", "questions")
+
+    def __init__(self, symptom_names, questions):
+        self.symptom_names = tuple(symptom_names)
+        self.symptom_index = {name: i for i, name in enumerate(self.symptom_names)}
+        self.questions = tuple(questions)
+
+    def names_from_mask(self, mask):
+        return [name for i, name in enumerate(self.symptom_names) if mask >> i & 1]
+
+    # Names of the mask's symptoms in detection order (indices in order first, then any
+    # other set bits in schema order, for records written before the order was kept)
+    def names_in_order(self, order, mask):
+        names = [self.symptom_names[i] for i in order]
+        if len(names) < bin(mask).count("1"):
+            names += [name for i, name in enumerate(self.symptom_names) if mask >> i & 1 and i not in order]
+        return names
+
+    def order_from_names(self, names):
+        order = []
+        for name in names:
+            index = self.symptom_index.get(name)
+            if index is not None and index not in order:
+                order.append(index)
+        return tuple(order)
+
+    def mask_from_names(self, names):
+        mask = 0
+        for name in names:
+            if name in self.symptom_index:
+                mask |= 1 << self.symptom_index[name]
+        return mask
+
+
+# Compact per-user conversation state.
+# Symptoms are bit masks over schema.symptom_names, plus small tuples of their indices in
+# detection order (the order the prompts list them in); dict-style access (state["age"])
+# is kept so the conversation code reads the same as with the old per-user dicts.
+class UserState:
+    __slots__ = (
+        "schema", "age", "gender", "symptom_mask", "high_blood_sugar", "fasting_blood_sugar",
+        "waiting_for_questions", "current_question_index", "answer_mask", "answer_count",
+        "prediction_done", "previous_mask", "expecting_age", "asked_mask", "last_seen",
+        "symptom_order", "previous_order",
+    )
+
+    # Fields persisted by out-of-process backends, in record order (new fields go last, so
+    # records written before they existed still load with the default)
+    RECORD_FIELDS = (
+        "age", "gender", "symptom_mask", "high_blood_sugar", "fasting_blood_sugar", "waiting_for_questions",
+        "current_question_index", "answer_mask", "answer_count", "prediction_done", "previous_mask",
+        "expecting_age", "asked_mask", "symptom_order", "previous_order",
+    )
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.reset()
+
+    # Back to a fresh conversation, in place
+    def reset(self):
+        self.age = None
+        self.gender = None
+        self.symptom_mask = 0
+        self.high_blood_sugar = False
+        self.fasting_blood_sugar = None
+        self.waiting_for_questions = False
+        self.current_question_index = 0
+        self.answer_mask = 0
+        self.answer_count = 0
+        self.prediction_done = False
+        self.previous_mask = 0
+        self.expecting_age = False
+        self.asked_mask = 0
+        self.last_seen = time.monotonic()
+        self.symptom_order = ()
+        self.previous_order = ()
+
+    def to_record(self):
+        return [getattr(self, field) for field in self.RECORD_FIELDS]
+
+    @classmethod
+    def from_record(cls, schema, record):
+        state = cls(schema)
+        for field, value in zip(cls.RECORD_FIELDS, record):
+            setattr(state, field, value)
+        state.symptom_order = tuple(state.symptom_order)
+        state.previous_order = tuple(state.previous_order)
+        return state
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    @property
+    def questions(self):
+        return self.schema.questions
+
+    # Detected symptom names, with the high blood sugar marker last
+    @property
+    def symptoms(self):
+        names = self.schema.names_in_order(self.symptom_order, self.symptom_mask)
+        if self.high_blood_sugar:
+            names.append(HIGH_BLOOD_SUGAR)
+        return names
+
+    @symptoms.setter
+    def symptoms(self, names):
+        self.symptom_mask = self.schema.mask_from_names(names)
+        self.symptom_order = self.schema.order_from_names(names)
+        self.high_blood_sugar = HIGH_BLOOD_SUGAR in names
+
+    def add_symptom(self, name):
+        if name == HIGH_BLOOD_SUGAR:
+            self.high_blood_sugar = True
+            return
+        index = self.schema.symptom_index.get(name)
+        if index is not None and not self.symptom_mask >> index & 1:
+            self.symptom_mask |= 1 << index
+            self.symptom_order += (index,)
+
+    @property
+    def previous_symptoms(self):
+        return self.schema.names_in_order(self.previous_order, self.previous_mask)
+
+    @previous_symptoms.setter
+    def previous_symptoms(self, names):
+        self.previous_mask = self.schema.mask_from_names(names)
+        self.previous_order = self.schema.order_from_names(names)
+
+    def add_previous_symptom(self, name):
+        index = self.schema.symptom_index.get(name)
+        if index is not None and not self.previous_mask >> index & 1:
+            self.previous_mask |= 1 << index
+            self.previous_order += (index,)
+
+    # 0/1 answers to the structured questions, up to the last one asked
+    # (questions skipped before it read as 0)
+    @property
+    def current_symptoms(self):
+        return [self.answer_mask >> i & 1 for i in range(max(self.answer_count, self.asked_mask.bit_length()))]
+
+    @current_symptoms.setter
+    def current_symptoms(self, answers):
+        self.answer_mask = 0
+        self.answer_count = 0
+        self.asked_mask = 0
+        for answer in answers:
+            self.record_answer(answer)
+
+    # Answer to question `index` (by default the next one in order)
+    def record_answer(self, answer, index=None):
+        if index is None:
+            index = self.answer_count
+        if answer:
+            self.answer_mask |= 1 << index
+        self.asked_mask |= 1 << index
+        self.answer_count += 1
+
+    # The adaptive questionnaire stopped early: the questions never asked count as "no"
+    def skip_unasked(self, count):
+        self.asked_mask |= (1 << count) - 1
+
+
+# Raised when another worker updated the same session during a transaction
+class SessionConflict(Exception):
+    pass
+
+
+# Background thread calling self.sweep() every interval seconds
+class PeriodicSweeper:
+    _sweeper = None
+    _sweeper_stop = None
+
+    def start_sweeper(self, interval=60.0):
+        if self._sweeper is not None:
+            return
+        self._sweeper_stop = threading.Event()
+
+        def run(stop=self._sweeper_stop):
+            while not stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logging.error(f"Session sweep error: {e}")
+
+        self._sweeper = threading.Thread(target=run, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper_stop.set()
+            self._sweeper.join()
+            self._sweeper = None
+
+
+# In-process session backend: LRU eviction past max_entries and idle-TTL expiry.
+# Per-user locks make each transaction atomic within the process; a lock lives only as long
+# as a transaction holds it, so a slow turn never blocks another user's.
+class SessionStore(PeriodicSweeper):
+    def __init__(self, schema, max_entries=10000, idle_ttl=3600.0):
+        self.schema = schema
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._user_locks = weakref.WeakValueDictionary()
+        self.evicted = 0
+        self.expired = 0
+
+    def __contains__(self, user_id):
+        with self._lock:
+            return user_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __getitem__(self, user_id):
+        with self._lock:
+            state = self._sessions[user_id]
+            self._touch(user_id, state)
+            return state
+
+    def get_or_create(self, user_id):
+        with self._lock:
+            state = self._sessions.get(user_id)
+            if state is None:
+                return self._insert(user_id)
+            self._touch(user_id, state)
+            return state
+
+    def reset(self, user_id):
+        with self._lock:
+            return self._insert(user_id)
+
+    # Yields the user's state; concurrent turns of the same user run one at a time
+    @contextmanager
+    def transaction(self, user_id):
+        with self._lock:
+            user_lock = self._user_locks.get(user_id)
+            if user_lock is None:
+                user_lock = self._user_locks[user_id] = threading.Lock()
+        with user_lock:
+            yield self.get_or_create(user_id)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    # Drop sessions idle for longer than idle_ttl; returns how many were removed.
+    # Sessions in a running transaction are kept, or the transaction's writes would be lost.
+    def sweep(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            # Sessions are kept in last-seen order, so expired ones are at the front
+            expired = []
+            for user_id, state in self._sessions.items():
+                if state.last_seen >= cutoff:
+                    break
+                if not self._in_transaction(user_id):
+                    expired.append(user_id)
+            for user_id in expired:
+                del self._sessions[user_id]
+            removed = len(expired)
+            self.expired += removed
+        if removed:
+            logging.info(f"Session sweeper expired {removed} idle sessions")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            live = len(self._sessions)
+            sample = next(iter(self._sessions.items()), None)
+        # Estimate from one entry: key string, state object and the ordered dict slot
+        per_entry = sys.getsizeof(sample[0]) + sys.getsizeof(sample[1]) + 100 if sample else 0
+        return {
+            "backend": "memory",
+            "live_sessions": live,
+            "max_entries": self.max_entries,
+            "idle_ttl_seconds": self.idle_ttl,
+            "evicted_lru": self.evicted,
+            "expired_idle": self.expired,
+            "approx_bytes": live * per_entry,
+        }
+
+    def _touch(self, user_id, state):
+        state.last_seen = time.monotonic()
+        self._sessions.move_to_end(user_id)
+
+    def _in_transaction(self, user_id):
+        user_lock = self._user_locks.get(user_id)
+        return user_lock is not None and user_lock.locked()
+
+    # Evicts the least recently seen sessions past max_entries, skipping those in a running
+    # transaction (the store may briefly hold more while they finish)
+    def _insert(self, user_id):
+        state = UserState(self.schema)
+        self._sessions[user_id] = state
+        self._sessions.move_to_end(user_id)
+        excess = len(self._sessions) - self.max_entries
+        if excess > 0:
+            evicted = []
+            for other_id in self._sessions:
+                if len(evicted) == excess:
+                    break
+                if not self._in_transaction(other_id):
+                    evicted.append(other_id)
+            for other_id in evicted:
+                del self._sessions[other_id]
+            self.evicted += len(evicted)
+        return state
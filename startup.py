@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Reference point of the startup timings; chat.py imports this module first
+IMPORTED_AT = time.perf_counter()
+
+STARTUP_MODES = ("eager", "background")
+
+
+# Cold start bookkeeping: how long each startup phase took and whether the components that
+# requests depend on (Gemini SDK, model, lookup table, ...) are loaded.
+# "eager" loads them in load()'s caller, before the app serves anything; "background" loads them
+# on a daemon thread, so the page, static assets and liveness checks are served right away while
+# requests that need the model wait() on readiness for a bounded time.
+class Startup:
+    def __init__(self, mode="eager", name="startup-loader"):
+        if mode not in STARTUP_MODES:
+            raise ValueError(f"Unknown startup mode: {mode}")
+        self.mode = mode
+        self.name = name
+        self.phases = {}
+        self.error = None
+        self.ready_seconds = None
+
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._loading = False
+        self._last_mark = IMPORTED_AT
+
+        self.waits = 0
+        self.wait_timeouts = 0
+
+    # Record the time since the previous mark (or since startup) as a phase of the main thread
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases[name] = round(now - self._last_mark, 4)
+        self._last_mark = now
+
+    # Time a block as a phase (loader steps, which may run on the background thread)
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - started, 4)
+
+    # Run the loader once: inline in eager mode, on a daemon thread in background mode.
+    # A loader that fails still makes the app ready, degraded, like a failed eager start.
+    def load(self, loader):
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        if self.mode == "eager":
+            self._run(loader)
+        else:
+            threading.Thread(target=self._run, args=(loader,), name=self.name, daemon=True).start()
+
+    def _run(self, loader):
+        try:
+            loader()
+        except Exception as e:
+            logging.error(f"Error loading components: {e}")
+            self.error = str(e)
+        finally:
+            self.ready_seconds = round(time.perf_counter() - IMPORTED_AT, 4)
+            self._ready.set()
+            logging.info(f"Ready {self.ready_seconds:.2f}s after startup ({self.mode})")
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    # Block until the components are loaded or the timeout passes; returns whether they are
+    def wait(self, timeout):
+        if self._ready.is_set():
+            return True
+        with self._lock:
+            self.waits += 1
+        if self._ready.wait(timeout):
+            return True
+        with self._lock:
+            self.wait_timeouts += 1
+        return False
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "ready": self.ready,
+            "ready_seconds": self.ready_seconds,
+            "error": self.error,
+            "waits": self.waits,
+            "wait_timeouts": self.wait_timeouts,
+            "phases": dict(self.phases),
+        }
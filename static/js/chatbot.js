@@ -17,28 +17,81 @@ document.addEventListener('DOMContentLoaded', () => {
     userInput.focus();
 });
 
-// Typing effect
+// Typing effect: appends the message a word (or tag) at a time instead of re-rendering it per character
 function typeMessage(element, message) {
     return new Promise(resolve => {
+        const tokens = message.match(/<[^>]*>|[^<\s]+\s*|\s+/g) || [];
         let index = 0;
-        const typingSpeed = 15;
-
-        function typeChar() {
-            if (index < message.length) {
-                const tempDiv = document.createElement("div");
-                tempDiv.innerHTML = message.slice(0, index + 1);
-                element.innerHTML = tempDiv.innerHTML;
-                index++;
-                setTimeout(typeChar, typingSpeed);
+        const typingSpeed = 30;
+
+        function typeWord() {
+            if (index < tokens.length) {
+                element.insertAdjacentHTML("beforeend", tokens[index++]);
+                chatBox.scrollTop = chatBox.scrollHeight;
+                setTimeout(typeWord, typingSpeed);
             } else {
                 resolve();
             }
         }
 
-        typeChar();
+        typeWord();
     });
 }
 
+const STREAM_FALLBACK_MESSAGE = "متأسفم، پاسخی دریافت نشد. لطفاً دوباره تلاش کنید.";
+
+// Bot bubble filled in as streamed chunks arrive. Replies only carry void tags (<br>), so each
+// chunk is parsed on its own and appended; the bubble is only rebuilt on a "replace" event.
+function createStreamingMessage() {
+    const wrapper = document.createElement("div");
+    wrapper.className = "max-w-[75%] px-4 py-3 rounded-2xl text-sm leading-relaxed shadow flex items-start gap-2";
+    wrapper.style.animation = "fadeInChat 0.3s ease-out forwards";
+    wrapper.classList.add("transition-all", "duration-300", "text-right", "self-start");
+    wrapper.classList.add(...(isDarkMode ? ["bg-gray-700", "text-white"] : ["bg-indigo-100"]));
+    wrapper.innerHTML = `<div class="flex-1"></div>`;
+    const textDiv = document.createElement("div");
+    wrapper.lastElementChild.appendChild(textDiv);
+
+    // committed: the HTML appended so far; tail: an unclosed "<..." held back until the tag ends
+    let committed = "";
+    let tail = "";
+    function show() {
+        if (!wrapper.isConnected) chatBox.appendChild(wrapper);
+        chatBox.scrollTop = chatBox.scrollHeight;
+    }
+    function appendHtml(html) {
+        if (!html) return;
+        const template = document.createElement("template");
+        template.innerHTML = html;
+        textDiv.appendChild(template.content);
+        committed += html;
+    }
+    return {
+        append(chunk) {
+            tail += chunk;
+            const open = tail.lastIndexOf("<");
+            const end = open > tail.lastIndexOf(">") ? open : tail.length;
+            appendHtml(tail.slice(0, end));
+            tail = tail.slice(end);
+            show();
+        },
+        replace(message) {
+            committed = message;
+            tail = "";
+            textDiv.innerHTML = message;
+            show();
+        },
+        // The server streams the rest of the final reply (or a "replace") before "done", so
+        // "done" only flushes the tail; a stream that ended without any text still gets a bubble
+        finish(message) {
+            appendHtml(tail);
+            tail = "";
+            if (!committed) this.replace(message || STREAM_FALLBACK_MESSAGE);
+            show();
+        },
+    };
+}
+
 // Add message (user or bot)
 async function addMessage(message, isBot) {
     const wrapper = document.createElement("div");
@@ -86,25 +139,106 @@ async function sendMessage() {
     userInput.value = "";
     loadingIndicator.classList.remove("hidden");
 
+    const body = "message=" + encodeURIComponent(message) + "&user_id=" + encodeURIComponent(userId);
     try {
-        const response = await fetch("/get_response", {
-            method: "POST",
-            headers: { "Content-Type": "application/x-www-form-urlencoded" },
-            body: "message=" + encodeURIComponent(message) + "&user_id=" + encodeURIComponent(userId),
-        });
-
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
+        if (window.ReadableStream && window.TextDecoder) {
+            await streamResponse(body);
+        } else {
+            await fetchResponse(body);
         }
-
-        const data = await response.json();
-        await addMessage(data.response, true);
     } finally {
         loadingIndicator.classList.add("hidden");
         userInput.focus();
     }
 }
 
+// The "try again shortly" reply of a 503 sent while the app is still starting up, or null.
+// A 503 from the proxy or a timed-out worker has no JSON body and takes the generic error path.
+async function startingUpReply(response) {
+    if (response.status !== 503) return null;
+    const type = response.headers.get("Content-Type") || "";
+    if (!type.includes("application/json")) return null;
+    try {
+        const data = await response.json();
+        return data.response || null;
+    } catch (error) {
+        return null;
+    }
+}
+
+async function fetchResponse(body) {
+    const response = await fetch("/get_response", {
+        method: "POST",
+        headers: { "Content-Type": "application/x-www-form-urlencoded" },
+        body,
+    });
+
+    const startingUp = await startingUpReply(response);
+    if (startingUp) {
+        await addMessage(startingUp, true);
+        return;
+    }
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const data = await response.json();
+    await addMessage(data.response, true);
+}
+
+// Read the Server-Sent Events reply: "chunk" data extends the message, "replace" swaps it, "done" ends it
+async function streamResponse(body) {
+    const response = await fetch("/get_response_stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/x-www-form-urlencoded" },
+        body,
+    });
+
+    const startingUp = await startingUpReply(response);
+    if (startingUp) {
+        await addMessage(startingUp, true);
+        return;
+    }
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    if (!response.body) {
+        return fetchResponse(body);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const bubble = createStreamingMessage();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let end;
+        while ((end = buffer.indexOf("\n\n")) !== -1) {
+            const block = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+
+            let event = "message";
+            let data = "";
+            for (const line of block.split("\n")) {
+                if (line.startsWith("event: ")) event = line.slice(7);
+                else if (line.startsWith("data: ")) data += line.slice(6);
+            }
+            if (!data) continue;
+
+            const payload = JSON.parse(data);
+            loadingIndicator.classList.add("hidden");
+            if (event === "replace") bubble.replace(payload.response);
+            else if (event === "done") bubble.finish(payload.response);
+            else bubble.append(payload.chunk);
+        }
+    }
+    bubble.finish();
+}
+
 // Voice input (optional feature)
 function startListening() {
     if (!('SpeechRecognition' in window) && !('webkitSpeechRecognition' in window)) {
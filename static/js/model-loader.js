@@ -7,6 +7,10 @@ let is3DModelLoaded = false;
 const originalMaterials = new Map();
 let tooltip;
 
+// Model URLs from the page (hashed by the asset build); the preview is a small quantized copy
+// shown while the full model downloads
+const MODEL_URLS = window.ANATOMY_MODEL_URLS || { full: '/static/models/human_body.glb', preview: null };
+
 // Initialize the 3D or 2D anatomy viewer based on model availability
 function initAnatomyViewer() {
     // Create tooltip element
@@ -81,84 +85,130 @@ function try3DModel(container) {
     tempLoadingDiv.textContent = 'در حال بارگذاری...';
     container.appendChild(tempLoadingDiv);
 
-    // Try to load the 3D model with error handling
+    // Remove temporary loading message
+    const removeLoadingMessage = () => {
+        if (container.contains(tempLoadingDiv)) {
+            container.removeChild(tempLoadingDiv);
+        }
+    };
+    const fallBack = (error) => {
+        console.warn('Error loading the 3D model:', error);
+        removeLoadingMessage();
+        // Fall back to SVG
+        useSVGFallback(container);
+    };
+
+    // Load the preview first when there is one, then swap in the full model
     const loader = new THREE.GLTFLoader();
-    loader.load('/static/models/human_body.glb',
+    const firstUrl = MODEL_URLS.preview || MODEL_URLS.full;
+    loader.load(firstUrl,
         // Success callback
         function (gltf) {
-            // Remove temporary loading message
-            if (container.contains(tempLoadingDiv)) {
-                container.removeChild(tempLoadingDiv);
+            removeLoadingMessage();
+            showModel(gltf.scene);
+
+            if (firstUrl !== MODEL_URLS.full) {
+                loader.load(MODEL_URLS.full,
+                    (full) => replaceModel(full.scene),
+                    undefined,
+                    (error) => console.warn('Error loading the full 3D model, keeping the preview:', error)
+                );
+            }
+        },
+        // Progress callback
+        function (xhr) {
+            // Compressed responses may report no total (or the compressed one)
+            if (tempLoadingDiv && xhr.lengthComputable && xhr.total) {
+                const percent = Math.min(100, Math.floor((xhr.loaded / xhr.total) * 100));
+                tempLoadingDiv.textContent = `در حال بارگذاری... ${percent}%`;
             }
+        },
+        // Error callback: without a usable preview, try the full model before the SVG
+        function (error) {
+            if (firstUrl === MODEL_URLS.full) {
+                fallBack(error);
+                return;
+            }
+            console.warn('Error loading the 3D model preview:', error);
+            loader.load(MODEL_URLS.full, (gltf) => {
+                removeLoadingMessage();
+                showModel(gltf.scene);
+            }, undefined, fallBack);
+        }
+    );
+}
 
-            anatomyModel = gltf.scene;
+// Store original materials and set up interaction on every mesh of a loaded model
+function prepareModel(model) {
+    model.traverse((node) => {
+        if (node.isMesh) {
+            // Create a proper clone of the material to avoid shared references
+            const originalMaterial = node.material.clone();
+            originalMaterials.set(node.uuid, originalMaterial);
 
-            // Properly scale and center the model
-            anatomyModel.scale.set(1.5, 1.5, 1.5); // Larger size for better visibility
-            anatomyScene.add(anatomyModel);
+            // Add better names for body parts
+            node.userData.name = node.name || "بخشی از بدن";
 
-            // Store original materials and set up interaction
-            anatomyModel.traverse((node) => {
-                if (node.isMesh) {
-                    // Create a proper clone of the material to avoid shared references
-                    const originalMaterial = node.material.clone();
-                    originalMaterials.set(node.uuid, originalMaterial);
+            // Set up material for highlighting
+            node.material = node.material.clone();
+            node.material.emissive = new THREE.Color(0x000000);
+            node.material.emissiveIntensity = 0;
+        }
+    });
+}
 
-                    // Add better names for body parts
-                    node.userData.name = node.name || "بخشی از بدن";
+// Add the first loaded model to the scene, fit the camera and start rendering
+function showModel(model) {
+    anatomyModel = model;
 
-                    // Set up material for highlighting
-                    node.material = node.material.clone();
-                    node.material.emissive = new THREE.Color(0x000000);
-                    node.material.emissiveIntensity = 0;
-                }
-            });
+    // Properly scale and center the model
+    anatomyModel.scale.set(1.5, 1.5, 1.5); // Larger size for better visibility
+    anatomyScene.add(anatomyModel);
+    prepareModel(anatomyModel);
 
-            // Properly fit camera to model
-            const box = new THREE.Box3().setFromObject(anatomyModel);
-            const size = box.getSize(new THREE.Vector3());
-            const center = box.getCenter(new THREE.Vector3());
+    // Properly fit camera to model
+    const box = new THREE.Box3().setFromObject(anatomyModel);
+    const size = box.getSize(new THREE.Vector3());
+    const center = box.getCenter(new THREE.Vector3());
 
-            // Position model at center of scene
-            anatomyModel.position.x = -center.x;
-            anatomyModel.position.y = -center.y + size.y / 3; // Adjust vertical position
-            anatomyModel.position.z = -center.z;
+    // Position model at center of scene
+    anatomyModel.position.x = -center.x;
+    anatomyModel.position.y = -center.y + size.y / 3; // Adjust vertical position
+    anatomyModel.position.z = -center.z;
 
-            // Set camera to properly view the model
-            anatomyCamera.position.set(0, size.y / 2, size.z * 2);
-            anatomyControls.target.set(0, size.y / 3, 0);
-            anatomyControls.update();
+    // Set camera to properly view the model
+    anatomyCamera.position.set(0, size.y / 2, size.z * 2);
+    anatomyControls.target.set(0, size.y / 3, 0);
+    anatomyControls.update();
 
-            // Add a slight rotation for better initial view
-            anatomyModel.rotation.y = Math.PI / 12; // Slight rotation
+    // Add a slight rotation for better initial view
+    anatomyModel.rotation.y = Math.PI / 12; // Slight rotation
 
-            // Set up raycaster for mouse interactions
-            setupRaycaster();
+    // Set up raycaster for mouse interactions
+    setupRaycaster();
 
-            is3DModelLoaded = true;
+    is3DModelLoaded = true;
 
-            // Start animation loop
-            animate();
-        },
-        // Progress callback
-        function (xhr) {
-            // Update loading percentage if needed
-            const percent = Math.floor((xhr.loaded / xhr.total) * 100);
-            if (tempLoadingDiv) {
-                tempLoadingDiv.textContent = `در حال بارگذاری... ${percent}%`;
-            }
-        },
-        // Error callback
-        function (error) {
-            console.warn('Error loading the 3D model:', error);
-            // Remove temporary loading message
-            if (container.contains(tempLoadingDiv)) {
-                container.removeChild(tempLoadingDiv);
-            }
-            // Fall back to SVG
-            useSVGFallback(container);
+    // Start animation loop
+    animate();
+}
+
+// Swap the preview for the full model, keeping the placement the user sees
+function replaceModel(model) {
+    const preview = anatomyModel;
+    model.position.copy(preview.position);
+    model.rotation.copy(preview.rotation);
+    model.scale.copy(preview.scale);
+    prepareModel(model);
+    anatomyScene.remove(preview);
+    preview.traverse((node) => {
+        if (node.isMesh) {
+            originalMaterials.delete(node.uuid);
+            node.geometry.dispose();
         }
-    );
+    });
+    anatomyScene.add(model);
+    anatomyModel = model;
 }
 
 // Use SVG fallback when 3D model fails to load
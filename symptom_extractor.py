@@ -0,0 +1,222 @@
+import re
+
+# Symptoms the model takes, in its feature order (also the order of the structured questions)
+SYMPTOM_NAMES = (
+    "پرادراری", "عطش", "کاهش وزن", "ضعف", "پرخوری", "عفونت قارچی", "تاری دید",
+    "خارش", "عصبانیت", "تأخیر در بهبود", "فلج جزئی", "درد عضلانی", "ریزش مو", "چاقی",
+)
+
+# Persian lexicon of synonyms and colloquial forms for each model symptom.
+# A None label marks phrases that must not produce a symptom (e.g. throat itch).
+SYMPTOM_LEXICON = {
+    "پرادراری": [
+        "پرادراری", "پر ادراری", "ادرار زیاد", "زیاد ادرار", "ادرارم زیاد", "تکرر ادرار", "ادرار مکرر",
+        "شب ادراری", "زیاد دستشویی", "زیاد به دستشویی", "دستشویی زیاد", "مدام دستشویی", "جیش زیاد",
+        "زیاد جیش",
+    ],
+    "عطش": [
+        "عطش", "تشنگی", "تشنه", "تشنمه", "زیاد آب می‌خورم", "آب زیاد می‌خورم", "خشکی دهان", "دهانم خشک",
+        "دهنم خشک", "خشکی دهن",
+    ],
+    "کاهش وزن": [
+        "کاهش وزن", "کم شدن وزن", "وزن کم کردم", "وزنم کم", "لاغر شدم", "لاغر شده", "وزن از دست",
+        "افت وزن",
+    ],
+    "ضعف": [
+        "ضعف", "بی‌حالی", "بی‌حال", "خستگی", "خسته‌ام", "خستم", "خسته می‌شم", "خسته می‌شوم", "بی‌جونم",
+        "بی‌رمق",
+    ],
+    "پرخوری": [
+        "پرخوری", "پر خوری", "اشتهای زیاد", "اشتهام زیاد", "اشتها زیاد", "افزایش اشتها", "پراشتها",
+        "گرسنگی", "گرسنه", "گشنمه", "گشنگی", "زیاد غذا می‌خورم",
+    ],
+    "عفونت قارچی": [
+        "عفونت قارچی", "عفونت قارچ", "قارچی", "قارچ واژن", "قارچ پوست", "برفک", "کاندیدا",
+        "عفونت واژینال",
+    ],
+    "تاری دید": [
+        "تاری دید", "تاری چشم", "تار می‌بینم", "دیدم تار", "چشمام تار", "چشمم تار", "چشمهام تار",
+        "کاهش بینایی", "ضعف بینایی", "ضعف چشم",
+    ],
+    "خارش": [
+        "خارش", "می‌خاره", "می‌خارد", "خشکی پوست", "پوستم خشک", "پوست خشک",
+    ],
+    "عصبانیت": [
+        "عصبانیت", "عصبانی", "عصبی", "تحریک‌پذیر", "کلافه", "بداخلاق", "زودرنج", "پرخاشگر",
+    ],
+    "تأخیر در بهبود": [
+        "تأخیر در بهبود", "دیر خوب", "دیر بهبود", "زخمم دیر", "زخم دیر", "زخم‌هام دیر", "زخمام دیر",
+        "زخمم خوب نمی‌شه", "زخم خوب نمی‌شه", "دیر ترمیم", "دیر جوش می‌خوره",
+    ],
+    "فلج جزئی": [
+        "فلج جزئی", "فلج", "بی‌حسی", "کرختی", "گزگز", "مورمور", "خواب رفتن دست", "خواب رفتن پا",
+        "دستم خواب می‌ره", "پام خواب می‌ره",
+    ],
+    "درد عضلانی": [
+        "درد عضلانی", "درد عضله", "دردهای عضلانی", "عضله درد", "عضلاتم درد", "گرفتگی عضلات",
+        "گرفتگی عضله", "کشیدگی عضلات", "سفتی عضلات",
+    ],
+    "ریزش مو": [
+        "ریزش مو", "موهام می‌ریزه", "موهایم می‌ریزد", "موهام ریخته", "موهام کم پشت", "کم‌پشتی مو",
+    ],
+    "چاقی": [
+        "چاقی", "چاقم", "چاق هستم", "چاق شدم", "اضافه وزن", "وزنم زیاد", "افزایش وزن", "وزن زیاد",
+    ],
+    None: [
+        "خارش گلو", "ضعف اقتصادی",
+    ],
+}
+
+# Words suggesting the user is describing symptoms; used to decide whether to ask Gemini
+# when the lexicon finds nothing
+SYMPTOM_CUES = [
+    "دارم", "می‌کنم", "احساس", "حس می‌کنم", "علائم", "علامت", "نشانه", "مشکل", "اذیت", "رنج می‌برم",
+    "دچار", "شده‌ام", "شدم", "می‌شم", "می‌شوم", "بدنم", "پوستم", "چشمم", "وزنم", "زیاد", "درد",
+]
+
+# Words right after a symptom that negate it ("عطش ندارم")
+NEGATION_WORDS = {
+    "ندارم", "نداشتم", "ندارد", "نیستم", "نیست", "نشده", "نشدم", "نمی‌کنم", "نمی‌شم", "نمی‌شوم", "نه", "خیر",
+}
+NEGATION_WINDOW = 2
+
+_CHAR_MAP = str.maketrans({
+    "ي": "ی", "ى": "ی", "ئ": "ی", "ك": "ک", "ة": "ه", "ۀ": "ه", "أ": "ا", "إ": "ا", "ٱ": "ا", "ؤ": "و",
+    "\u200c": "", "\u200d": "", "\u200e": "", "\u200f": "", "\u0640": "",
+    "۰": "0", "۱": "1", "۲": "2", "۳": "3", "۴": "4", "۵": "5", "۶": "6", "۷": "7", "۸": "8", "۹": "9",
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4", "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+})
+_DIACRITICS = re.compile(r"[\u064B-\u065F\u0670]")
+_SEPARATORS = re.compile(r"[\s،,.؛;:!?؟()\[\]\"'«»\-]+")
+_CLAUSE_BREAKS = {"و", "ولی", "اما", "یا"}
+
+
+# Normalize Arabic/Persian variants, ZWNJ, diacritics and digits; collapse separators into spaces
+def normalize_text(text):
+    text = _DIACRITICS.sub("", text.translate(_CHAR_MAP).lower())
+    return _SEPARATORS.sub(" ", text).strip()
+
+
+# Multi-pattern matcher (Aho-Corasick) over the normalized text with spaces removed,
+# so "بی حالی", "بی‌حالی" and "بیحالی" all hit the same pattern
+class KeywordAutomaton:
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+    def add(self, pattern, label):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append((len(pattern), label))
+
+    def build(self):
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                fallback = self.goto[state].get(ch, 0)
+                self.fail[child] = fallback if fallback != child else 0
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+        return self
+
+    # Yield (start, end, label) for every occurrence, end exclusive
+    def iter_matches(self, text):
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for length, label in self.out[node]:
+                yield i + 1 - length, i + 1, label
+
+
+_CUE = object()
+
+
+class SymptomExtractor:
+    def __init__(self, symptom_names, lexicon=None, cues=None):
+        self.symptom_names = list(symptom_names)
+        lexicon = SYMPTOM_LEXICON if lexicon is None else lexicon
+        cues = SYMPTOM_CUES if cues is None else cues
+
+        unknown = [name for name in lexicon if name is not None and name not in self.symptom_names]
+        if unknown:
+            raise ValueError(f"Lexicon has symptoms that the model does not know: {unknown}")
+
+        self._automaton = KeywordAutomaton()
+        for label, phrases in lexicon.items():
+            for phrase in phrases:
+                self._automaton.add(self._compact(normalize_text(phrase)), label)
+        for cue in cues:
+            self._automaton.add(self._compact(normalize_text(cue)), _CUE)
+        self._automaton.build()
+
+    @staticmethod
+    def _compact(normalized):
+        return normalized.replace(" ", "")
+
+    # Returns (detected symptoms in symptom_names order, whether the text looks symptom-like)
+    def analyze(self, text):
+        normalized = normalize_text(text)
+        tokens = normalized.split(" ") if normalized else []
+
+        # Compact text plus, for every compact position, the index of the token it came from
+        compact_chars, token_of, token_start = [], [], set()
+        for t, token in enumerate(tokens):
+            token_start.add(len(compact_chars))
+            compact_chars.extend(token)
+            token_of.extend([t] * len(token))
+        compact = "".join(compact_chars)
+
+        # Leftmost-longest, non-overlapping matches that start on a word boundary
+        candidates = []
+        symptom_like = False
+        for start, end, label in self._automaton.iter_matches(compact):
+            if label is _CUE:
+                symptom_like = True
+            elif start in token_start:
+                candidates.append((start, end, label))
+        candidates.sort(key=lambda m: (m[0], m[0] - m[1]))
+
+        found = set()
+        covered_until = 0
+        for start, end, label in candidates:
+            if start < covered_until:
+                continue
+            covered_until = end
+            if label is None or self._negated(tokens, token_of[end - 1]):
+                continue
+            found.add(label)
+
+        symptoms = [name for name in self.symptom_names if name in found]
+        return symptoms, symptom_like or bool(candidates)
+
+    def extract(self, text):
+        return self.analyze(text)[0]
+
+    def looks_symptom_like(self, text):
+        return self.analyze(text)[1]
+
+    @staticmethod
+    def _negated(tokens, last_token):
+        for token in tokens[last_token + 1:last_token + 1 + NEGATION_WINDOW]:
+            if token in _CLAUSE_BREAKS:
+                return False
+            if token in _NORMALIZED_NEGATIONS:
+                return True
+        return False
+
+
+_NORMALIZED_NEGATIONS = {normalize_text(word) for word in NEGATION_WORDS}
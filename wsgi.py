@@ -0,0 +1,6 @@
+# Gunicorn entry point: importing chat loads the model once in the master process
+# (preload_app), so forked workers share its weights copy-on-write. With
+# STARTUP_MODE=background each worker loads it on a thread after the fork instead.
+from chat import app, start_background_workers, stop_background_workers
+
+__all__ = ["app", "start_background_workers", "stop_background_workers"]